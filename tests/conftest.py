@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the `whisper_network` package importable when tests run from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'whisper_network')))
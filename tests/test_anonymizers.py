@@ -1,15 +1,7 @@
 import re
-import sys
-import os
 import pytest
-# Ensure project package is importable when tests run from test folder
-# Dynamically load the anonymizers module from the repository (works in local dev/test)
-import importlib.util
-an_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'whisper_network', 'whisper_network', 'anonymizers.py'))
-spec = importlib.util.spec_from_file_location("whisper_anonymizers", an_path)
-_mod = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(_mod)
-AnonymizationEngine = _mod.AnonymizationEngine
+
+from whisper_network.anonymizers import AnonymizationEngine
 
 
 def test_medical_ref_address_and_phone_handling():
@@ -41,14 +33,153 @@ Remarques médicales (sensible) : Allergie à la pénicilline — dossier médic
 
     # Phone number should be removed (original not present) and phone token present
     assert "+33 7 98 12 34 56" not in out
-    assert re.search(r"\*\*\*PHONE", out)
+    assert re.search(r"\[PHONE_\d+\]", out)
 
     # Address should be anonymized and keep surrounding layout
     assert "Impasse des Lilas" not in out
-    assert re.search(r"\*\*\*ADDRESS", out)
+    assert re.search(r"\[ADDRESS_\d+\]", out)
     # The medical remarks line should still exist after address replacement
     assert "\nRemarques médicales" in out
 
     # Medical reference identifier should be anonymized (ref #MED-4432 -> MEDREF token)
     assert "MED-4432" not in out
-    assert re.search(r"\*\*\*MEDREF", out)
+    assert re.search(r"\[MEDREF_\d+\]", out)
+
+
+def test_secondary_types_use_consistent_tokens():
+    import asyncio
+    engine = AnonymizationEngine()
+
+    text = "CNI 123456789012 puis passeport 12AB34567, rappel CNI 123456789012."
+    settings = {"anonymize_id_cards": True, "anonymize_passports": True, "anonymize_names": False}
+
+    result = asyncio.run(engine.anonymize(text, settings))
+
+    assert result.anonymized_text == "CNI [CNI_1] puis passeport [PASSEPORT_1], rappel CNI [CNI_1]."
+    assert result.mapping_summary["ID_CARD"] == {"123456789012": "[CNI_1]"}
+    assert result.mapping_summary["PASSPORT"] == {"12AB34567": "[PASSEPORT_1]"}
+
+
+def test_exhausted_deadline_skips_expensive_stages():
+    import asyncio
+    engine = AnonymizationEngine()
+
+    text = "Marie Dupont, 12 rue de la Paix 75002 Paris, marie@example.com"
+    settings = {"anonymize_names": True, "anonymize_addresses": True}
+
+    result = asyncio.run(engine.anonymize(text, settings, deadline_ms=0))
+
+    # Structured detectors always complete
+    assert result.success
+    assert "[EMAIL_1]" in result.anonymized_text
+    assert result.degraded_stages == ["addresses", "names"]
+    assert "rue de la Paix" in result.anonymized_text
+
+    relaxed = asyncio.run(engine.anonymize(text, settings, deadline_ms=60000))
+    assert relaxed.degraded_stages == []
+    assert "rue de la Paix" not in relaxed.anonymized_text
+
+
+def test_existing_tokens_are_masked_and_never_reused():
+    import asyncio
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+
+    text = "Contact [EMAIL_1] ou bob@example.com. Diagnostic: asthme, voir [NAME_1] demain"
+    result = asyncio.run(engine.anonymize(text, {"anonymize_medical_data": True}))
+
+    assert result.anonymized_text == "Contact [EMAIL_1] ou [EMAIL_2]. [MEDICAL_1] [NAME_1] demain"
+    assert result.mapping_summary["EMAIL"] == {"bob@example.com": "[EMAIL_2]"}
+
+    # Already anonymized text goes through unchanged
+    again = asyncio.run(engine.anonymize(result.anonymized_text, {"anonymize_medical_data": True}))
+    assert again.anonymized_text == result.anonymized_text
+    assert again.anonymizations_count == 0
+
+
+def test_sync_core_matches_async_api():
+    import asyncio
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+
+    text = "Marie Dupont: marie.dupont@gmail.com, 06 12 34 56 78, serveur 10.0.0.12"
+    settings = {"anonymize_names": True}
+    result = engine.anonymize_sync(text, settings)
+
+    assert result.anonymized_text == asyncio.run(engine.anonymize(text, settings)).anonymized_text
+    spans = engine.detect_spans(text, settings)
+    assert [(m.start, m.end, m.replacement) for m in spans] == [
+        (m.start, m.end, m.replacement) for m in result.matches
+    ]
+    assert spans.assemble() == result.anonymized_text
+    assert len(engine.detect_spans("How do I reverse a list?", settings)) == 0
+
+
+def test_core_imports_without_server_dependencies():
+    import os
+    import subprocess
+    import sys
+    package_dir = os.path.join(os.path.dirname(__file__), '..', 'whisper_network')
+    code = (
+        "import sys; import whisper_network.anonymizers, whisper_network.fast_anonymizer; "
+        "print(sorted({'fastapi', 'sqlalchemy', 'redis', 'torch', 'spacy'} & set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=package_dir, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_incremental_reanonymization_matches_full_pass():
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+
+    line = "Bonjour, écrire à bob@example.com ou appeler 06 12 34 56 78.\n"
+    text = line * 50
+    previous = engine.anonymize_sync(text)
+
+    # Insertion in the middle: new value numbered after the previous ones
+    edited = text[:1500] + "copie à alice@example.org " + text[1500:]
+    result = engine.anonymize_incremental(previous, edited, margin=32)
+    assert result.success, result.errors
+    assert result.anonymized_text == engine.anonymize_sync(edited).anonymized_text
+    assert result.mapping_summary["EMAIL"] == {"bob@example.com": "[EMAIL_1]", "alice@example.org": "[EMAIL_2]"}
+
+    # Editing inside a previous span rescans it
+    retyped = edited.replace("bob@example.com", "bob@example.net", 1)
+    again = engine.anonymize_incremental(result, retyped, margin=8)
+    first, second = again.anonymized_text.splitlines()[:2]
+    assert first.startswith("Bonjour, écrire à [EMAIL_3] ou appeler [PHONE_1]")
+    assert second.startswith("Bonjour, écrire à [EMAIL_1]")
+    assert again.anonymizations_count == result.anonymizations_count
+
+    # Starting from a clean text
+    clean = engine.anonymize_sync("Bonjour")
+    assert engine.anonymize_incremental(clean, "Bonjour bob@example.com").anonymized_text == "Bonjour [EMAIL_1]"
+
+
+def test_incremental_edit_without_pii_keeps_the_mapping():
+    engine = AnonymizationEngine()
+    engine.nlp_fr = engine.nlp_en = None
+
+    first = engine.anonymize_sync("Contact bob@example.com.\n\nMerci.")
+    # The rescanned window holds no PII: the prefilter rules out every detector
+    second = engine.anonymize_incremental(first, "Contact bob@example.com.\n\nMerci bien.", margin=0)
+    assert second.mapping_summary == first.mapping_summary == {"EMAIL": {"bob@example.com": "[EMAIL_1]"}}
+
+    third = engine.anonymize_incremental(second, "Contact bob@example.com.\n\nMerci bien, alice@example.org.", margin=0)
+    assert third.anonymized_text == "Contact [EMAIL_1].\n\nMerci bien, [EMAIL_2]."
+
+
+def test_offsets_refer_to_the_returned_original_text_for_nfd_input():
+    import unicodedata
+    engine = AnonymizationEngine()
+    engine.nlp_fr = engine.nlp_en = None
+
+    text = unicodedata.normalize("NFD", "Réponse à rene@example.com, envoyée à José")
+    result = engine.anonymize_sync(text, {"anonymize_email": True})
+
+    assert result.original_text == unicodedata.normalize("NFC", text)
+    match = result.matches[0]
+    assert result.original_text[match.start:match.end] == match.original_text
+    assert result.anonymized_text == result.original_text.replace(match.original_text, "[EMAIL_1]")
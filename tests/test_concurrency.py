@@ -0,0 +1,59 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from whisper_network.anonymizers import AnonymizationEngine
+
+
+class FakeModel:
+    """Stands in for a spaCy model: tags its own names as PER, slowly enough to interleave requests."""
+
+    def __init__(self, names):
+        self.names = names
+        self.active = 0
+        self.overlaps = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text):
+        with self._lock:
+            self.active += 1
+            self.overlaps += self.active > 1
+        time.sleep(0.002)
+        with self._lock:
+            self.active -= 1
+        ents = [
+            SimpleNamespace(label_="PER", text=name, start_char=match.start())
+            for name in self.names for match in re.finditer(re.escape(name), text)
+        ]
+        return SimpleNamespace(ents=sorted(ents, key=lambda ent: ent.start_char))
+
+
+def test_mixed_language_requests_in_parallel_are_deterministic():
+    engine = AnonymizationEngine()
+    # Lowercase names: only the model of the request's language finds them
+    engine.nlp_fr = FakeModel(["marcel dupont"])
+    engine.nlp_en = FakeModel(["john smith"])
+    engine._detect_language = lambda text: "en" if " the " in text else "fr"
+    settings = {"anonymize_names": True}
+
+    texts = [
+        f"Bonjour, voici marcel dupont et john smith, écrivez à client{i}@example.com." if i % 2 else
+        f"Hello, the file of john smith and marcel dupont, write to client{i}@example.com."
+        for i in range(40)
+    ]
+    expected = [engine.anonymize_sync(text, settings).anonymized_text for text in texts]
+    assert expected[1].startswith("Bonjour, voici [NAME_1] et john smith")
+    assert expected[0].startswith("Hello, the file of [NAME_1] and marcel dupont")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(3):
+            results = list(pool.map(lambda text: engine.anonymize_sync(text, settings), texts))
+            assert [result.anonymized_text for result in results] == expected
+            assert all(result.success for result in results)
+
+    # Each model is only ever called by one request at a time
+    assert engine.nlp_fr.overlaps == engine.nlp_en.overlaps == 0
+    assert engine.pipelines.get_stats()["profiles"] == 1
+    assert engine.prefilter.get_stats()["texts"] == 4 * len(texts)
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+
+from whisper_network.anonymizers import AnonymizationEngine
+from whisper_network.conversation import ConversationState, split_paragraphs
+
+
+def test_split_paragraphs_on_blank_lines():
+    text = "Bonjour,\nligne deux\n\n  \nSuite.\n\n\n"
+    assert [text[start:end] for start, end in split_paragraphs(text)] == ["Bonjour,\nligne deux", "Suite."]
+    assert split_paragraphs(" \n\n ") == []
+
+
+def test_paragraph_index_evicts_oldest():
+    state = ConversationState(max_paragraphs=2)
+    keys = [state.paragraph_key("scope", text) for text in ("a", "b", "c")]
+    assert state.paragraph_key("other", "a") != keys[0]
+
+    state.remember(keys[0], [])
+    state.remember(keys[1], [["email", 0, 5, "[EMAIL_1]"]])
+    state.lookup(keys[0])
+    state.remember(keys[2], [])
+    assert list(state.paragraphs) == [keys[0], keys[2]]
+
+
+def test_next_turn_reuses_paragraphs_and_continues_tokens():
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+    first = "Écrivez à jean.dupont@example.com.\n\nMon IBAN est FR76 3000 6000 0112 3456 7890 189."
+    second = first + "\n\nCopie à marie@example.org et à jean.dupont@example.com."
+
+    state = ConversationState()
+    engine.anonymize_sync(first, conversation=state)
+    assert (state.hits, state.misses) == (0, 2)
+
+    # The state survives a JSON round trip, as in the session store
+    state = ConversationState(**json.loads(json.dumps(state.to_dict())))
+    result = engine.anonymize_sync(second, conversation=state)
+    assert (state.hits, state.misses) == (2, 1)
+    assert result.anonymized_text.endswith("Copie à [EMAIL_2] et à [EMAIL_1].")
+    assert result.anonymized_text == engine.anonymize_sync(second).anonymized_text
+    assert state.counters["EMAIL"] == 3
+
+
+def test_second_turn_of_a_new_session_reuses_the_first():
+    pytest.importorskip("redis")
+    from whisper_network.session_manager import SessionManager
+
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+    sessions = SessionManager()
+    first = "Écrivez à jean.dupont@example.com.\n\nMon IBAN est FR76 3000 6000 0112 3456 7890 189."
+    second = first + "\n\nCopie à marie@example.org."
+
+    # As /anonymize does: the first turn already goes through the conversation path
+    for text in (first, second):
+        state = sessions.get_conversation("new-session")
+        engine.anonymize_sync(text, conversation=state)
+        sessions.store_conversation("new-session", state)
+
+    assert (state.hits, state.misses) == (2, 1)
+    assert state.counters["EMAIL"] == 3
+
+
+def test_turns_of_a_session_are_serialized():
+    pytest.importorskip("redis")
+    from whisper_network.session_manager import SessionManager
+
+    sessions = SessionManager()
+    order = []
+
+    async def turn(name):
+        async with sessions.lock("s1"):
+            order.append(f"{name} reads")
+            await asyncio.sleep(0.01)
+            order.append(f"{name} writes")
+
+    async def scenario():
+        await asyncio.gather(turn("a"), turn("b"))
+
+    asyncio.run(scenario())
+    assert order == ["a reads", "a writes", "b reads", "b writes"]
+    assert sessions.lock("s1") is not sessions.lock("s2")
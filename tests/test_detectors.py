@@ -0,0 +1,63 @@
+import pytest
+
+from whisper_network.anonymizers import DETECTORS, STAGE_NAMES, AnonymizationEngine
+from whisper_network.detectors import (
+    TIER_NAMES, TIER_SECONDARY, Detector, DetectorRegistry, uncovered_text
+)
+from whisper_network.prefilter import Trigger
+
+
+def _registry():
+    return DetectorRegistry([
+        Detector("email", ("EMAIL",), "scan", cost=2.0, trigger=Trigger(chars=("@",))),
+        Detector("addresses", ("ADDRESS",), "addresses", cost=100.0, degradable=True),
+        Detector("names", ("NAME",), "names", tier=TIER_NAMES, cost=50.0, trigger=Trigger(uppercase=True)),
+        Detector("iban", ("IBAN",), "scan", tier=TIER_SECONDARY, cost=3.0),
+    ])
+
+
+def test_schedule_orders_by_tier_then_cost():
+    registry = _registry()
+    stages = registry.schedule(["names", "iban", "addresses", "email"])
+
+    assert [stage.name for stage in stages] == ["scan", "addresses", "names"]
+    assert [d.name for d in stages[0].detectors] == ["iban", "email"]
+    assert stages[0].cost == 5.0 and stages[1].degradable and not stages[0].degradable
+    assert registry.type_priority() == {"EMAIL": 0, "ADDRESS": 1, "NAME": 2, "IBAN": 3}
+
+
+def test_measured_timings_update_costs():
+    registry = _registry()
+    # 1 ms on 1000 characters: 1000 µs per 1000 characters
+    for _ in range(30):
+        registry.record("addresses", 0.001, 1000)
+
+    assert registry.cost("addresses") == pytest.approx(1000.0, rel=0.01)
+    assert [stage.name for stage in registry.schedule(["addresses", "email"])] == ["scan", "addresses"]
+    assert registry.get_stats()["addresses"]["runs"] == 30
+
+
+def test_registry_rejects_duplicates():
+    with pytest.raises(ValueError):
+        DetectorRegistry([Detector("email", (), "scan"), Detector("email", (), "scan")])
+
+
+def test_uncovered_text_keeps_offsets():
+    assert uncovered_text("Bob a@b.fr ok", [(4, 10)]) == "Bob        ok"
+
+
+def test_engine_declares_every_enabled_family():
+    engine = AnonymizationEngine()
+    pipeline = engine.compile_settings({name: True for name in dir(engine.settings) if name.startswith("anonymize_")})
+
+    assert set(engine._detector_families(pipeline)) <= {detector.name for detector in DETECTORS}
+
+
+def test_names_skipped_when_capitals_are_already_covered():
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+
+    result = engine.anonymize_sync("écrire à Marie.Dupont@Example.com demain", {"anonymize_names": True})
+
+    assert result.anonymized_text == "écrire à [EMAIL_1] demain"
+    assert engine.detectors.uncovered_skips == {STAGE_NAMES: 1}
@@ -0,0 +1,52 @@
+import asyncio
+import unicodedata
+
+from whisper_network.anonymizers import AnonymizationEngine
+from whisper_network.document import TITLE, UPPER, AnalyzedDocument
+
+TEXT = "Bonjour, JOLY Sylvain écrit à (Marie Dupont) depuis İzmir."
+
+
+def test_spans_match_slicing_lowering_and_splitting():
+    doc = AnalyzedDocument(TEXT)
+
+    for start, end in [(0, len(TEXT)), (9, 21), (31, 43), (30, 35), (46, len(TEXT))]:
+        span = doc.span(start, end)
+        assert span.text == TEXT[start:end]
+        assert span.lower == TEXT[start:end].lower()
+        assert span.words == TEXT[start:end].split()
+        assert span.lower_words == TEXT[start:end].lower().split()
+
+    assert doc.span(9, 21).flags == (UPPER, TITLE)
+    assert doc.word_count == len(TEXT.split())
+
+
+def test_text_is_nfc_normalized_once():
+    decomposed = unicodedata.normalize("NFD", "Hélène Durand")
+    doc = AnalyzedDocument(decomposed)
+
+    assert doc.normalized and doc.text == "Hélène Durand"
+    assert not AnalyzedDocument("Hélène Durand").normalized
+
+
+def test_parse_runs_each_model_once():
+    calls = []
+
+    def model(text):
+        calls.append(text)
+        return text.split()
+
+    doc = AnalyzedDocument(TEXT)
+    assert doc.parse(model) is doc.parse(model)
+    assert calls == [TEXT]
+
+
+def test_engine_detects_names_written_with_decomposed_accents():
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+    text = unicodedata.normalize("NFD", "merci à Hélène Durand.")
+
+    result = asyncio.run(engine.anonymize(text, {"anonymize_names": True}))
+
+    assert result.original_text == unicodedata.normalize("NFC", text)
+    assert result.anonymized_text == "merci à [NAME_1]."
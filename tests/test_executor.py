@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from whisper_network.anonymizers import AnonymizationEngine
+from whisper_network.executor import BoundedExecutor, ExecutorSaturated
+
+
+def test_slow_job_does_not_block_the_event_loop():
+    executor = BoundedExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run(release.wait, 5))
+        queued = asyncio.ensure_future(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+
+        # The loop keeps serving while the worker is busy; a third job is refused
+        assert executor.get_stats()["running"] == 1 and executor.get_stats()["queued"] == 1
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(time.sleep, 0)
+        release.set()
+        return await slow, await queued
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    stats = executor.get_stats()
+    assert (stats["completed"], stats["rejected"], stats["queued"], stats["running"]) == (2, 1, 0, 0)
+    assert stats["wait_ms_max"] >= 40
+    executor.shutdown()
+
+
+def test_queue_wait_counts_against_the_request_deadline():
+    engine = AnonymizationEngine(executor=BoundedExecutor(workers=1, max_queue=4))
+    engine.nlp_fr = engine.nlp_en = None
+    release = threading.Event()
+
+    async def scenario():
+        busy = asyncio.ensure_future(engine.executor.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+        request = asyncio.ensure_future(engine.anonymize(
+            "Jean Dupont habite 12 rue de la Paix 75002 Paris",
+            {"anonymize_names": True, "anonymize_addresses": True}, deadline_ms=20
+        ))
+        await asyncio.sleep(0.05)
+        release.set()
+        await busy
+        return await request
+
+    # Queued past its 20 ms budget: the degradable stages are skipped
+    result = asyncio.run(scenario())
+    assert result.degraded_stages and result.processing_time_ms >= 40
+    engine.executor.shutdown()
@@ -0,0 +1,68 @@
+import asyncio
+
+from whisper_network.anonymizers import AnonymizationEngine
+from whisper_network.ip_ranges import (
+    LINK_LOCAL, LOOPBACK, PRIVATE, PUBLIC, RangeTable, classify_ipv4, classify_ipv6
+)
+
+
+def test_ipv4_classes():
+    assert classify_ipv4("10.1.2.3") == PRIVATE
+    assert classify_ipv4("172.31.255.255") == PRIVATE
+    assert classify_ipv4("172.32.0.1") == PUBLIC
+    assert classify_ipv4("192.168.001.010") == PRIVATE
+    assert classify_ipv4("127.0.0.1") == LOOPBACK
+    assert classify_ipv4("169.254.10.1") == LINK_LOCAL
+    assert classify_ipv4("8.8.8.8") == PUBLIC
+    assert classify_ipv4("256.1.1.1") is None
+
+
+def test_ipv6_classes():
+    assert classify_ipv6("::1") == LOOPBACK
+    assert classify_ipv6("fd12:3456::1") == PRIVATE
+    assert classify_ipv6("fe80::1ff:fe23:4567:890a") == LINK_LOCAL
+    assert classify_ipv6("2001:0db8:85a3::8a2e:0370:7334") == PUBLIC
+    # IPv4-mapped addresses take the class of their IPv4 part
+    assert classify_ipv6("::ffff:192.168.1.1") == PRIVATE
+    # MAC addresses and times are not addresses
+    assert classify_ipv6("00:1A:2B:3C:4D:5E") is None
+    assert classify_ipv6("10:14:03") is None
+    # The unspecified address is punctuation in prose ("Statut :: ok")
+    assert classify_ipv6("::") is None
+    # Short compressed forms read as code: C++ scopes, Python slices
+    assert classify_ipv6("a::b") is None
+    assert classify_ipv6("1::2") is None
+    assert classify_ipv6("::2") is None
+    assert classify_ipv6("abc::d") == PUBLIC
+
+
+def test_range_table_rejects_overlaps():
+    try:
+        RangeTable([("10.0.0.0/8", PRIVATE), ("10.1.0.0/16", LOOPBACK)])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("overlapping ranges accepted")
+
+
+def test_engine_classifies_ipv4_and_ipv6():
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+
+    text = "Hosts 10.0.0.12, fe80::1, 8.8.8.8 et 2001:db8::7334. Heure 10:14:03, mac 00:1A:2B:3C:4D:5E"
+    settings = {"anonymize_ip": True, "anonymize_ip_private": True}
+    result = asyncio.run(engine.anonymize(text, settings))
+
+    assert result.anonymized_text == (
+        "Hosts [IP_PRIVEE_1], [IP_PRIVEE_2], [IP_PUBLIQUE_1] et [IP_PUBLIQUE_2]. "
+        "Heure 10:14:03, mac 00:1A:2B:3C:4D:5E"
+    )
+
+    # Without the private class, every address gets the public token
+    public_only = asyncio.run(engine.anonymize(
+        "fe80::1 et 10.0.0.12", {"anonymize_ip": True, "anonymize_ip_private": False}
+    ))
+    assert public_only.anonymized_text == "[IP_PUBLIQUE_1] et [IP_PUBLIQUE_2]"
+
+    # A bare "::" has no hex group: not a candidate
+    assert engine.anonymize_sync("Statut :: ok, hôte ::1", settings).anonymized_text == "Statut :: ok, hôte [IP_PRIVEE_1]"
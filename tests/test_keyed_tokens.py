@@ -0,0 +1,79 @@
+import re
+
+import pytest
+
+from whisper_network import keyed_tokens
+from whisper_network.anonymizers import AnonymizationEngine, ConsistencyMapper
+from whisper_network.fast_anonymizer import FastAnonymizer
+from whisper_network.keyed_tokens import KeyedTokenizer, normalize_value
+
+
+def test_tokens_depend_on_value_secret_and_scope():
+    tokenizer = KeyedTokenizer(b"secret")
+    token = tokenizer.token("EMAIL", "EMAIL", "Jean.Dupont@example.com")
+
+    assert re.fullmatch(r"\[EMAIL_[0-9a-f]{6}\]", token)
+    assert KeyedTokenizer(b"secret").token("EMAIL", "EMAIL", " jean.dupont@EXAMPLE.com") == token
+    assert KeyedTokenizer(b"other").token("EMAIL", "EMAIL", "jean.dupont@example.com") != token
+    assert tokenizer.for_scope("session-1").token("EMAIL", "EMAIL", "jean.dupont@example.com") != token
+    assert normalize_value("06 12.34-56 78") == normalize_value("0612345678") == "0612345678"
+    with pytest.raises(ValueError):
+        KeyedTokenizer(b"secret", length=2)
+
+
+def test_collisions_lengthen_the_token():
+    tokenizer = KeyedTokenizer(b"secret", length=4)
+    short = tokenizer.token("IP", "IP", "10.0.0.1")
+    longer = tokenizer.token("IP", "IP", "10.0.0.1", is_taken=lambda token, digest: token == short)
+    assert longer.startswith(short[:-1]) and len(longer) == len(short) + 2
+
+    # The mapper resolves the collision for the second value it sees
+    mapper = ConsistencyMapper(tokenizer)
+    mapper.reserve([short])
+    assert mapper.get_token("IP", "10.0.0.1", "[IP]") == longer
+
+
+def test_tokens_lengthened_past_the_maximum_length_are_masked():
+    tokenizer = KeyedTokenizer(b"secret", length=keyed_tokens.MAX_TOKEN_LENGTH)
+    short = tokenizer.token("EMAIL", "EMAIL", "jean.dupont@example.com")
+    longer = tokenizer.token("EMAIL", "EMAIL", "jean.dupont@example.com", is_taken=lambda token, digest: token == short)
+    assert len(longer) == len(short) + 2
+
+    engine = AnonymizationEngine()
+    assert engine.patterns.EXISTING_TOKEN.fullmatch(longer)
+    result = engine.anonymize_sync(f"Réponse à {longer} et marie@example.org", {"token_mode": "keyed"}, session_id="s1")
+    assert result.anonymized_text.startswith(f"Réponse à {longer} et [EMAIL_")
+    assert result.anonymizations_count == 1
+
+
+def test_case_variants_share_their_token():
+    tokenizer = KeyedTokenizer(b"secret")
+    mapper = ConsistencyMapper(tokenizer)
+    token = mapper.get_token("EMAIL", "Jean.Dupont@example.com", "[EMAIL]")
+    assert mapper.get_token("EMAIL", "jean.dupont@example.com", "[EMAIL]") == token
+    assert mapper.get_token("EMAIL", "marie@example.org", "[EMAIL]") != token
+
+    fast = FastAnonymizer(tokenizer).anonymize_sync(
+        "Jean.Dupont@example.com, jean.dupont@example.com", {"anonymize_email": True}
+    )
+    first, second = fast.anonymized_text.split(", ")
+    assert first == second and re.fullmatch(r"\[EMAIL_[0-9a-f]{6}\]", first)
+
+
+def test_replicas_agree_without_shared_state(monkeypatch):
+    # Replicas share nothing but WHISPER_TOKEN_SECRET
+    monkeypatch.setattr(keyed_tokens, "_default", KeyedTokenizer(b"secret"))
+    text = "Contact : jean.dupont@example.com, copie à marie@example.org et jean.dupont@example.com."
+    settings = {"token_mode": "keyed"}
+    engine = AnonymizationEngine()
+    first = engine.anonymize_sync(text, settings, session_id="s1")
+    second = AnonymizationEngine().anonymize_sync(text, settings, session_id="s1")
+
+    tokens = re.findall(r"\[EMAIL_[0-9a-f]{6}\]", first.anonymized_text)
+    assert len(tokens) == 3 and tokens[0] == tokens[2] != tokens[1]
+    assert second.anonymized_text == first.anonymized_text
+    assert engine.patterns.EXISTING_TOKEN.fullmatch(tokens[0])
+    assert engine.anonymize_sync(first.anonymized_text, settings).anonymizations_count == 0
+
+    fast = FastAnonymizer(KeyedTokenizer(b"secret")).anonymize_sync(text, {"anonymize_email": True})
+    assert len(set(re.findall(r"\[EMAIL_[0-9a-f]{6}\]", fast.anonymized_text))) == 2
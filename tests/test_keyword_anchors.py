@@ -0,0 +1,46 @@
+import asyncio
+
+from whisper_network.anonymizers import RegexPatterns
+from whisper_network.fast_anonymizer import FAST_ANCHORS, FastAnonymizer
+from whisper_network.keyword_anchors import KeywordAnchors
+
+TEXT = """LOGIN: jdupont, Username=admin, identifiant : m.durand
+Matricule EMP4521 - employee A1234
+Diagnostic: hypertension sévère, TRAITEMENT : bêtabloquants
+Dossier n° 4432, réf #MED-77, d-num X12, affaire RG-2024/123, procédure AB12345
+Empreinte digitale enregistrée, scan: iris droit
+Note: 15/20, moyenne 12.5, score 9/10
+Planning : 09h00-17h30, Évaluation : Excellent, client NXO, société ACME
+"""
+
+
+def _spans(matches):
+    return [(m.start(), m.end()) for m in matches]
+
+
+def test_anchored_patterns_match_like_finditer():
+    keywords = KeywordAnchors({name: words for name, words in RegexPatterns.ANCHORS.items()})
+    anchors = keywords.find(TEXT)
+
+    for name in RegexPatterns.ANCHORS:
+        pattern = getattr(RegexPatterns, name)
+        anchored = KeywordAnchors.iter_matches(pattern, TEXT, anchors[name])
+        assert _spans(anchored) == _spans(pattern.finditer(TEXT)), name
+
+
+def test_fast_anonymizer_anchors_match_like_finditer():
+    patterns = FastAnonymizer().pattern_cache
+    anchors = FastAnonymizer.keyword_anchors.find(TEXT)
+
+    for key in FAST_ANCHORS:
+        anchored = KeywordAnchors.iter_matches(patterns[key], TEXT, anchors[key])
+        assert _spans(anchored) == _spans(patterns[key].finditer(TEXT)), key
+
+    result = asyncio.run(FastAnonymizer().anonymize_fast(TEXT, {"anonymize_planning": True, "anonymize_organizations": True}))
+    assert "[PLANNING_1]" in result.anonymized_text and "NXO" not in result.anonymized_text
+
+
+def test_shared_keywords_anchor_every_owner():
+    anchors = KeywordAnchors({"medical_ref": ("dossier", "ref"), "legal": ("dossier",)}, use_automaton=False).find("Le DOSSIER")
+
+    assert anchors == {"medical_ref": [3], "legal": [3]}
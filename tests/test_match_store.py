@@ -0,0 +1,29 @@
+import asyncio
+
+from whisper_network.anonymizers import AnonymizationEngine, AnonymizationMatch, AnonymizationType, MATCH_TYPES, TYPE_CODES
+from whisper_network.match_store import MatchStore
+
+
+def test_store_keeps_columns_and_materializes_on_demand():
+    text = "Mail a@b.fr, adresse  12 rue X "
+    store = MatchStore(text, MATCH_TYPES, AnonymizationMatch)
+    email = store.intern_token("[EMAIL]")
+    store.append(TYPE_CODES[AnonymizationType.EMAIL], 5, 11, email, "a@b.fr")
+    # Original text differing from the span (stripped address) is kept aside
+    store.append(TYPE_CODES[AnonymizationType.ADDRESS], 20, 31, store.intern_token("[ADDRESS]"), "12 rue X")
+
+    assert len(store) == 2
+    assert list(store.starts) == [5, 20] and list(store.token_refs) == [0, 1]
+    assert store[0] == AnonymizationMatch(AnonymizationType.EMAIL, 5, 11, "a@b.fr", "[EMAIL]")
+    assert store[-1].original_text == "12 rue X"
+    assert store.assemble() == "Mail [EMAIL], adresse[ADDRESS]"
+
+
+def test_engine_result_matches_share_the_mapper_token_table():
+    engine = AnonymizationEngine()
+    result = asyncio.run(engine.anonymize("a@b.fr puis c@d.fr puis a@b.fr", {"anonymize_names": False}))
+
+    assert isinstance(result.matches, MatchStore)
+    assert [m.replacement for m in result.matches] == ["[EMAIL_1]", "[EMAIL_2]", "[EMAIL_1]"]
+    assert len(result.matches.token_table) == 2
+    assert not hasattr(result.matches[0], "__dict__")
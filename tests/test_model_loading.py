@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from whisper_network import AnonymizationEngine
+from whisper_network.model_loading import ModelLoader, ModelsNotReady
+
+TEXT = "Bonjour, je suis Jean Dupont, écrivez à jean.dupont@example.com"
+
+
+def test_models_load_in_the_background_with_per_model_status():
+    release = threading.Event()
+    loader = ModelLoader({
+        "slow": lambda: release.wait(5) and "model",
+        "missing": lambda: None,
+        "broken": lambda: 1 / 0,
+    })
+    loader.start()
+
+    assert not loader.ready and not loader.wait(0.05)
+    assert loader.statuses() == {"slow": "loading", "missing": "pending", "broken": "pending"}
+    release.set()
+
+    assert loader.wait(5)
+    assert loader.statuses() == {"slow": "ready", "missing": "unavailable", "broken": "failed"}
+    stats = loader.get_stats()
+    assert stats["ready"] and "load_ms" in stats["models"]["slow"]
+    assert "division by zero" in stats["models"]["broken"]["error"]
+
+
+def test_ner_requests_degrade_to_regex_while_models_load():
+    engine = AnonymizationEngine(background_loading=True)
+
+    result = engine.anonymize_sync(TEXT, {"anonymize_names": True, "anonymize_email": True})
+    assert "jean.dupont@example.com" not in result.anonymized_text
+    assert "Jean Dupont" not in result.anonymized_text  # Regex name detection
+    assert result.degraded_stages == ["ner"]
+    # Regex-only requests are not degraded
+    assert engine.anonymize_sync(TEXT, {"anonymize_email": True}).degraded_stages == []
+
+    engine.models.load()
+    assert engine.anonymize_sync(TEXT, {"anonymize_names": True}).degraded_stages == []
+
+
+def test_ner_requests_wait_a_bounded_time_under_the_wait_policy():
+    engine = AnonymizationEngine(background_loading=True, ner_policy="wait", ner_wait_ms=20)
+
+    with pytest.raises(ModelsNotReady):
+        engine.anonymize_sync(TEXT, {"anonymize_names": True})
+    with pytest.raises(ModelsNotReady):
+        asyncio.run(engine.anonymize(TEXT, {"anonymize_names": True}))
+    assert asyncio.run(engine.anonymize(TEXT, {"anonymize_email": True})).success
+
+    engine.start_model_loading()
+    assert engine.models.wait(5)
+    assert asyncio.run(engine.anonymize(TEXT, {"anonymize_names": True})).degraded_stages == []
+
+    with pytest.raises(ValueError):
+        AnonymizationEngine(ner_policy="block")
+
+
+class NameModel:
+    """Stands in for a spaCy model: tags one lowercase name as PER."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, text):
+        start = text.find(self.name)
+        ents = [SimpleNamespace(label_="PER", text=self.name, start_char=start)] if start >= 0 else []
+        return SimpleNamespace(ents=ents)
+
+
+def test_a_loaded_model_is_used_while_others_still_load():
+    engine = AnonymizationEngine(background_loading=True)
+    engine._detect_language = lambda text: "en" if " the " in text else "fr"
+    release = threading.Event()
+    fr_model = NameModel("marcel dupont")
+    engine.models = ModelLoader({
+        "fr_core_news_sm": lambda: setattr(engine, "nlp_fr", fr_model) or fr_model,
+        "en_core_web_sm": lambda: release.wait(5) and None,
+        "camembert": lambda: release.wait(5) and None,
+    })
+    engine.start_model_loading()
+    assert engine.models.wait(5, "fr_core_news_sm") and not engine.models.ready
+
+    # French uses its model at once; English waits for its own, not for the French one
+    fr = engine.anonymize_sync("Bonjour, voici marcel dupont.", {"anonymize_names": True})
+    assert fr.anonymized_text == "Bonjour, voici [NAME_1]." and fr.degraded_stages == []
+    en = engine.anonymize_sync("Hello, the file of marcel dupont.", {"anonymize_names": True})
+    assert en.degraded_stages == ["ner"] and "marcel dupont" in en.anonymized_text
+    release.set()
+    assert engine.models.wait(5)
+
+
+def test_wait_policy_is_bounded_by_the_request_deadline():
+    engine = AnonymizationEngine(background_loading=True, ner_policy="wait", ner_wait_ms=5000)
+    started = time.perf_counter()
+    with pytest.raises(ModelsNotReady):
+        asyncio.run(engine.anonymize(TEXT, {"anonymize_names": True}, deadline_ms=30))
+    assert time.perf_counter() - started < 1
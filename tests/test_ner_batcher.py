@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+from whisper_network.ner_batcher import NerBatcher
+
+
+class PipeModel:
+    """Stands in for a spaCy model: records the batches nlp.pipe receives."""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    def pipe(self, texts, batch_size):
+        texts = list(texts)
+        if self.fail_on in texts:
+            raise RuntimeError("model error")
+        self.batches.append((len(texts), batch_size))
+        return [text.upper() for text in texts]
+
+
+def test_concurrent_texts_are_parsed_in_batches():
+    batcher = NerBatcher(max_batch=8, max_wait_ms=50, batch_size=64)
+    fr, en = PipeModel(), PipeModel()
+    texts = [f"texte {i}" for i in range(24)]
+
+    with ThreadPoolExecutor(max_workers=24) as pool:
+        docs = list(pool.map(lambda i: batcher.parse(fr if i % 2 else en, texts[i]), range(24)))
+
+    assert docs == [text.upper() for text in texts]
+    # One queue per model, batches bounded by max_batch, pipe gets batch_size
+    assert sum(size for size, _ in fr.batches) == sum(size for size, _ in en.batches) == 12
+    assert len(fr.batches) < 12 and max(size for size, _ in fr.batches + en.batches) <= 8
+    assert {batch_size for _, batch_size in fr.batches} == {64}
+
+    stats = batcher.get_stats()
+    assert stats["documents"] == 24 and stats["batches"] == len(fr.batches) + len(en.batches)
+    assert stats["avg_batch"] > 1 and sum(stats["batch_sizes"].values()) == stats["batches"]
+    batcher.shutdown()
+
+
+def test_batch_errors_only_reach_the_failing_request():
+    batcher = NerBatcher(max_batch=8, max_wait_ms=50)
+    nlp = PipeModel(fail_on="boom")
+
+    def parse(text):
+        try:
+            return batcher.parse(nlp, text)
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(parse, ["a", "boom", "b", "c"]))
+
+    # The failed batch is parsed again text by text
+    assert results == ["A", "model error", "B", "C"]
+    batcher.shutdown()
+
+
+def test_parse_waits_at_most_the_timeout():
+    release = threading.Event()
+
+    class SlowModel(PipeModel):
+        def pipe(self, texts, batch_size):
+            release.wait(5)
+            return super().pipe(texts, batch_size)
+
+    batcher = NerBatcher(max_batch=1, max_wait_ms=0)
+    nlp = SlowModel()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(batcher.parse, nlp, "first")
+        time.sleep(0.05)
+        # Queued behind a slow batch: gives up, and is never parsed
+        with pytest.raises(TimeoutError):
+            batcher.parse(nlp, "late", timeout=0.05)
+        release.set()
+        assert first.result() == "FIRST"
+    batcher.shutdown()
+    time.sleep(0.05)
+    assert nlp.batches == [(1, 100)]
@@ -0,0 +1,31 @@
+import pytest
+
+from benchmarks.ner_pipelines import SAMPLE_TEXTS, entity_differences
+from whisper_network.nlp_models import load_ner_model
+
+
+def test_entity_differences_lists_changed_texts():
+    texts = ["Jean Dupont à Lyon", "Rien"]
+    full = {"entities": [[[0, 11, "PER"], [14, 18, "LOC"]], []]}
+    assert entity_differences(full, full, texts) == []
+
+    trimmed = {"entities": [[[0, 11, "PER"]], []]}
+    assert entity_differences(full, trimmed, texts) == [
+        "'Jean Dupont à Lyon': [[0, 11, 'PER'], [14, 18, 'LOC']] != [[0, 11, 'PER']]"
+    ]
+
+
+@pytest.mark.parametrize("model,language", [("fr_core_news_sm", "fr"), ("en_core_web_sm", "en")])
+def test_trimmed_pipeline_finds_the_same_entities(model, language):
+    pytest.importorskip("spacy")
+    try:
+        full = load_ner_model(model, trimmed=False)
+    except OSError:
+        pytest.skip(f"{model} is not installed")
+    trimmed = load_ner_model(model, trimmed=True, sentencizer=True)
+
+    assert set(trimmed.pipe_names) < set(full.pipe_names) | {"sentencizer"}
+    for text in SAMPLE_TEXTS[language]:
+        full_ents = [(e.start_char, e.end_char, e.label_) for e in full(text).ents]
+        assert [(e.start_char, e.end_char, e.label_) for e in trimmed(text).ents] == full_ents
+        assert list(trimmed(text).sents)
@@ -0,0 +1,55 @@
+from whisper_network.anonymizers import RegexPatterns
+from whisper_network.keyword_anchors import KeywordAnchors
+from whisper_network.numeric_runs import LUHN, MOD97, DigitRunIndex, luhn_valid, mod97_valid
+
+TEXT = """Tél +33 6 12 34 56 78, (555) 123-4567, 06.12.34.56.78 ou 0033 1 23 45 67 89
+NIR 1 85 05 78 006 084 36, CNI 123456789012, passeport 12AB34567
+Carte 4111 1111 1111 1111 / 4111-1111-1111-1112, RIB 30004 00550 00012345678 42
+IP 192.168.1.1, 10.0.0.12, 127.0.0.1, 8.8.8.8:53 - GPS -48.8566, +2.3522 et 48°N, 2°E
+12 rue de la Paix 75002 Paris, 7 Impasse des Lilas, 13001 Marseille ; salaire 3500 € brut
+A12345 x-12-45 6 2025-11-02 10:14:03 ٣٤٥٦٧
+"""
+
+
+def _spans(matches):
+    return [(m.start(), m.end()) for m in matches]
+
+
+def test_number_led_patterns_match_like_finditer():
+    runs = DigitRunIndex(TEXT)
+
+    for name, lead in RegexPatterns.LEADS.items():
+        pattern = getattr(RegexPatterns, name)
+        anchored = KeywordAnchors.iter_matches(pattern, TEXT, runs.anchors(lead))
+        assert _spans(anchored) == _spans(pattern.finditer(TEXT)), name
+
+
+def test_runs_keep_offsets_separators_and_digits():
+    text = "Tel 06 12 34 56 78, ip 192.168.1.1"
+    runs = DigitRunIndex(text)
+
+    phone, ip = runs.runs
+    assert (phone.start, phone.end, phone.digits, phone.shape) == (4, 18, "0612345678", "2 2 2 2 2")
+    assert (ip.digits, ip.shape) == ("19216811", "3.3.1.1")
+    assert runs.run_at(10) is phone and runs.run_at(19) is None
+    assert runs.digits(7, 27) == "12345678192"
+
+
+def test_checksums():
+    assert luhn_valid("4111111111111111") and not luhn_valid("4111111111111112")
+    assert mod97_valid("FR7630006000011234567890189") and not mod97_valid("FR7630006000011234567890188")
+
+    text = "Carte 4111 1111 1111 1111, IBAN FR14 2004 1010 0505 0001 3M02 606"
+    runs = DigitRunIndex(text)
+    assert runs.checksum_valid(LUHN, 6, 25)
+    assert runs.checksum_valid(MOD97, 32, len(text))
+
+
+def test_engine_drops_cards_failing_luhn():
+    import asyncio
+    from whisper_network.anonymizers import AnonymizationEngine
+
+    settings = {"anonymize_phone": False, "anonymize_addresses": False, "anonymize_names": False, "anonymize_credit_cards": True}
+    result = asyncio.run(AnonymizationEngine().anonymize("Carte 4111 1111 1111 1111 et 4111 1111 1111 1112", settings))
+
+    assert result.anonymized_text == "Carte [CARTE_1] et 4111 1111 1111 1112"
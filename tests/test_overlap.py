@@ -0,0 +1,75 @@
+import random
+from dataclasses import dataclass
+
+import pytest
+
+from whisper_network import overlap
+from whisper_network.overlap import IntervalIndex, resolve_overlaps
+
+
+@dataclass
+class Span:
+    start: int
+    end: int
+    rank: int = 0
+
+
+def _spans(spans):
+    return [(s.start, s.end) for s in spans]
+
+
+def test_interval_index_queries():
+    index = IntervalIndex()
+    index.add(10, 20)
+    index.add(0, 5)
+
+    assert index.overlaps(4, 6)
+    assert index.overlaps(15, 30)
+    assert not index.overlaps(5, 10)
+    assert not index.overlaps(20, 25)
+    assert index.contains(10) and not index.contains(20)
+
+
+def test_chunked_index_matches_a_plain_scan(monkeypatch):
+    monkeypatch.setattr(overlap, "_CHUNK_SIZE", 3)
+    rng = random.Random(7)
+    spans = [(start, start + rng.randint(1, 4)) for start in range(0, 500, 5)]
+    rng.shuffle(spans)
+
+    index = IntervalIndex()
+    for start, end in spans:
+        index.add(start, end)
+    spans.sort()
+
+    assert list(index) == spans and len(index) == len(spans) and len(index._chunks) > 10
+    for position in range(-2, 505):
+        assert index.overlaps(position, position + 3) == any(s < position + 3 and position < e for s, e in spans)
+        assert index.contains(position) == any(s <= position < e for s, e in spans)
+        assert index.covers(position, position + 2) == any(s <= position and position + 2 <= e for s, e in spans)
+        assert index.next_start(position) == next((s for s, _ in spans if s >= position), None)
+
+
+def test_policies():
+    spans = [Span(0, 4, rank=1), Span(2, 12, rank=2), Span(10, 14, rank=0)]
+
+    assert _spans(resolve_overlaps(spans, "leftmost", lambda s: s.rank)) == [(0, 4), (10, 14)]
+    assert _spans(resolve_overlaps(spans, "longest", lambda s: s.rank)) == [(2, 12)]
+    assert _spans(resolve_overlaps(spans, "priority", lambda s: s.rank)) == [(0, 4), (10, 14)]
+
+
+def test_longest_ties_use_type_priority():
+    spans = [Span(0, 5, rank=3), Span(3, 8, rank=1)]
+
+    assert _spans(resolve_overlaps(spans, "longest", lambda s: s.rank)) == [(3, 8)]
+
+
+def test_taken_spans_block_lower_tiers():
+    taken = IntervalIndex()
+    resolve_overlaps([Span(5, 10)], taken=taken)
+
+    assert _spans(resolve_overlaps([Span(0, 6), Span(10, 12)], taken=taken)) == [(10, 12)]
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        resolve_overlaps([Span(0, 1)], "shortest")
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from whisper_network.anonymizers import AnonymizationEngine, AnonymizationSettings
+from whisper_network.pipeline_cache import UnknownProfile, settings_fingerprint
+
+
+@pytest.fixture
+def engine():
+    return AnonymizationEngine(pipeline_cache_size=2)
+
+
+def test_equivalent_settings_share_a_profile(engine):
+    first = engine.compile_settings({"anonymize_email": True, "anonymize_phone": False})
+    # Same effective settings, different raw form (defaults spelled out, other key order)
+    second = engine.compile_settings({"anonymize_phone": False, "anonymize_email": True, "anonymize_ip": True})
+
+    assert first is second
+    assert engine.compile_settings({"anonymize_email": True, "anonymize_phone": False}) is first
+    assert engine.pipelines.hits == 1
+
+
+def test_token_overrides_change_the_fingerprint():
+    custom = AnonymizationSettings(email_token="[MAIL]")
+
+    assert settings_fingerprint(custom) != settings_fingerprint(AnonymizationSettings())
+    assert settings_fingerprint(custom)[0] == settings_fingerprint(AnonymizationSettings())[0]
+
+
+def test_anonymize_with_profile_id(engine):
+    text = "Ecrire à jean@example.com ou au 06 12 34 56 78"
+    by_settings = asyncio.run(engine.anonymize(text, {"anonymize_phone": False}))
+    by_profile = asyncio.run(engine.anonymize(text, profile_id=by_settings.profile_id))
+
+    assert by_profile.anonymized_text == by_settings.anonymized_text == "Ecrire à [EMAIL_1] ou au 06 12 34 56 78"
+
+
+def test_lru_eviction(engine):
+    evicted = engine.compile_settings({"anonymize_urls": False}).profile_id
+    engine.compile_settings({"anonymize_nir": False})
+    engine.compile_settings({"anonymize_email": False})
+
+    assert engine.pipelines.get_profile(evicted) is None
+    with pytest.raises(UnknownProfile):
+        asyncio.run(engine.anonymize("text", profile_id=evicted))
+    # Whatever the NER policy: the profile is resolved before waiting for models
+    engine.ner_policy = "wait"
+    with pytest.raises(UnknownProfile):
+        asyncio.run(engine.anonymize("text", profile_id=evicted))
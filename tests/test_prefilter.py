@@ -0,0 +1,46 @@
+import asyncio
+
+from whisper_network.anonymizers import AnonymizationEngine
+from whisper_network.fast_anonymizer import FastAnonymizer
+from whisper_network.prefilter import TextProfile, Trigger
+
+
+def test_triggers_are_checked_on_one_profile():
+    profile = TextProfile("Voir la PROCÉDURE en pièce jointe")
+
+    assert not profile.has_digit
+    assert profile.has_uppercase
+    assert profile.fires(Trigger(keywords=("procédure",)))
+    assert not profile.fires(Trigger(digits=True, chars=("@",)))
+
+
+def test_clean_text_short_circuits_the_engine():
+    engine = AnonymizationEngine()
+    text = "comment trier une liste en python ?"
+
+    result = asyncio.run(engine.anonymize(text, {"anonymize_names": True, "anonymize_addresses": True}))
+
+    assert result.anonymized_text == text and result.anonymizations_count == 0
+    stats = engine.prefilter.get_stats()
+    assert stats["clean_texts"] == 1
+    assert stats["families"]["names"] == {"considered": 1, "skipped": 1, "skip_rate": 1.0}
+
+
+def test_families_without_trigger_are_skipped_but_others_run():
+    engine = AnonymizationEngine()
+
+    result = asyncio.run(engine.anonymize("écrire à jean@example.com", {"anonymize_names": False}))
+
+    assert result.anonymized_text == "écrire à [EMAIL_1]"
+    assert engine.prefilter.skipped["phone"] == 1
+    assert "email" not in engine.prefilter.skipped
+
+
+def test_fast_anonymizer_counts_skips_across_instances():
+    prefilter = FastAnonymizer.prefilter
+    before = prefilter.clean_texts
+
+    result = asyncio.run(FastAnonymizer().anonymize_fast("rien à signaler", {"anonymize_email": True, "anonymize_phone": True}))
+
+    assert result.anonymized_text == "rien à signaler"
+    assert prefilter.clean_texts == before + 1
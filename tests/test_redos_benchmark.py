@@ -0,0 +1,28 @@
+import re
+
+from benchmarks.redos import compare_reports, growth_exponent, run_benchmark
+
+
+def test_growth_exponent_fits_log_log_slope():
+    sizes = [1000, 2000, 4000]
+    assert round(growth_exponent(sizes, [1.0, 2.0, 4.0]), 2) == 1.0
+    assert round(growth_exponent(sizes, [1.0, 4.0, 16.0]), 2) == 2.0
+    # Timings under the noise floor carry no growth information
+    assert growth_exponent(sizes, [0.001, 0.002, 0.004]) is None
+
+
+def test_report_is_machine_readable_and_diffable():
+    report = run_benchmark(
+        sizes=[100, 200],
+        patterns={"digits": re.compile(r"\d+")},
+        generators={"digit_run": lambda n: "7" * n},
+        repeat=1
+    )
+
+    assert report["sizes"] == [100, 200]
+    result = report["patterns"]["digits"]["inputs"]["digit_run"]
+    assert result["sizes"] == [100, 200] and len(result["times_ms"]) == 2
+
+    flagged = {"patterns": {"digits": dict(report["patterns"]["digits"], super_linear=True, worst_exponent=2.0)}}
+    assert compare_reports(report, flagged)[0].startswith("! digits: now super-linear")
+    assert compare_reports(flagged, {"patterns": {}}) == ["- digits: removed"]
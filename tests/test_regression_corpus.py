@@ -0,0 +1,27 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from whisper_network.anonymizers import AnonymizationEngine
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'regression_corpus.json')
+
+with open(CORPUS_PATH, encoding='utf-8') as f:
+    CORPUS = json.load(f)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = AnonymizationEngine()
+    # Regex-only name detection keeps the expected outputs independent of installed models
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+    return engine
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_output_matches_corpus(engine, case):
+    result = asyncio.run(engine.anonymize(case["text"], case["settings"]))
+    assert result.success, result.errors
+    assert result.anonymized_text == case["expected"]
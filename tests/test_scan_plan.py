@@ -0,0 +1,106 @@
+import re
+
+import pytest
+
+from whisper_network.anonymizers import RegexPatterns
+from whisper_network.regex_backends import RE2Backend, RegexBackends, select_backends
+from whisper_network.scan_plan import ScanEntry, ScanPlan
+
+TEXT = """Contact: marie.dupont@gmail.com, 06 12 34 56 78, +33 7 98 12 34 56
+Serveurs 10.0.0.12, 127.0.0.1 et 8.8.8.8 - https://api.example.com/v1?id=42
+NIR 1 85 05 78 006 084 36, dossier médical ref #MED-4432
+Adresse : 7 Impasse des Lilas, 13001 Marseille
+12 rue de la Paix 75002 Paris
+"""
+
+PATTERN_NAMES = [
+    "EMAIL", "PHONE", "IP_V4", "IP_V6", "URL", "NIR",
+    "MEDICAL_REF", "FRENCH_COMPLETE_ADDRESS", "PRECISE_ADDRESS", "FRENCH_POSTAL",
+    "FRENCH_STREET",
+]
+
+
+def _spans(matches):
+    return [(m.start(), m.end(), m.group()) for m in matches]
+
+
+def test_scan_matches_one_finditer_per_pattern():
+    entries = [ScanEntry(name, getattr(RegexPatterns, name)) for name in PATTERN_NAMES]
+    found = ScanPlan(entries).scan(TEXT)
+
+    for entry in entries:
+        assert _spans(found[entry.key]) == _spans(entry.pattern.finditer(TEXT)), entry.key
+
+
+def test_overlapping_patterns_are_all_reported():
+    plan = ScanPlan([
+        ScanEntry("word", re.compile(r"\w+")),
+        ScanEntry("digits", re.compile(r"\d+")),
+        ScanEntry("shout", re.compile(r"(?i)AB")),
+    ])
+    found = plan.scan("ab12 x34")
+
+    assert _spans(found["word"]) == [(0, 4, "ab12"), (5, 8, "x34")]
+    assert _spans(found["digits"]) == [(2, 4, "12"), (6, 8, "34")]
+    assert _spans(found["shout"]) == [(0, 2, "ab")]
+
+
+def test_empty_plan_finds_nothing():
+    assert list(ScanPlan([]).iter_candidates("anything")) == []
+
+
+class _AltBackend:
+    """Second backend running on `re`, to exercise the per-backend alternations."""
+    name = "alt"
+    available = True
+
+    def compile(self, pattern):
+        return pattern
+
+    def compile_source(self, source):
+        return re.compile(source)
+
+
+def test_entries_split_across_backends_keep_finditer_semantics():
+    backends = RegexBackends(_AltBackend())
+    # RE2-safe patterns go to the second backend, the others stay on re
+    entries = [
+        ScanEntry(name, getattr(RegexPatterns, name),
+                  backends=frozenset({"re", "alt"} if "re2" in RegexPatterns.BACKENDS[name] else {"re"}))
+        for name in PATTERN_NAMES
+    ]
+    plan = ScanPlan(entries, backends)
+    found = plan.scan(TEXT)
+
+    assert len(plan._groups) == 2
+    for entry in entries:
+        assert _spans(found[entry.key]) == _spans(entry.pattern.finditer(TEXT)), entry.key
+
+
+def test_backend_selection_falls_back_to_stdlib():
+    backends = select_backends("re", "none")
+    assert backends.names == ("re",)
+    assert backends.compile(RegexPatterns.EMAIL, RegexPatterns.BACKENDS["EMAIL"])[1] is RegexPatterns.EMAIL
+    assert all(hasattr(RegexPatterns, name) for name in RegexPatterns.BACKENDS)
+
+
+NBSP_TEXT = (
+    "NIR 1\u00a085\u00a005\u00a078\u00a0006\u00a0084\u00a036, carte 5555\u202f4444\u202f3333\u202f2222, "
+    "RIB 30004\u00a000550\u00a000012345678\u00a012, 12\u00a0rue de la Paix, ref\u00a0MED-4432, "
+    "note\u00a015/20, contact\u00a0bob@example.com\u202f10.0.0.12\u00a0https://example.com/a b"
+)
+
+
+def test_patterns_declared_for_re2_match_like_re_on_nbsp():
+    # RE2's \s and \d are ASCII-only: patterns using them would miss NBSP/NNBSP-separated values
+    for name, backends in RegexPatterns.BACKENDS.items():
+        if "re2" in backends:
+            source = getattr(RegexPatterns, name).pattern
+            assert not any(cls in source for cls in ("\\s", "\\S", "\\d", "\\D")), name
+
+    pytest.importorskip("re2")
+    backend = RE2Backend()
+    for name, backends in RegexPatterns.BACKENDS.items():
+        if "re2" in backends:
+            pattern = getattr(RegexPatterns, name)
+            assert _spans(backend.compile(pattern).finditer(NBSP_TEXT)) == _spans(pattern.finditer(NBSP_TEXT)), name
@@ -0,0 +1,61 @@
+import pytest
+
+from whisper_network.anonymizers import AnonymizationEngine
+from whisper_network.term_lists import TermList, TermListRegistry, fold
+
+
+def _found(terms, text, **options):
+    return [text[start:end] for start, end in TermList(terms, use_automaton=False, **options).find(text)]
+
+
+def test_leftmost_longest_whole_words_case_folded():
+    terms = ["Phoenix", "projet phoenix", "ACME"]
+    text = "Le Projet PHOENIX d'Acme, phoenixien, ACMEs et acme."
+
+    assert _found(terms, text) == ["Projet PHOENIX", "Acme", "acme"]
+    assert _found(terms, text, whole_words=False) == ["Projet PHOENIX", "Acme", "phoenix", "ACME", "acme"]
+    assert _found(terms, text, case_sensitive=True) == []
+
+
+def test_terms_with_symbols_and_offsets_after_folding():
+    # "İ" lowercases to two characters: offsets must not shift
+    text = "İstanbul: #PRJ-42 done"
+    assert fold(text)[10:17] == "#prj-42"
+    assert _found(["#PRJ-42"], text) == ["#PRJ-42"]
+
+
+def test_automaton_and_trie_find_the_same_spans():
+    pytest.importorskip("ahocorasick")
+    terms = ["Phoenix", "projet phoenix", "ACME", "#PRJ-42", "hoe", "a"]
+    text = "İstanbul: le Projet PHOENIX d'Acme, phoenixien, ACMEs, #PRJ-42 et acme a b."
+
+    for options in ({}, {"whole_words": False}, {"case_sensitive": True}):
+        automaton = TermList(terms, use_automaton=True, **options)
+        assert automaton._automaton is not None
+        assert automaton.find(text) == TermList(terms, use_automaton=False, **options).find(text), options
+
+
+def test_registration_swaps_versions():
+    registry = TermListRegistry()
+    first = registry.register("acme", deny=["Phoenix"])
+    second = registry.register("acme", deny=["Atlas"], allow=["Orange"])
+
+    assert (first.version, second.version) == (1, 2)
+    assert registry.get("acme") is second and len(first.deny) == 1
+    assert registry.get_stats() == {"acme": {"version": 2, "deny_terms": 1, "allow_terms": 1}}
+    assert registry.remove("acme") and registry.get("acme") is None
+
+
+def test_engine_applies_tenant_lists():
+    engine = AnonymizationEngine()
+    engine.nlp = engine.nlp_fr = engine.nlp_en = None
+    engine.term_lists.register("acme", deny=["Projet Phoenix", "Durand"], allow=["support@acme.fr"])
+
+    text = "Projet Phoenix : écrire à support@acme.fr ou jean@acme.fr (M. Durand)"
+    result = engine.anonymize_sync(text, tenant_id="acme")
+
+    assert result.anonymized_text == (
+        "[CONFIDENTIEL_1] : écrire à support@acme.fr ou [EMAIL_1] (M. [CONFIDENTIEL_2])"
+    )
+    # Other tenants are unaffected
+    assert engine.anonymize_sync(text).anonymized_text.startswith("Projet Phoenix : écrire à [EMAIL_1]")
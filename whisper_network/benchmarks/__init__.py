@@ -0,0 +1,6 @@
+"""
+Benchmarks for the anonymization engines.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
@@ -0,0 +1,163 @@
+"""
+Full versus trimmed spaCy pipelines: latency, memory and entity output.
+
+Each spaCy package is loaded twice, full and NER-only (see
+whisper_network/nlp_models.py), each time in a fresh process so that peak
+RSS can be measured. Per-document latency is the median over sample texts,
+and the entities (start, end, label) of both variants are compared: any
+difference is a regression of the trimmed pipeline.
+
+Usage (from the whisper_network/ directory):
+    python -m benchmarks.ner_pipelines --output ner-pipelines.json
+    python -m benchmarks.ner_pipelines --fail-on-diff
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from whisper_network.nlp_models import load_ner_model
+
+REPORT_VERSION = 1
+
+MODELS = {
+    "fr": "fr_core_news_sm",
+    "en": "en_core_web_sm",
+}
+
+SAMPLE_TEXTS: Dict[str, List[str]] = {
+    "fr": [
+        "Bonjour, je m'appelle Jean Dupont et je travaille chez Renault à Boulogne-Billancourt.",
+        "Marie Curie a rejoint l'équipe de Sophie Martin à Lyon le 3 mars.",
+        "Merci de transmettre le dossier à Maître Lefèvre avant vendredi.",
+        "La réunion avec Pierre et Camille Bernard est reportée à Marseille.",
+        "Candidature de Thomas Girard pour le poste de data scientist chez Capgemini.",
+    ],
+    "en": [
+        "Hi, my name is John Smith and I work for Microsoft in Seattle.",
+        "Please forward the contract to Emily Johnson before Friday.",
+        "The meeting with Robert Brown and Alice Walker moved to London.",
+        "Dear Mr. Anderson, your application to Google has been received.",
+        "Sarah Connor met Kyle Reese at the Los Angeles police station.",
+    ],
+}
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process, in MB (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(model: str, trimmed: bool, texts: Sequence[str], repeat: int = 20) -> Dict:
+    """Load one variant in this process and measure it."""
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    nlp = load_ner_model(model, trimmed=trimmed)
+    load_s = time.perf_counter() - start
+    rss_loaded = _peak_rss_mb()
+
+    nlp(texts[0])  # Warm-up
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            nlp(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "components": list(nlp.pipe_names),
+        "load_s": round(load_s, 3),
+        "model_rss_mb": round(rss_loaded - rss_before, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "latency_ms_median": round(statistics.median(latencies), 3),
+        "entities": [[[ent.start_char, ent.end_char, ent.label_] for ent in nlp(text).ents] for text in texts],
+    }
+
+
+def measure_in_subprocess(model: str, trimmed: bool, language: str, repeat: int) -> Dict:
+    """Run measure() in a fresh interpreter, so each variant's memory is measured alone."""
+    command = [sys.executable, "-m", "benchmarks.ner_pipelines", "--measure", model, language,
+               "--repeat", str(repeat)] + ([] if trimmed else ["--full"])
+    completed = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def entity_differences(full: Dict, trimmed: Dict, texts: Sequence[str]) -> List[str]:
+    """Texts whose entities differ between the full and trimmed pipelines."""
+    return [
+        f"{text[:50]!r}: {full_ents} != {trimmed_ents}"
+        for text, full_ents, trimmed_ents in zip(texts, full["entities"], trimmed["entities"])
+        if full_ents != trimmed_ents
+    ]
+
+
+def run_benchmark(languages: Sequence[str] = tuple(MODELS), repeat: int = 20) -> Dict:
+    """Measure both variants of every model and build the report."""
+    results = {}
+    for language in languages:
+        full = measure_in_subprocess(MODELS[language], False, language, repeat)
+        trimmed = measure_in_subprocess(MODELS[language], True, language, repeat)
+        results[language] = {
+            "model": MODELS[language],
+            "full": full,
+            "trimmed": trimmed,
+            "latency_saved_pct": round(100 * (1 - trimmed["latency_ms_median"] / full["latency_ms_median"]), 1),
+            "rss_saved_mb": round(full["peak_rss_mb"] - trimmed["peak_rss_mb"], 1),
+            "entity_differences": entity_differences(full, trimmed, SAMPLE_TEXTS[language]),
+        }
+    return {
+        "version": REPORT_VERSION,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "languages": results,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Full versus trimmed spaCy pipelines")
+    parser.add_argument("--language", action="append", choices=sorted(MODELS), help="Only benchmark these languages")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs over the sample texts")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument("--fail-on-diff", action="store_true", help="Exit with status 1 if entities differ")
+    parser.add_argument("--measure", nargs=2, metavar=("MODEL", "LANGUAGE"), help=argparse.SUPPRESS)
+    parser.add_argument("--full", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        model, language = args.measure
+        print(json.dumps(measure(model, not args.full, SAMPLE_TEXTS[language], args.repeat)))
+        return 0
+
+    report = run_benchmark(args.language or tuple(MODELS), args.repeat)
+    rendered = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(rendered + "\n")
+    else:
+        print(rendered)
+
+    differences = False
+    for language, result in report["languages"].items():
+        print(f"{result['model']}: latency -{result['latency_saved_pct']} %, RSS -{result['rss_saved_mb']} MB",
+              file=sys.stderr)
+        for line in result["entity_differences"]:
+            differences = True
+            print(f"⚠️  {language} entities differ: {line}", file=sys.stderr)
+
+    return 1 if args.fail_on_diff and differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+ReDoS / worst-case latency fuzz benchmark for every regex detector.
+
+Each pattern of `RegexPatterns` and `FastAnonymizer._compile_patterns` is run
+against adversarial inputs of growing length (long digit runs, accented
+letters, repeated separators, near-miss emails, minified JSON...). The scan
+time is fitted against the input length on a log-log scale: an exponent
+clearly above 1 means the pattern backtracks super-linearly.
+
+Usage (from the whisper_network/ directory):
+    python -m benchmarks.redos --output redos-report.json
+    python -m benchmarks.redos --compare redos-report-1.0.0.json
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Pattern, Sequence
+
+from whisper_network.anonymizers import RegexPatterns
+from whisper_network.fast_anonymizer import FastAnonymizer
+
+REPORT_VERSION = 1
+DEFAULT_SIZES = (500, 1000, 2000, 4000)
+DEFAULT_THRESHOLD = 1.5     # Growth exponent above which a pattern is flagged
+MIN_SIGNIFICANT_MS = 0.05   # Timings below this are noise, not growth
+TIME_BUDGET_MS = 2000.0     # Stop growing an input once a scan exceeds this
+
+
+def _repeat(unit: str) -> Callable[[int], str]:
+    """Generator repeating a unit up to exactly n characters."""
+    return lambda n: (unit * (n // len(unit) + 1))[:n]
+
+
+# Adversarial input families, by name
+GENERATORS: Dict[str, Callable[[int], str]] = {
+    "digit_run": _repeat("7"),
+    "digit_groups": _repeat("12 "),
+    "dotted_digits": _repeat("1."),
+    "accented_letters": _repeat("é"),
+    "accented_words": _repeat("Élodie Dupré "),
+    "repeated_separators": _repeat(" -"),
+    "whitespace_run": _repeat(" \t"),
+    "near_miss_email": _repeat("a.b"),
+    "at_signs": _repeat("x@"),
+    "street_like": lambda n: ("12 rue " + "de la Paix " * (n // 11 + 1))[:n],
+    "salary_like": _repeat("3500 € "),
+    "coordinates_like": _repeat("48.8566 , "),
+    "minified_json": _repeat('{"id":12345,"mail":"a.b@c","tel":"0612"},'),
+}
+
+
+def collect_patterns() -> Dict[str, Pattern]:
+    """Every detector pattern, keyed by owner and name."""
+    patterns = {f"RegexPatterns.{name}": getattr(RegexPatterns, name) for name in RegexPatterns.BACKENDS}
+    for name, pattern in FastAnonymizer().pattern_cache.items():
+        patterns[f"FastAnonymizer.{name}"] = pattern
+    return patterns
+
+
+def time_scan(pattern: Pattern, text: str, repeat: int = 3) -> float:
+    """Best-of-n time, in milliseconds, of a full finditer scan."""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in pattern.finditer(text):
+            pass
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def growth_exponent(sizes: Sequence[int], times_ms: Sequence[float]) -> Optional[float]:
+    """
+    Least-squares slope of log(time) against log(size).
+
+    Returns None when fewer than two timings are above the noise floor.
+    """
+    points = [(math.log(n), math.log(t)) for n, t in zip(sizes, times_ms) if t >= MIN_SIGNIFICANT_MS]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+def benchmark_pattern(
+    pattern: Pattern,
+    sizes: Sequence[int],
+    threshold: float = DEFAULT_THRESHOLD,
+    generators: Optional[Dict[str, Callable[[int], str]]] = None,
+    repeat: int = 3
+) -> Dict:
+    """Measure one pattern against every input family."""
+    inputs = {}
+    worst = None
+    for family, generate in sorted((generators or GENERATORS).items()):
+        measured_sizes: List[int] = []
+        times: List[float] = []
+        for size in sizes:
+            elapsed = time_scan(pattern, generate(size), repeat)
+            measured_sizes.append(size)
+            times.append(round(elapsed, 3))
+            if elapsed > TIME_BUDGET_MS:
+                break
+        exponent = growth_exponent(measured_sizes, times)
+        # Hitting the time budget on the largest input is a flag by itself
+        super_linear = (exponent is not None and exponent > threshold) or times[-1] > TIME_BUDGET_MS
+        inputs[family] = {
+            "sizes": measured_sizes,
+            "times_ms": times,
+            "exponent": None if exponent is None else round(exponent, 2),
+            "super_linear": super_linear,
+        }
+        if exponent is not None and (worst is None or exponent > worst):
+            worst = exponent
+
+    return {
+        "worst_exponent": None if worst is None else round(worst, 2),
+        "super_linear": any(result["super_linear"] for result in inputs.values()),
+        "inputs": inputs,
+    }
+
+
+def run_benchmark(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    threshold: float = DEFAULT_THRESHOLD,
+    patterns: Optional[Dict[str, Pattern]] = None,
+    generators: Optional[Dict[str, Callable[[int], str]]] = None,
+    repeat: int = 3
+) -> Dict:
+    """Benchmark every pattern and build the report."""
+    patterns = patterns if patterns is not None else collect_patterns()
+    results = {
+        name: benchmark_pattern(pattern, sizes, threshold, generators, repeat)
+        for name, pattern in sorted(patterns.items())
+    }
+    return {
+        "version": REPORT_VERSION,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sizes": list(sizes),
+        "threshold": threshold,
+        "flagged": [name for name, result in results.items() if result["super_linear"]],
+        "patterns": results,
+    }
+
+
+def compare_reports(previous: Dict, current: Dict) -> List[str]:
+    """Human-readable regressions between two reports (new flags, exponent increases)."""
+    lines = []
+    before = previous.get("patterns", {})
+    for name, result in current["patterns"].items():
+        old = before.get(name)
+        if old is None:
+            lines.append(f"+ {name}: new pattern (worst exponent {result['worst_exponent']})")
+            continue
+        if result["super_linear"] and not old["super_linear"]:
+            lines.append(f"! {name}: now super-linear ({old['worst_exponent']} -> {result['worst_exponent']})")
+        elif old["super_linear"] and not result["super_linear"]:
+            lines.append(f"  {name}: no longer super-linear ({old['worst_exponent']} -> {result['worst_exponent']})")
+    for name in before:
+        if name not in current["patterns"]:
+            lines.append(f"- {name}: removed")
+    return lines
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ReDoS / worst-case latency benchmark for the regex detectors")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Input lengths to test")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Flag growth exponents above this")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    parser.add_argument("--pattern", action="append", help="Only benchmark patterns containing this substring")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    parser.add_argument("--fail-on-flag", action="store_true", help="Exit with status 1 if a pattern is flagged")
+    args = parser.parse_args(argv)
+
+    patterns = collect_patterns()
+    if args.pattern:
+        patterns = {name: p for name, p in patterns.items() if any(s in name for s in args.pattern)}
+
+    report = run_benchmark(sorted(args.sizes), args.threshold, patterns, repeat=args.repeat)
+    rendered = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(rendered + "\n")
+    else:
+        print(rendered)
+
+    for name in report["flagged"]:
+        print(f"⚠️  super-linear: {name} (exponent {report['patterns'][name]['worst_exponent']})", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        for line in compare_reports(previous, report):
+            print(line, file=sys.stderr)
+
+    return 1 if args.fail_on_flag and report["flagged"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
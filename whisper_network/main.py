@@ -10,14 +10,16 @@ License: MIT
 from fastapi import FastAPI, HTTPException, Security, Request, UploadFile, File, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 import uvicorn
 from datetime import datetime
 import os
 import logging
 import io
+import contextlib
 import uuid
 from dotenv import load_dotenv
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -30,9 +32,15 @@ from whisper_network import AnonymizationEngine, AnonymizationSettings
 from whisper_network.fast_anonymizer import FastAnonymizer
 from whisper_network.file_handler import FileHandler
 from whisper_network.session_manager import get_session_manager
+from whisper_network.executor import BoundedExecutor, ExecutorSaturated
+from whisper_network.ner_batcher import NerBatcher
+from whisper_network.model_loading import ModelsNotReady
+from whisper_network.pipeline_cache import UnknownProfile
+from whisper_network.keyed_tokens import get_default_tokenizer
 from whisper_network.cache_manager import get_cache
 from whisper_network.database import get_db, init_db, close_db
 from whisper_network.models import UserPreferences
+from whisper_network.config import get_setting
 
 # Load environment variables
 load_dotenv()
@@ -50,6 +58,15 @@ CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
 RATE_LIMIT_PER_MINUTE = os.getenv("RATE_LIMIT_PER_MINUTE", "10")
 
+# Per-request time budget (config.toml [performance] request_timeout, ms).
+# Past it, expensive stages (addresses, names) are skipped and reported.
+REQUEST_TIMEOUT_MS = float(os.getenv("REQUEST_TIMEOUT_MS", get_setting("performance", "request_timeout", 5000)))
+
+# File uploads get their own, larger budget ([performance] file_request_timeout,
+# ms, 0 = none): a file whose expensive stages were skipped is refused, never
+# returned partly anonymized.
+FILE_REQUEST_TIMEOUT_MS = float(os.getenv("FILE_REQUEST_TIMEOUT_MS", get_setting("performance", "file_request_timeout", 60000))) or None
+
 # API Key security
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
@@ -92,8 +109,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Detection and NER run on a bounded thread pool (config.toml [executor]),
+# so long prompts never block health checks or lightweight endpoints
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", get_setting("executor", "workers", 1)))
+EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", get_setting("executor", "max_queue", 32)))
+
+# Concurrent requests' NER calls are batched through nlp.pipe (config.toml [ner_batching]):
+# a batch waits at most max_wait_ms for up to max_batch texts
+NER_BATCHER = None
+if get_setting("ner_batching", "enabled", True):
+    NER_BATCHER = NerBatcher(
+        max_batch=int(get_setting("ner_batching", "max_batch", 32)),
+        max_wait_ms=float(get_setting("ner_batching", "max_wait_ms", 5)),
+        batch_size=int(get_setting("performance", "batch_size", 100))
+    )
+
+# NER models load in the background (config.toml [ner]): regex-only requests
+# are served at once, requests needing NER meanwhile follow NER_POLICY
+NER_POLICY = os.getenv("NER_POLICY", get_setting("ner", "policy", "degrade"))
+NER_WAIT_MS = float(os.getenv("NER_WAIT_MS", get_setting("ner", "wait_ms", 2000)))
+
 # Initialize anonymization engines
-anonymization_engine = AnonymizationEngine()
+anonymization_engine = AnonymizationEngine(
+    executor=BoundedExecutor(EXECUTOR_WORKERS, EXECUTOR_MAX_QUEUE),
+    ner_batcher=NER_BATCHER,
+    trim_pipelines=get_setting("ner", "trimmed_pipelines", True),
+    sentencizer=get_setting("ner", "sentencizer", False),
+    background_loading=get_setting("ner", "background_loading", True),
+    ner_policy=NER_POLICY,
+    ner_wait_ms=NER_WAIT_MS
+)
 fast_anonymizer = FastAnonymizer()  # Moteur optimisé pour modèles locaux
 file_handler = FileHandler()  # Gestionnaire de fichiers
 
@@ -102,6 +147,7 @@ file_handler = FileHandler()  # Gestionnaire de fichiers
 async def startup_event():
     """Initialize database connection on startup."""
     logger.info("🚀 Starting Whisper Network API...")
+    anonymization_engine.start_model_loading()
     await init_db()
     logger.info("✅ Database initialized")
 
@@ -131,9 +177,12 @@ def get_default_anonymization_settings():
 class AnonymizeRequest(BaseModel):
     text: str
     settings: Dict[str, bool] = Field(default_factory=get_default_anonymization_settings)
-    session_id: Optional[str] = Field(None, description="Optional session ID for mapping persistence")
+    session_id: Optional[str] = Field(None, description="Optional session ID for mapping persistence (later turns keep its tokens and reuse the paragraphs already anonymized)")
     ttl: int = Field(3600, ge=60, le=86400, description="Cache TTL in seconds (1h default, max 24h)")
     preserve_mapping: bool = Field(True, description="Store mappings for de-anonymization")
+    profile_id: Optional[str] = Field(None, description="Settings profile returned by a previous call, sent instead of settings")
+    tenant_id: Optional[str] = Field(None, description="Tenant whose deny/allow lists apply")
+    token_mode: Optional[Literal["sequential", "keyed"]] = Field(None, description="'sequential' tokens ([EMAIL_1]) or 'keyed' tokens derived from the value and the session ([EMAIL_7f3a9c], identical on every replica)")
 
 class AnonymizeResponse(BaseModel):
     success: bool
@@ -143,6 +192,21 @@ class AnonymizeResponse(BaseModel):
     processing_time_ms: float
     mapping_summary: Optional[Dict[str, Dict[str, str]]] = None
     session_id: Optional[str] = Field(None, description="Session ID if mapping preserved")
+    profile_id: Optional[str] = Field(None, description="Settings profile to reuse in later requests")
+    degraded_stages: List[str] = Field(default_factory=list, description="Detection stages skipped to meet the request deadline (\"ner\": names found by regex only while models load)")
+
+class TermListsRequest(BaseModel):
+    deny: List[str] = Field(default_factory=list, description="Terms always anonymized (client, project or employee names)")
+    allow: List[str] = Field(default_factory=list, description="Terms never anonymized")
+    case_sensitive: bool = Field(False, description="Match the exact case")
+    whole_words: bool = Field(True, description="Only match whole words")
+
+class TermListsResponse(BaseModel):
+    success: bool
+    tenant_id: str
+    version: int
+    deny_terms: int
+    allow_terms: int
 
 class DeanonymizeRequest(BaseModel):
     text: str
@@ -190,7 +254,8 @@ async def root():
         "author": "Sylvain JOLY, NANO by NXO",
         "license": "MIT",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready"
     }
 
 @app.get("/health")
@@ -202,6 +267,17 @@ async def health_check():
         "service": "whisper-network-api"
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness of the NER models (per model: pending, loading, ready,
+    unavailable or failed). 503 while they load; regex-only requests are
+    served meanwhile, NER requests according to the NER policy.
+    """
+    readiness = anonymization_engine.models.get_stats()
+    readiness["ner_policy"] = anonymization_engine.ner_policy
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
 @app.post("/anonymize", response_model=AnonymizeResponse)
 @limiter_decorator
 async def anonymize_text(request: Request, body: AnonymizeRequest, api_key: str = Security(verify_api_key)):
@@ -220,32 +296,54 @@ async def anonymize_text(request: Request, body: AnonymizeRequest, api_key: str
         if not body.text:
             raise HTTPException(status_code=400, detail="Text cannot be empty")
         
-        # Process anonymization using the advanced engine
-        result = await anonymization_engine.anonymize(body.text, body.settings)
-        
-        if not result.success:
-            logger.error(f"Anonymization failed: {'; '.join(result.errors)}")
-            raise HTTPException(status_code=500, detail=f"Anonymization failed: {'; '.join(result.errors)}")
-        
-        session_id = None
-        
-        # Store mappings if requested
-        if body.preserve_mapping and result.mapping_summary:
-            session_manager = get_session_manager()
+        settings = body.settings
+        if body.token_mode:
+            settings = {**settings, "token_mode": body.token_mode}
+        
+        # The session is known before anonymizing: keyed tokens are derived for it
+        session_id = body.session_id
+        if body.preserve_mapping and not session_id:
+            session_id = str(uuid.uuid4())
+        
+        # Turns of a session, new or existing, run one at a time: each one
+        # continues the mappings, counters and paragraphs stored by the previous one
+        sessions = get_session_manager()
+        async with sessions.lock(session_id) if body.preserve_mapping else contextlib.nullcontext():
+            # Continue the session's conversation (empty for its first turn):
+            # same tokens, paragraphs already seen reused
+            conversation = sessions.get_conversation(session_id) if body.preserve_mapping else None
             
-            # Use provided session_id or create new one
-            if body.session_id:
-                session_id = body.session_id
-            else:
-                session_id = session_manager.create_session(ttl=body.ttl)
+            # Process anonymization using the advanced engine; compiled settings
+            # are reused when the client sends a profile_id the engine still knows
+            try:
+                result = await anonymization_engine.anonymize(
+                    body.text, settings, profile_id=body.profile_id, deadline_ms=REQUEST_TIMEOUT_MS,
+                    tenant_id=body.tenant_id, conversation=conversation, session_id=session_id
+                )
+            except UnknownProfile:
+                # Raised before any work: fall back to the settings sent alongside
+                if "settings" not in body.model_fields_set:
+                    raise HTTPException(status_code=404, detail=f"Unknown or expired profile_id: {body.profile_id}")
+                result = await anonymization_engine.anonymize(
+                    body.text, settings, deadline_ms=REQUEST_TIMEOUT_MS,
+                    tenant_id=body.tenant_id, conversation=conversation, session_id=session_id
+                )
             
-            # Store mappings
-            session_manager.store_mappings(
-                session_id=session_id,
-                mappings=result.mapping_summary,
-                ttl=body.ttl
-            )
-            logger.info(f"Stored mappings for session: {session_id}")
+            if not result.success:
+                logger.error(f"Anonymization failed: {'; '.join(result.errors)}")
+                raise HTTPException(status_code=500, detail=f"Anonymization failed: {'; '.join(result.errors)}")
+            
+            # Store mappings if requested (the session is created if new)
+            if body.preserve_mapping and (result.mapping_summary or body.session_id):
+                # Store mappings, counters and paragraph index
+                sessions.store_conversation(
+                    session_id=session_id,
+                    conversation=conversation,
+                    ttl=body.ttl
+                )
+                logger.info(f"Stored mappings for session: {session_id}")
+            else:
+                session_id = None
         
         logger.info(f"Anonymization successful: {result.anonymizations_count} replacements")
         return AnonymizeResponse(
@@ -255,11 +353,19 @@ async def anonymize_text(request: Request, body: AnonymizeRequest, api_key: str
             anonymizations_count=result.anonymizations_count,
             processing_time_ms=result.processing_time_ms,
             mapping_summary=result.mapping_summary,
-            session_id=session_id
+            session_id=session_id,
+            profile_id=result.profile_id,
+            degraded_stages=result.degraded_stages
         )
     
     except HTTPException:
         raise
+    except ExecutorSaturated as e:
+        logger.warning(f"Anonymization refused, executor saturated: {e}")
+        raise HTTPException(status_code=503, detail="Server busy, retry later")
+    except ModelsNotReady as e:
+        logger.warning(f"Anonymization refused: {e}")
+        raise HTTPException(status_code=503, detail="NER models loading, retry later", headers={"Retry-After": "5"})
     except Exception as e:
         logger.exception("Unexpected error during anonymization")
         raise HTTPException(status_code=500, detail=f"Anonymization failed: {str(e)}")
@@ -287,7 +393,13 @@ async def anonymize_text_fast(request: Request, body: AnonymizeRequest, api_key:
         # Pas besoin de fusionner, Pydantic le fait automatiquement
         
         # Créer une nouvelle instance pour chaque requête (cache frais + tokens cohérents)
-        anonymizer = FastAnonymizer()
+        # Keyed tokens are scoped to the session and sized like the engine's (see _new_mapper)
+        tokenizer = None
+        if body.token_mode == "keyed":
+            tokenizer = get_default_tokenizer().for_scope(
+                body.session_id, anonymization_engine.settings.keyed_token_length
+            )
+        anonymizer = FastAnonymizer(tokenizer)
         
         # Process anonymization using the fast engine
         result = await anonymizer.anonymize_fast(body.text, body.settings)
@@ -388,7 +500,7 @@ async def anonymize_file(
             anonymizer = FastAnonymizer()
             result = await anonymizer.anonymize_fast(file_info.content, settings)
         else:
-            result = await anonymization_engine.anonymize(file_info.content, settings)
+            result = await anonymization_engine.anonymize(file_info.content, settings, deadline_ms=FILE_REQUEST_TIMEOUT_MS)
         
         if not result.success:
             logger.error(f"File anonymization failed: {'; '.join(result.errors)}")
@@ -397,6 +509,17 @@ async def anonymize_file(
                 detail=f"Anonymization failed: {'; '.join(result.errors)}"
             )
         
+        # A downloaded file must be fully anonymized: skipped stages (deadline
+        # spent, NER models loading) would leave names or addresses in it
+        degraded_stages = getattr(result, "degraded_stages", [])
+        if degraded_stages:
+            logger.warning(f"File anonymization refused, stages skipped: {', '.join(degraded_stages)}")
+            raise HTTPException(
+                status_code=503,
+                detail=f"File could not be fully anonymized (skipped: {', '.join(degraded_stages)}), retry later",
+                headers={"Retry-After": "5"}
+            )
+        
         # Export anonymized file
         new_filename, anonymized_bytes = await file_handler.export_file(
             file_info.filename,
@@ -421,6 +544,12 @@ async def anonymize_file(
     
     except HTTPException:
         raise
+    except ExecutorSaturated as e:
+        logger.warning(f"File anonymization refused, executor saturated: {e}")
+        raise HTTPException(status_code=503, detail="Server busy, retry later")
+    except ModelsNotReady as e:
+        logger.warning(f"File anonymization refused: {e}")
+        raise HTTPException(status_code=503, detail="NER models loading, retry later", headers={"Retry-After": "5"})
     except ValueError as e:
         # Validation errors from file_handler
         logger.warning(f"File validation error: {e}")
@@ -548,12 +677,68 @@ async def delete_session(request: Request, session_id: str, api_key: str = Secur
         logger.exception("Error deleting session")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.put("/lists/{tenant_id}", response_model=TermListsResponse)
+async def register_term_lists(tenant_id: str, body: TermListsRequest, api_key: str = Security(verify_api_key)):
+    """
+    Register a new version of a tenant's deny/allow lists (replaces the previous one).
+    
+    Lists are compiled in a worker thread and swapped in without restart;
+    requests sent with this `tenant_id` use them from then on.
+    """
+    try:
+        lists = await run_in_threadpool(
+            anonymization_engine.term_lists.register,
+            tenant_id, body.deny, body.allow, body.case_sensitive, body.whole_words
+        )
+        return TermListsResponse(
+            success=True,
+            tenant_id=tenant_id,
+            version=lists.version,
+            deny_terms=len(lists.deny) if lists.deny else 0,
+            allow_terms=len(lists.allow) if lists.allow else 0
+        )
+    except Exception as e:
+        logger.exception("Error registering term lists")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/lists/{tenant_id}", response_model=TermListsResponse)
+async def get_term_lists(tenant_id: str, api_key: str = Security(verify_api_key)):
+    """Get the version and sizes of a tenant's deny/allow lists."""
+    lists = anonymization_engine.term_lists.get(tenant_id)
+    if lists is None:
+        raise HTTPException(status_code=404, detail=f"No term lists for tenant: {tenant_id}")
+    return TermListsResponse(
+        success=True,
+        tenant_id=tenant_id,
+        version=lists.version,
+        deny_terms=len(lists.deny) if lists.deny else 0,
+        allow_terms=len(lists.allow) if lists.allow else 0
+    )
+
+@app.delete("/lists/{tenant_id}")
+async def delete_term_lists(tenant_id: str, api_key: str = Security(verify_api_key)):
+    """Remove a tenant's deny/allow lists."""
+    if not anonymization_engine.term_lists.remove(tenant_id):
+        raise HTTPException(status_code=404, detail=f"No term lists for tenant: {tenant_id}")
+    return {"success": True, "message": f"Term lists of tenant {tenant_id} removed"}
+
 @app.get("/cache/stats")
 async def get_cache_stats(api_key: str = Security(verify_api_key)):
     """Get cache statistics (Redis or in-memory)."""
     try:
         cache = get_cache()
-        return cache.get_stats()
+        stats = cache.get_stats()
+        stats["pipeline_cache"] = anonymization_engine.pipelines.get_stats()
+        stats["prefilter"] = {
+            "engine": anonymization_engine.prefilter.get_stats(),
+            "fast": FastAnonymizer.prefilter.get_stats(),
+        }
+        stats["detectors"] = anonymization_engine.detectors.get_stats()
+        stats["term_lists"] = anonymization_engine.term_lists.get_stats()
+        stats["executor"] = anonymization_engine.executor.get_stats()
+        if anonymization_engine.ner_batcher is not None:
+            stats["ner_batching"] = anonymization_engine.ner_batcher.get_stats()
+        return stats
     except Exception as e:
         logger.exception("Error getting cache stats")
         raise HTTPException(status_code=500, detail=str(e))
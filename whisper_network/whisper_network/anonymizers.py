@@ -6,45 +6,53 @@ License: MIT
 Copyright (c) 2025 Sylvain JOLY, NANO by NXO
 """
 
-import re
 import asyncio
+import importlib.util
+import re
 import logging
-from typing import Dict, List, Tuple, Optional, Any
-from dataclasses import dataclass, field
+import threading
+from typing import AbstractSet, Callable, Dict, List, Tuple, Optional, Any, FrozenSet, Iterable, Pattern, Sequence, Set, Union
+from dataclasses import dataclass, field, replace
 from enum import Enum
 import time
 
+from .conversation import ConversationState, split_paragraphs
+from .detectors import TIER_NAMES, TIER_SECONDARY, Detector, DetectorRegistry, Stage, uncovered_text
+from .document import TITLE, UPPER, AnalyzedDocument, DocSpan
+from .executor import BoundedExecutor
+from .ip_ranges import PUBLIC, classify_ipv4, classify_ipv6
+from .keyed_tokens import DEFAULT_TOKEN_LENGTH, DIGEST_LENGTH, MIN_TOKEN_LENGTH, KeyedTokenizer, get_default_tokenizer
+from .match_store import MatchStore
+from .model_loading import NER_POLICIES, NER_POLICY_WAIT, ModelLoader, ModelsNotReady
+from .ner_batcher import NerBatcher
+from .nlp_models import load_ner_model
+from .overlap import IntervalIndex, resolve_overlaps
+from .numeric_runs import LUHN, MOD97
+from .pipeline_cache import CompiledPipeline, PipelineCache, UnknownProfile
+from .prefilter import PiiPrefilter, Trigger
+from .regex_backends import HYPERSCAN, RE2, STDLIB, RegexBackends, select_backends
+from .scan_plan import ScanEntry, ScanPlan
+from .term_lists import TenantLists, TermListRegistry
+
 logger = logging.getLogger(__name__)
 
-try:
-    import spacy
-    SPACY_AVAILABLE = True
-except ImportError:
-    SPACY_AVAILABLE = False
-    spacy = None
+# spaCy and CamemBERT (and torch through them) are heavy: they are only
+# imported when an engine loads its models, so the core imports fast
+SPACY_AVAILABLE = importlib.util.find_spec("spacy") is not None
 
 # CamemBERT NER for advanced French entity detection
-try:
-    from .camembert_ner import get_camembert_ner, is_camembert_available, NEREntityType
-    CAMEMBERT_AVAILABLE = is_camembert_available()
-except ImportError:
-    CAMEMBERT_AVAILABLE = False
-    get_camembert_ner = None
+CAMEMBERT_AVAILABLE = importlib.util.find_spec(".camembert_ner", __package__) is not None
 
-# CamemBERT NER for advanced French entity detection
 try:
-    from .camembert_ner import get_camembert_ner, is_camembert_available, NEREntityType
-    CAMEMBERT_AVAILABLE = is_camembert_available()
-except ImportError:
-    CAMEMBERT_AVAILABLE = False
-    get_camembert_ner = None
-
-try:
-    from langdetect import detect, LangDetectException
+    from langdetect import DetectorFactory, detect, LangDetectException
+    from langdetect.detector_factory import init_factory
+    # langdetect samples the text randomly: seeded, a text always gets the same language
+    DetectorFactory.seed = 0
     LANGDETECT_AVAILABLE = True
 except ImportError:
     LANGDETECT_AVAILABLE = False
     detect = None
+    init_factory = None
     LangDetectException = Exception
 
 
@@ -102,34 +110,199 @@ class AnonymizationType(Enum):
     
     # URLs et références
     URL = "url"
+    
+    # Listes personnalisées (deny-lists par tenant)
+    CUSTOM_TERM = "custom_term"
+
+
+# Detection stages (passes) of a request. Tenant deny-lists run whenever the
+# tenant has one. Structured regex detectors
+# (emails, phones, IPs, IDs...) share one scan and always run; addresses and
+# names may be skipped when a request runs out of time.
+STAGE_CUSTOM_TERMS = "custom_terms"
+STAGE_STRUCTURED = "structured"
+STAGE_ADDRESSES = "addresses"
+STAGE_NAMES = "names"
+
+# Reported in degraded_stages when names were found by regex only, the NER
+# models still loading (see model_loading.py)
+DEGRADED_NER = "ner"
+
+
+# Every entity family, in overlap priority order within each tier. Triggers
+# are cheap necessary conditions: a family whose trigger is absent from the
+# text cannot match and is skipped (see prefilter.py). Costs are initial
+# estimates in µs per 1000 characters, refined from measured stage timings.
+_DIGITS = Trigger(digits=True)
+DETECTORS: Tuple[Detector, ...] = (
+    # Tenant deny-lists: always anonymized (see term_lists.py)
+    Detector(STAGE_CUSTOM_TERMS, (AnonymizationType.CUSTOM_TERM,), STAGE_CUSTOM_TERMS, cost=3.0),
+    # Structured identifiers (primary detectors)
+    Detector("email", (AnonymizationType.EMAIL,), STAGE_STRUCTURED, cost=4.0, trigger=Trigger(chars=("@",))),
+    Detector("phone", (AnonymizationType.PHONE,), STAGE_STRUCTURED, cost=8.0, trigger=_DIGITS),
+    Detector("ipv4", (AnonymizationType.IP_PRIVATE, AnonymizationType.IP_PUBLIC, AnonymizationType.IP_ADDRESS),
+             STAGE_STRUCTURED, cost=4.0, trigger=_DIGITS),
+    Detector("ipv6", (AnonymizationType.IP_PRIVATE, AnonymizationType.IP_PUBLIC), STAGE_STRUCTURED,
+             cost=4.0, trigger=Trigger(chars=(":",))),
+    Detector("url", (AnonymizationType.URL,), STAGE_STRUCTURED, cost=4.0, trigger=Trigger(chars=("://",))),
+    Detector("nir", (AnonymizationType.NIR,), STAGE_STRUCTURED, cost=6.0, trigger=_DIGITS),
+    Detector("medical_ref", (AnonymizationType.MEDICAL_REFERENCE,), STAGE_STRUCTURED, cost=2.0,
+             trigger=Trigger(keywords=("ref", "réf", "dossier", "num"))),
+    Detector(STAGE_ADDRESSES, (AnonymizationType.ADDRESS,), STAGE_ADDRESSES, cost=150.0,
+             trigger=_DIGITS, degradable=True),
+    # Named entities
+    Detector(STAGE_NAMES, (AnonymizationType.NAME, AnonymizationType.INTERNAL_COMMUNICATION, AnonymizationType.LOCATION),
+             STAGE_NAMES, tier=TIER_NAMES, cost=5000.0, trigger=Trigger(uppercase=True), needs_ner=True, degradable=True),
+    # Secondary detectors
+    Detector("id_card", (AnonymizationType.ID_CARD,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=4.0, trigger=_DIGITS),
+    Detector("passport", (AnonymizationType.PASSPORT,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=4.0, trigger=_DIGITS),
+    Detector("login", (AnonymizationType.LOGIN,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=2.0,
+             trigger=Trigger(keywords=("login", "user", "identifiant"))),
+    Detector("employee_id", (AnonymizationType.EMPLOYEE_ID,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=2.0,
+             trigger=Trigger(keywords=("matricule", "emp"))),
+    Detector("salary", (AnonymizationType.SALARY_DATA,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=4.0, trigger=_DIGITS),
+    Detector("medical", (AnonymizationType.MEDICAL_DATA,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=2.0,
+             trigger=Trigger(keywords=("diagnostic", "pathologie", "traitement", "médicament", "ordonnance", "consultation"))),
+    Detector("bank_account", (AnonymizationType.BANK_ACCOUNT,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=4.0, trigger=_DIGITS),
+    Detector("grades", (AnonymizationType.GRADES,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=4.0, trigger=_DIGITS),
+    Detector("legal_case", (AnonymizationType.LEGAL_CASE,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=2.0,
+             trigger=Trigger(keywords=("dossier", "affaire", "proc", "plainte"))),
+    Detector("geolocation", (AnonymizationType.GEOLOCATION,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=4.0, trigger=_DIGITS),
+    Detector("biometric", (AnonymizationType.BIOMETRIC,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=2.0,
+             trigger=Trigger(keywords=("empreinte", "biométrie", "reconnaissance", "scan", "capteur"))),
+    Detector("credit_card", (AnonymizationType.CREDIT_CARD,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=4.0, trigger=_DIGITS),
+    Detector("iban", (AnonymizationType.IBAN,), STAGE_STRUCTURED, tier=TIER_SECONDARY, cost=4.0, trigger=_DIGITS),
+)
+
+# Prefilter trigger of each family (scan entry key or stage)
+DETECTOR_TRIGGERS: Dict[str, Optional[Trigger]] = {detector.name: detector.trigger for detector in DETECTORS}
+
+
+# Parser/classifier of each IP scan entry (see ip_ranges.py)
+IP_CLASSIFIERS: Dict[str, Callable[[str], Optional[str]]] = {
+    "ipv4": classify_ipv4,
+    "ipv6": classify_ipv6,
+}
+
+
+# Small-int codes of the match types, as stored in MatchStore
+MATCH_TYPES: Tuple[AnonymizationType, ...] = tuple(AnonymizationType)
+TYPE_CODES: Dict[AnonymizationType, int] = {match_type: code for code, match_type in enumerate(MATCH_TYPES)}
+
+
+# Number of a consistent token ("[EMAIL_12]" -> 12)
+_TOKEN_NUMBER = re.compile(r'_(\d+)\]$')
+
+# Characters rescanned on each side of an edit by anonymize_incremental: more
+# than the longest structured match (IBAN, complete address...)
+INCREMENTAL_MARGIN = 256
+
+
+# Priority between types when overlapping matches have to be arbitrated (lower wins)
+TYPE_PRIORITY: Dict[AnonymizationType, int] = DetectorRegistry(DETECTORS).type_priority()
 
 
 @dataclass
 class ConsistencyMapper:
     """Maps original values to consistent anonymized tokens."""
     
-    def __init__(self):
+    def __init__(self, tokenizer: Optional[KeyedTokenizer] = None):
+        """
+        Args:
+            tokenizer: Derive tokens from the values (see keyed_tokens.py)
+                instead of numbering them
+        """
+        self.tokenizer = tokenizer
         self._mappings: Dict[str, Dict[str, str]] = {}  # {type: {original: token}}
         self._counters: Dict[str, int] = {}  # {type: next_number}
-    
-    def get_token(self, value_type: str, original_value: str, base_token: str) -> str:
-        """Get consistent token for a value, creating one if needed."""
-        if value_type not in self._mappings:
+        self._refs: Dict[str, Dict[str, int]] = {}  # {type: {original: index in tokens}}
+        self._reserved: Set[str] = set()  # Tokens already present in the text
+        self._handed_out: Dict[str, Optional[str]] = {}  # Tokens of the mapped values -> their keyed digest
+        self.tokens: List[str] = []  # Token table, referenced by MatchStore
+    
+    def reserve(self, tokens: Iterable[str]):
+        """Never hand out these tokens (already in the text) for new values."""
+        self._reserved.update(tokens)
+    
+    def get_token_ref(self, value_type: str, original_value: str, base_token: str) -> int:
+        """Get the token table index of a value's consistent token, creating it if needed."""
+        refs = self._refs.get(value_type)
+        if refs is None:
+            refs = self._refs[value_type] = {}
             self._mappings[value_type] = {}
             self._counters[value_type] = 1
         
-        if original_value not in self._mappings[value_type]:
-            number = self._counters[value_type]
+        ref = refs.get(original_value)
+        if ref is None:
             # Extract base token name (remove brackets/stars if present)
             clean_token = base_token.replace("***", "").replace("*", "").replace("[", "").replace("]", "")
-            self._mappings[value_type][original_value] = f"[{clean_token}_{number}]"
-            self._counters[value_type] += 1
+            if self.tokenizer is not None:
+                token = self.tokenizer.token(clean_token, value_type, original_value, self._is_taken)
+            else:
+                number = self._counters[value_type]
+                token = f"[{clean_token}_{number}]"
+                while token in self._reserved:
+                    number += 1
+                    token = f"[{clean_token}_{number}]"
+                self._counters[value_type] = number + 1
+            self._mappings[value_type][original_value] = token
+            self._handed_out.setdefault(token, self._digest(value_type, original_value))
+            ref = refs[original_value] = len(self.tokens)
+            self.tokens.append(token)
         
-        return self._mappings[value_type][original_value]
+        return ref
+    
+    def seed(self, mappings: Dict[str, Dict[str, str]], counters: Optional[Dict[str, int]] = None):
+        """
+        Continue from the mappings of a previous pass ({type: {original: token}}):
+        known values keep their tokens, new ones get the next free numbers
+        (never below the previous pass's counters, if given).
+        """
+        for value_type, number in (counters or {}).items():
+            self._refs.setdefault(value_type, {})
+            self._mappings.setdefault(value_type, {})
+            self._counters[value_type] = max(self._counters.get(value_type, 1), number)
+        for value_type, values in mappings.items():
+            refs = self._refs.setdefault(value_type, {})
+            type_mappings = self._mappings.setdefault(value_type, {})
+            counter = self._counters.get(value_type, 1)
+            for original_value, token in values.items():
+                if original_value in refs:
+                    continue
+                type_mappings[original_value] = token
+                self._handed_out.setdefault(token, self._digest(value_type, original_value))
+                refs[original_value] = len(self.tokens)
+                self.tokens.append(token)
+                number = _TOKEN_NUMBER.search(token)
+                if number:
+                    counter = max(counter, int(number.group(1)) + 1)
+            self._counters[value_type] = counter
+    
+    def _digest(self, value_type: str, value: str) -> Optional[str]:
+        """Keyed digest of a value (None for numbered tokens)."""
+        return self.tokenizer.digest(value_type, value) if self.tokenizer is not None else None
+    
+    def _is_taken(self, token: str, digest: str) -> bool:
+        """
+        Whether a keyed token already designates a value of another digest (or
+        is typed in the text); values with the same normalized form share it.
+        """
+        if token in self._reserved:
+            return True
+        holder = self._handed_out.get(token, digest)
+        return holder is None or holder != digest
+    
+    def get_token(self, value_type: str, original_value: str, base_token: str) -> str:
+        """Get consistent token for a value, creating one if needed."""
+        return self.tokens[self.get_token_ref(value_type, original_value, base_token)]
     
     def get_mapping_summary(self) -> Dict[str, Dict[str, str]]:
         """Get summary of all mappings for debugging/logging."""
         return self._mappings.copy()
+    
+    def get_counters(self) -> Dict[str, int]:
+        """Next token number of each type, to continue the numbering later."""
+        return self._counters.copy()
 
 
 @dataclass
@@ -155,6 +328,12 @@ class AnonymizationSettings:
     
     # === CONSISTENCY MAPPING ===
     use_consistent_tokens: bool = True  # Enable consistent mapping by default
+    # "sequential" ([EMAIL_1]) or "keyed" ([EMAIL_7f3a9c], same on every replica, see keyed_tokens.py)
+    token_mode: str = "sequential"
+    keyed_token_length: int = DEFAULT_TOKEN_LENGTH
+    
+    # === OVERLAPPING MATCHES: "longest", "leftmost" or "priority" (see overlap.py) ===
+    overlap_policy: str = "longest"
     
     # === DONNÉES PROFESSIONNELLES ===
     anonymize_employee_ids: bool = False
@@ -216,11 +395,14 @@ class AnonymizationSettings:
     credit_card_token: str = "[CARTE]"
     iban_token: str = "[IBAN]"
     url_token: str = "[URL]"
+    custom_term_token: str = "[CONFIDENTIEL]"
 
 
 @dataclass
 class AnonymizationMatch:
     """Represents a found match for anonymization."""
+    __slots__ = ("type", "start", "end", "original_text", "replacement")
+    
     type: AnonymizationType
     start: int
     end: int
@@ -232,13 +414,15 @@ class AnonymizationMatch:
 class AnonymizationResult:
     """Result of the anonymization process."""
     success: bool
-    original_text: str
+    original_text: str  # NFC-normalized when matches were found: their offsets refer to it
     anonymized_text: str
-    matches: List[AnonymizationMatch] = field(default_factory=list)
+    matches: Sequence[AnonymizationMatch] = field(default_factory=list)  # MatchStore, materialized on access
     anonymizations_count: int = 0
     processing_time_ms: float = 0.0
     errors: List[str] = field(default_factory=list)
     mapping_summary: Optional[Dict[str, Dict[str, str]]] = None  # Consistency mappings
+    profile_id: Optional[str] = None  # Compiled settings profile, reusable instead of settings
+    degraded_stages: List[str] = field(default_factory=list)  # Stages skipped to meet the deadline, "ner" while models load
 
 
 class RegexPatterns:
@@ -282,11 +466,9 @@ class RegexPatterns:
     # IP addresses (IPv4) - amélioration avec validation des plages
     IP_V4 = re.compile(r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b')
     
-    # IP privées (RFC 1918)
-    IP_PRIVATE = re.compile(r'\b(?:10\.(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){2}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)|172\.(?:1[6-9]|2[0-9]|3[01])\.(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){1}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)|192\.168\.(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){1}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?))\b')
-    
-    # IP localhost
-    IP_LOCALHOST = re.compile(r'\b127\.(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){2}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b')
+    # IPv6 (formes compressées "::", IPv4 mappée) - candidats validés et classés par ip_ranges.py
+    # Jamais collé à un "[" / "(" qui précède ni à un "]" qui suit : slices Python (arr[1::2])
+    IP_V6 = re.compile(r'(?<![\w:\[(])(?=:*[0-9A-Fa-f])(?:[0-9A-Fa-f]{0,4}:){2,7}(?:[0-9A-Fa-f]{1,4}|(?:\d{1,3}\.){3}\d{1,3})?(?![\w:\]]|\.\d)')
     
     # Email addresses
     EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
@@ -387,66 +569,313 @@ class RegexPatterns:
     # Données biométriques (références)
     BIOMETRIC = re.compile(r'\b(?:empreinte|biométrie|reconnaissance|scan|capteur)[\s:].{1,30}\b', re.IGNORECASE | re.UNICODE)
 
+    # Tokens déjà produits par le moteur ([PHONE_1], [IP_PRIVEE_12], [EMAIL_7f3a9c]...), ex. texte ré-envoyé ;
+    # un token à clé rallongé par une collision peut aller jusqu'au digest entier (keyed_tokens.py)
+    EXISTING_TOKEN = re.compile(
+        r'\[[A-Z][A-Z0-9_]{0,30}_(?:[0-9]{1,6}|[0-9a-f]{' + f'{MIN_TOKEN_LENGTH},{DIGEST_LENGTH}' + r'})\]'
+    )
+
+    # Backends able to run each pattern (see regex_backends.py). RE2 is only
+    # declared where its ASCII \b/\d/\s and missing lookarounds give the same
+    # matches on French text: patterns using \s or \d stay on re, since French
+    # text separates digit groups and words with NBSP/NNBSP (U+00A0, U+202F)
+    # that RE2's \s does not match. Hyperscan only prefilters, so every pattern can use it.
+    _RE_ONLY = frozenset({STDLIB, HYPERSCAN})
+    _RE2_SAFE = frozenset({STDLIB, RE2, HYPERSCAN})
+    BACKENDS = {
+        "NIR": _RE_ONLY,                      # Unicode \s (NBSP between digit groups)
+        "PHONE": _RE_ONLY,                    # Lookarounds
+        "IP_V4": _RE2_SAFE,
+        "IP_V6": _RE_ONLY,                    # Lookarounds
+        "EMAIL": _RE2_SAFE,
+        "URL": _RE2_SAFE,
+        "FRENCH_NAME": _RE_ONLY,              # Verbose, Unicode word boundaries
+        "FRENCH_POSTAL": _RE_ONLY,            # Unicode \d
+        "FRENCH_STREET": _RE_ONLY,            # Unicode \s
+        "FRENCH_COMPLETE_ADDRESS": _RE_ONLY,  # Verbose
+        "CREDIT_CARD": _RE_ONLY,              # Unicode \s (NBSP between digit groups)
+        "IBAN": _RE_ONLY,                     # Unicode \d
+        "BIRTH_DATE": _RE_ONLY,               # Unicode \d
+        "AGE": _RE_ONLY,                      # Ends on Unicode word boundaries
+        "ID_CARD": _RE2_SAFE,
+        "PASSPORT": _RE2_SAFE,
+        "LOGIN": _RE_ONLY,                    # "user: andré" - \b before an accent
+        "EMPLOYEE_ID": _RE_ONLY,              # "Employé" - \b before an accent
+        "SALARY_DATA": _RE_ONLY,              # .{0,20}\b ends next to accents
+        "BANK_ACCOUNT": _RE_ONLY,             # Unicode \s (NBSP between digit groups)
+        "MEDICAL_DATA": _RE_ONLY,             # .{1,50}\b ends next to accents
+        "MEDICAL_REF": _RE_ONLY,              # Unicode \s
+        "GEOLOCATION": _RE_ONLY,              # Unicode \s
+        "PRECISE_ADDRESS": _RE_ONLY,          # City names ending with an accent
+        "GRADES": _RE_ONLY,                   # Unicode \s
+        "POSTAL_CODE": _RE_ONLY,              # Unicode \d
+        "LEGAL_CASE": _RE_ONLY,               # Unicode \s
+        "BIOMETRIC": _RE_ONLY,                # .{1,30}\b ends next to accents
+        "EXISTING_TOKEN": _RE2_SAFE,
+    }
+
+    # Keywords every match of a context-triggered pattern starts with: these
+    # patterns only run where one of their keywords occurs (keyword_anchors.py).
+    # SALARY_DATA is number-led ("3500 € brut") and cannot be anchored this way.
+    ANCHORS = {
+        "LOGIN": ("login", "username", "user", "identifiant"),
+        "EMPLOYEE_ID": ("matricule", "emp", "employee"),
+        "MEDICAL_DATA": ("diagnostic", "pathologie", "traitement", "médicament", "ordonnance", "consultation"),
+        "MEDICAL_REF": ("ref", "réf", "dossier", "dnum", "d-num"),
+        "GRADES": ("note", "résultat", "moyenne", "score"),
+        "LEGAL_CASE": ("dossier", "affaire", "procédure", "procedure", "plainte"),
+        "BIOMETRIC": ("empreinte", "biométrie", "reconnaissance", "scan", "capteur"),
+    }
+
+    # Number-led patterns: every match starts on a digit group, or on one of
+    # the given characters just before it ("+33 6...", "(555) ...", "-1.25").
+    # They are only tried at the digit groups of the text (numeric_runs.py).
+    LEADS = {
+        "NIR": "",
+        "PHONE": "+(",
+        "IP_V4": "",
+        "FRENCH_POSTAL": "",
+        "FRENCH_STREET": "",
+        "FRENCH_COMPLETE_ADDRESS": "",
+        "CREDIT_CARD": "",
+        "ID_CARD": "",
+        "PASSPORT": "",
+        "SALARY_DATA": "",
+        "BANK_ACCOUNT": "",
+        "GEOLOCATION": "-+",
+        "PRECISE_ADDRESS": "",
+        "POSTAL_CODE": "",
+    }
+
+    # Checksums the candidates of a pattern must pass
+    CHECKSUMS = {
+        "CREDIT_CARD": LUHN,
+        "IBAN": MOD97,
+    }
+    
+    @classmethod
+    def _name_of(cls, pattern: Pattern) -> Optional[str]:
+        for name in cls.BACKENDS:
+            if getattr(cls, name) is pattern:
+                return name
+        return None
+    
+    @classmethod
+    def backends_for(cls, pattern: Pattern) -> FrozenSet[str]:
+        """Backends declared for a compiled pattern (stdlib only if undeclared)."""
+        return cls.BACKENDS.get(cls._name_of(pattern), frozenset({STDLIB}))
+    
+    @classmethod
+    def anchors_for(cls, pattern: Pattern) -> Tuple[str, ...]:
+        """Leading keywords declared for a compiled pattern (none if undeclared)."""
+        return cls.ANCHORS.get(cls._name_of(pattern), ())
+    
+    @classmethod
+    def lead_for(cls, pattern: Pattern) -> Optional[str]:
+        """Leading characters of a number-led pattern (None if not number-led)."""
+        return cls.LEADS.get(cls._name_of(pattern))
+    
+    @classmethod
+    def checksum_for(cls, pattern: Pattern) -> Optional[str]:
+        """Checksum declared for a compiled pattern, if any."""
+        return cls.CHECKSUMS.get(cls._name_of(pattern))
+
+
+# Heuristics of _is_likely_person_name, built once
+_GREETING_PREFIXES = ('bonjour', 'bonsoir', 'salut', 'cher ', 'chère ', 'hello', 'hi ')
+_GREETING_WORDS = ('bonjour', 'bonsoir', 'salut')
+_COMMON_WORDS = frozenset({
+    # Mots courants
+    'bonjour', 'hello', 'salut', 'contact', 'développé', 'serveur', 'client', 'projet',
+    'world', 'true', 'false', 'none', 'null', 'informations', 'information',
+    'def', 'class', 'return', 'print', 'import', 'from',  # Python keywords
+    # Titres et métiers (faux positifs fréquents)
+    'data', 'scientist', 'data scientist', 'ingénieur', 'manager', 'directeur', 'madame', 'monsieur',
+    'master', 'licence', 'doctorat', 'université', 'informatique', 'mathématiques',
+    'objet', 'candidature', 'poste', 'titulaire', 'analyse', 'données', 'projets',
+    # Mois et temps
+    'janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août',
+    'septembre', 'octobre', 'novembre', 'décembre', 'lundi', 'mardi', 'mercredi',
+    'jeudi', 'vendredi', 'samedi', 'dimanche',
+    # Expressions courantes
+    'expression', 'salutations', 'distinguées', 'agréer', 'veuillez',
+    # Expressions avec madame/monsieur
+    'bonjour madame', 'bonjour monsieur', 'chère madame', 'cher monsieur'
+})
+_COMMON_SINGLE_WORDS = frozenset({'bonjour', 'bonsoir', 'salut', 'madame', 'monsieur', 'mademoiselle', 'cher', 'chère'})
+_COMPANY_SUFFIXES = ('corp', 'inc', 'sa', 'sarl', 'sas', 'ltd', 'llc', 'gmbh', 'ag', 'bv', 'nv', 'plc')
+_COMPANY_ENDINGS = _COMPANY_SUFFIXES + tuple(suffix + '.' for suffix in _COMPANY_SUFFIXES)
+_COMPANY_KEYWORDS = ('tech', 'corp', 'soft', 'sys', 'data', 'info', 'net', 'web', 'cloud',
+                     'bnp', 'paribas', 'renault', 'peugeot', 'orange', 'total', 'bank')
+_JOB_PATTERNS = ('data ', 'scientist', 'ingénieur', 'manager', 'directeur', 'chef de', 'responsable')
+_CODE_CHARS = ('(', ')', '{', '}', '[', ']', '=', ':', ';', '"', "'")
+_PERSON_NAME = re.compile(r'''(?x)
+    ^(?:
+        # Prénom Nom (ex: Sylvain JOLY, NANO by NXO)
+        [A-Z][a-zàâäéèêëïîôùûüÿ]{2,}\s+[A-Z][A-Z\-]{2,}
+        |
+        # NOM Prénom (ex: JOLY Sylvain)  
+        [A-Z][A-Z\-]{2,}\s+[A-Z][a-zàâäéèêëïîôùûüÿ]{2,}
+        |
+        # Prénom Nom classique (ex: Marie Dupont)
+        [A-Z][a-zàâäéèêëïîôùûüÿ]{2,}\s+[A-Z][a-zàâäéèêëïîôùûüÿ]{2,}
+        |
+        # Single name (ex: Sylvain, JOLY)
+        [A-Z][a-zàâäéèêëïîôùûüÿA-Z\-]{2,}
+    )$
+''', re.UNICODE)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Length of the common prefix of two strings (bisection over slice comparisons)."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix of two strings, at most `limit`."""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
 
 class AnonymizationEngine:
     """Advanced anonymization engine with multi-language support."""
     
-    def __init__(self, settings: Optional[AnonymizationSettings] = None):
-        """Initialize the anonymization engine."""
+    # spaCy model of each detected language: (engine attribute, package)
+    NER_MODELS = {
+        "fr": ("nlp_fr", "fr_core_news_sm"),
+        "en": ("nlp_en", "en_core_web_sm"),
+    }
+    
+    def __init__(
+        self,
+        settings: Optional[AnonymizationSettings] = None,
+        pipeline_cache_size: int = 64,
+        regex_backends: Optional[RegexBackends] = None,
+        executor: Optional[BoundedExecutor] = None,
+        ner_batcher: Optional[NerBatcher] = None,
+        trim_pipelines: bool = True,
+        sentencizer: bool = False,
+        background_loading: bool = False,
+        ner_policy: str = "degrade",
+        ner_wait_ms: float = 2000
+    ):
+        """
+        Initialize the anonymization engine.
+        
+        Args:
+            trim_pipelines: Load only the spaCy components NER needs
+            sentencizer: Add a rule-based sentencizer to the spaCy models
+            background_loading: Do not load the models here: start_model_loading()
+                loads them in a background thread (see model_loading.py)
+            ner_policy: Requests needing NER while models load are served
+                regex-only ("degrade") or wait up to ner_wait_ms ("wait")
+            ner_wait_ms: Longest wait for the models under the "wait" policy
+        """
+        if ner_policy not in NER_POLICIES:
+            raise ValueError(f"Unknown NER policy: {ner_policy} (expected one of {', '.join(NER_POLICIES)})")
         self.settings = settings or AnonymizationSettings()
         self.patterns = RegexPatterns()
+        # Regex backends are chosen once at startup (REGEX_BACKEND / REGEX_PREFILTER)
+        self.regex_backends = regex_backends or select_backends()
+        # Skips detector families whose trigger characters are absent
+        self.prefilter = PiiPrefilter(DETECTOR_TRIGGERS)
+        # Detector declarations, stage scheduling and measured stage costs
+        self.detectors = DetectorRegistry(DETECTORS)
+        # Per-tenant deny/allow lists, hot-swappable
+        self.term_lists = TermListRegistry()
+        # Compiled detection plans, one per distinct settings combination
+        self.pipelines = PipelineCache(self._build_settings, self._build_scan_plans, max_size=pipeline_cache_size)
+        # Async calls run detection and NER here, off the event loop
+        self.executor = executor or BoundedExecutor()
+        # Optional cross-request NER batching (nlp.pipe); direct calls otherwise
+        self.ner_batcher = ner_batcher
         
-        # Initialize spaCy models for name detection (multi-language)
+        # Initialize spaCy models for name detection (multi-language);
+        # each request picks its model (see _select_nlp_model), the engine never switches
         self.nlp_fr = None
         self.nlp_en = None
-        self.nlp = None  # Will be set dynamically based on language detection
+        self._model_locks: Dict[int, threading.Lock] = {}
+        self._model_locks_guard = threading.Lock()
+        if LANGDETECT_AVAILABLE:
+            # Language profiles loaded now: their lazy loading is not thread-safe
+            init_factory()
         
-        # Initialize CamemBERT NER (preferred for French)
+        # CamemBERT NER (preferred for French)
         self.camembert_ner = None
-        if CAMEMBERT_AVAILABLE:
-            try:
-                self.camembert_ner = get_camembert_ner(confidence_threshold=0.7)
-                if self.camembert_ner.is_available:
-                    logger.info("CamemBERT NER loaded - using advanced French detection")
-                else:
-                    logger.warning("CamemBERT NER not available, falling back to spaCy")
-                    self.camembert_ner = None
-            except Exception as e:
-                logger.warning(f"CamemBERT NER initialization failed: {e}")
-                self.camembert_ner = None
         
-        # Initialize CamemBERT NER (preferred for French)
-        self.camembert_ner = None
-        if CAMEMBERT_AVAILABLE:
-            try:
-                self.camembert_ner = get_camembert_ner(confidence_threshold=0.7)
-                if self.camembert_ner.is_available:
-                    logger.info("CamemBERT NER loaded - using advanced French detection")
-                else:
-                    logger.warning("CamemBERT NER not available, falling back to spaCy")
-                    self.camembert_ner = None
-            except Exception as e:
-                logger.warning(f"CamemBERT NER initialization failed: {e}")
-                self.camembert_ner = None
-        
-        if SPACY_AVAILABLE:
-            # Load French model
-            try:
-                self.nlp_fr = spacy.load("fr_core_news_sm")
-                self.nlp = self.nlp_fr  # Default to French
-                logger.info("spaCy French model loaded successfully")
-            except OSError:
-                logger.warning("spaCy French model not found. FR name detection disabled.")
-            
-            # Load English model
-            try:
-                self.nlp_en = spacy.load("en_core_web_sm")
-                logger.info("spaCy English model loaded successfully")
-            except OSError:
-                logger.warning("spaCy English model not found. EN name detection disabled.")
-            
-            if not self.nlp_fr and not self.nlp_en:
-                logger.error("No spaCy models available. Name detection disabled.")
+        # Models load here, or in the background once start_model_loading() is called
+        self.ner_policy = ner_policy
+        self.ner_wait_ms = ner_wait_ms
+        self._trim_pipelines = trim_pipelines
+        self._sentencizer = sentencizer
+        # spaCy models first: each is used as soon as it is loaded, CamemBERT (torch) is the slowest
+        loaders = {
+            package: (lambda attribute=attribute, package=package: self._load_spacy(attribute, package))
+            for attribute, package in self.NER_MODELS.values()
+        }
+        loaders["camembert"] = self._load_camembert
+        self.models = ModelLoader(loaders)
+        if not background_loading:
+            self.models.load()
+    
+    def start_model_loading(self):
+        """Load the models in a background thread (engines built with background_loading)."""
+        self.models.start()
+    
+    def _load_camembert(self) -> Optional[Any]:
+        """CamemBERT NER (preferred for French), None if not installed."""
+        if not CAMEMBERT_AVAILABLE:
+            return None
+        from .camembert_ner import get_camembert_ner, is_camembert_available
+        if is_camembert_available():
+            self.camembert_ner = get_camembert_ner(confidence_threshold=0.7)
+        if self.camembert_ner is not None and not self.camembert_ner.is_available:
+            self.camembert_ner = None
+        if self.camembert_ner is None:
+            logger.warning("CamemBERT NER not available, falling back to spaCy")
+        return self.camembert_ner
+    
+    def _load_spacy(self, attribute: str, name: str) -> Optional[Any]:
+        """Load a spaCy package for NER into an attribute, None if spaCy is not installed."""
+        if not SPACY_AVAILABLE:
+            return None
+        # Only the components NER needs are loaded (see nlp_models.py)
+        setattr(self, attribute, load_ner_model(name, self._trim_pipelines, self._sentencizer))
+        return getattr(self, attribute)
+    
+    def _await_models(self, language: str, deadline: Optional[float] = None) -> bool:
+        """
+        Whether the NER model of a language has settled (loaded or missing):
+        under the "wait" policy, waits for it up to ner_wait_ms (and the
+        request's deadline).
+        
+        Raises:
+            ModelsNotReady: Still loading after the wait ("wait" policy)
+        """
+        package = self.NER_MODELS[language][1]
+        if self.models.settled(package):
+            return True
+        if self.ner_policy != NER_POLICY_WAIT:
+            return False
+        timeout = self.ner_wait_ms / 1000
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.perf_counter()))
+        if not self.models.wait(timeout, package):
+            raise ModelsNotReady(f"NER model {package} still loading after {timeout * 1000:.0f} ms")
+        return True
     
     def _detect_language(self, text: str) -> str:
         """
@@ -471,346 +900,270 @@ class AnonymizationEngine:
         except (LangDetectException, Exception):
             return 'fr'  # Default to French on error
     
-    def _select_nlp_model(self, text: str):
-        """Select the appropriate spaCy model based on detected language."""
-        if not SPACY_AVAILABLE:
-            return
-        
-        detected_lang = self._detect_language(text)
-        
-        if detected_lang == 'en' and self.nlp_en:
-            self.nlp = self.nlp_en
-        elif detected_lang == 'fr' and self.nlp_fr:
-            self.nlp = self.nlp_fr
-        else:
-            # Fallback to any available model
-            self.nlp = self.nlp_fr or self.nlp_en
-    
-    def _is_likely_person_name(self, text: str) -> bool:
-        """Check if text is likely a person name using multiple heuristics."""
-        lower_text = text.lower().strip()
+    def _select_nlp_model(self, text: str, language: Optional[str] = None) -> Optional[Any]:
+        """
+        Return the spaCy model for a request's text (by detected language, or
+        `language` if already detected), None if none is loaded.
+        """
+        detected_lang = language or self._detect_language(text)
+        attribute, package = self.NER_MODELS[detected_lang]
+        nlp = getattr(self, attribute)
+        if nlp:
+            return nlp
+        if not self.models.settled(package):
+            # Still loading: regex only rather than the other language's model
+            return None
+        # Fallback to any available model
+        return self.nlp_fr or self.nlp_en
+    
+    def _model_lock(self, nlp: Any) -> threading.Lock:
+        """Lock serializing the calls to one model (spaCy pipelines are not guaranteed thread-safe)."""
+        lock = self._model_locks.get(id(nlp))
+        if lock is None:
+            with self._model_locks_guard:
+                lock = self._model_locks.setdefault(id(nlp), threading.Lock())
+        return lock
+    
+    def _is_likely_person_name(self, text: Union[str, DocSpan]) -> bool:
+        """Check if text (a string or a span of the analyzed document) is likely a person name."""
+        span = text if isinstance(text, DocSpan) else DocSpan(text)
+        text = span.text
+        lower_text = span.lower.strip()
         
         # Skip greetings and titles of civility
-        greeting_patterns = ['bonjour', 'bonsoir', 'salut', 'cher ', 'chère ', 'hello', 'hi ']
-        if any(lower_text.startswith(g) for g in greeting_patterns):
+        if lower_text.startswith(_GREETING_PREFIXES):
             return False
         
         # Skip if it contains greeting words
-        if any(g in lower_text for g in ['bonjour', 'bonsoir', 'salut']):
+        if any(g in lower_text for g in _GREETING_WORDS):
             return False
         
         # Skip common words and expressions that aren't names
-        common_words = {
-            # Mots courants
-            'bonjour', 'hello', 'salut', 'contact', 'développé', 'serveur', 'client', 'projet',
-            'world', 'true', 'false', 'none', 'null', 'informations', 'information',
-            'def', 'class', 'return', 'print', 'import', 'from',  # Python keywords
-            # Titres et métiers (faux positifs fréquents)
-            'data', 'scientist', 'data scientist', 'ingénieur', 'manager', 'directeur', 'madame', 'monsieur',
-            'master', 'licence', 'doctorat', 'université', 'informatique', 'mathématiques',
-            'objet', 'candidature', 'poste', 'titulaire', 'analyse', 'données', 'projets',
-            # Mois et temps
-            'janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août',
-            'septembre', 'octobre', 'novembre', 'décembre', 'lundi', 'mardi', 'mercredi',
-            'jeudi', 'vendredi', 'samedi', 'dimanche',
-            # Expressions courantes
-            'expression', 'salutations', 'distinguées', 'agréer', 'veuillez',
-            # Expressions avec madame/monsieur
-            'bonjour madame', 'bonjour monsieur', 'chère madame', 'cher monsieur'
-        }
-        if lower_text in common_words:
+        if lower_text in _COMMON_WORDS:
             return False
         
         # Skip if any word in text is a common word (like "Bonjour Madame")
-        words_in_text = lower_text.split()
-        common_single_words = {'bonjour', 'bonsoir', 'salut', 'madame', 'monsieur', 'mademoiselle', 'cher', 'chère'}
-        if any(w in common_single_words for w in words_in_text):
+        if any(w in _COMMON_SINGLE_WORDS for w in span.lower_words):
             return False
         
         # Skip company names (end with Corp, Inc, SA, SARL, Ltd, etc.)
-        company_suffixes = ['corp', 'inc', 'sa', 'sarl', 'sas', 'ltd', 'llc', 'gmbh', 'ag', 'bv', 'nv', 'plc']
-        if any(lower_text.endswith(suffix) or lower_text.endswith(suffix + '.') for suffix in company_suffixes):
+        if lower_text.endswith(_COMPANY_ENDINGS):
             return False
         
         # Skip known company/organization names
-        company_keywords = ['tech', 'corp', 'soft', 'sys', 'data', 'info', 'net', 'web', 'cloud', 
-                           'bnp', 'paribas', 'renault', 'peugeot', 'orange', 'total', 'bank']
-        if any(kw in lower_text for kw in company_keywords):
+        if any(kw in lower_text for kw in _COMPANY_KEYWORDS):
             return False
         
         # Skip multi-word expressions that look like job titles or domains
         if ' ' in text:
-            job_patterns = ['data ', 'scientist', 'ingénieur', 'manager', 'directeur', 'chef de', 'responsable']
-            if any(pattern in lower_text for pattern in job_patterns):
+            if any(pattern in lower_text for pattern in _JOB_PATTERNS):
                 return False
         
-        words = text.split()
+        words = span.words
         if len(words) < 1 or len(words) > 3:  # Names usually have 1-3 words
             return False
         
         # Skip if contains code-like patterns
-        if any(char in text for char in ['(', ')', '{', '}', '[', ']', '=', ':', ';', '"', "'"]):
+        if any(char in text for char in _CODE_CHARS):
             return False
         
         # Check if it matches our improved name patterns
-        import re
-        name_pattern = re.compile(r'''(?x)
-            ^(?:
-                # Prénom Nom (ex: Sylvain JOLY, NANO by NXO)
-                [A-Z][a-zàâäéèêëïîôùûüÿ]{2,}\s+[A-Z][A-Z\-]{2,}
-                |
-                # NOM Prénom (ex: JOLY Sylvain)  
-                [A-Z][A-Z\-]{2,}\s+[A-Z][a-zàâäéèêëïîôùûüÿ]{2,}
-                |
-                # Prénom Nom classique (ex: Marie Dupont)
-                [A-Z][a-zàâäéèêëïîôùûüÿ]{2,}\s+[A-Z][a-zàâäéèêëïîôùûüÿ]{2,}
-                |
-                # Single name (ex: Sylvain, JOLY)
-                [A-Z][a-zàâäéèêëïîôùûüÿA-Z\-]{2,}
-            )$
-        ''', re.UNICODE)
-        
-        return bool(name_pattern.match(text))
-    
-    def _normalize_name(self, name: str) -> str:
+        return bool(_PERSON_NAME.match(text))
+    
+    def _normalize_name(self, name: Union[str, DocSpan]) -> str:
         """Normalize name for consistent mapping (e.g., 'JOLY Sylvain' -> 'Sylvain JOLY, NANO by NXO')."""
-        words = name.split()
+        span = name if isinstance(name, DocSpan) else DocSpan(name)
+        words = span.words
         if len(words) != 2:
-            return name  # Don't normalize complex names
+            return span.text  # Don't normalize complex names
         
         word1, word2 = words
+        flags1, flags2 = span.flags
         
         # If first word is all caps and second is mixed case, it's likely "NOM Prénom"
-        if word1.isupper() and word2[0].isupper() and any(c.islower() for c in word2[1:]):
+        if flags1 & UPPER and flags2 & TITLE:
             return f"{word2} {word1}"  # "JOLY Sylvain" -> "Sylvain JOLY, NANO by NXO"
         
-        return name  # Keep original order
-    
-    def _apply_consistent_mapping(self, matches: List[AnonymizationMatch], text: str, mapper: Optional[ConsistencyMapper]) -> Tuple[str, List[AnonymizationMatch]]:
-        """Apply consistent mapping to matches and update text."""
-        if not mapper:
-            # No mapping, use original tokens
-            anonymized_text = text
-            for match in sorted(matches, key=lambda x: x.start, reverse=True):
-                anonymized_text = (
-                    anonymized_text[:match.start] + 
-                    match.replacement + 
-                    anonymized_text[match.end:]
-                )
-            return anonymized_text, matches
+        return span.text  # Keep original order
+    
+    def _apply_consistent_mapping(
+        self,
+        matches: List[AnonymizationMatch],
+        doc: AnalyzedDocument,
+        mapper: Optional[ConsistencyMapper]
+    ) -> MatchStore:
+        """Apply consistent mapping to matches and store them compactly."""
+        text = doc.text
+        store = MatchStore(text, MATCH_TYPES, AnonymizationMatch, mapper.tokens if mapper else None)
         
-        # Apply consistent mapping
-        updated_matches = []
         for match in matches:
-            # Map each type to a consistent token
-            type_name = match.type.value.upper()
-            
-            # Normalize names for consistent mapping
-            key_for_mapping = match.original_text
-            if match.type == AnonymizationType.NAME:
-                key_for_mapping = self._normalize_name(match.original_text)
-            
-            consistent_token = mapper.get_token(type_name, key_for_mapping, match.replacement)
+            if mapper:
+                # Map each type to a consistent token
+                type_name = match.type.value.upper()
+                
+                # Normalize names for consistent mapping
+                key_for_mapping = match.original_text
+                if match.type == AnonymizationType.NAME:
+                    if text[match.start:match.end] == key_for_mapping:
+                        key_for_mapping = self._normalize_name(doc.span(match.start, match.end))
+                    else:
+                        key_for_mapping = self._normalize_name(key_for_mapping)
+                
+                token_ref = mapper.get_token_ref(type_name, key_for_mapping, match.replacement)
+            else:
+                # No mapping, use original tokens
+                token_ref = store.intern_token(match.replacement)
             
-            updated_match = AnonymizationMatch(
-                type=match.type,
-                start=match.start,
-                end=match.end,
-                original_text=match.original_text,
-                replacement=consistent_token
-            )
-            updated_matches.append(updated_match)
-        
-        # Apply replacements in reverse order to maintain positions
-        anonymized_text = text
-        for match in sorted(updated_matches, key=lambda x: x.start, reverse=True):
-            anonymized_text = (
-                anonymized_text[:match.start] + 
-                match.replacement + 
-                anonymized_text[match.end:]
-            )
+            store.append(TYPE_CODES[match.type], match.start, match.end, token_ref, match.original_text)
+        
+        return store
+    
+    @staticmethod
+    def _assemble_text(text: str, matches: List[AnonymizationMatch]) -> str:
+        """Build the output text in one join from non-overlapping matches."""
+        parts = []
+        position = 0
+        for match in sorted(matches, key=lambda x: x.start):
+            parts.append(text[position:match.start])
+            parts.append(match.replacement)
+            position = match.end
+        parts.append(text[position:])
+        return "".join(parts)
+    
+    def _build_settings(self, custom_settings: Optional[Dict[str, Any]]) -> AnonymizationSettings:
+        """Resolve a client settings dictionary against the defaults."""
+        if not custom_settings:
+            return self.settings
+        
+        # Create settings object with custom values
+        settings = AnonymizationSettings()
+        for key, value in custom_settings.items():
+            if hasattr(settings, key):
+                setattr(settings, key, value)
+        # Backward compatibility: accept singular 'anonymize_address' key from older clients
+        if 'anonymize_address' in custom_settings and hasattr(settings, 'anonymize_addresses'):
+            settings.anonymize_addresses = bool(custom_settings.get('anonymize_address'))
+        return settings
+    
+    def compile_settings(self, custom_settings: Optional[Dict[str, Any]] = None) -> CompiledPipeline:
+        """Return the cached compiled pipeline for a settings dictionary."""
+        return self.pipelines.get(custom_settings)
+    
+    async def anonymize(
+        self,
+        text: str,
+        custom_settings: Optional[Dict[str, Any]] = None,
+        profile_id: Optional[str] = None,
+        deadline_ms: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+        conversation: Optional[ConversationState] = None,
+        session_id: Optional[str] = None
+    ) -> AnonymizationResult:
+        """
+        Async wrapper of anonymize_sync (same arguments and result), run on
+        the engine's bounded executor so NER never blocks the event loop. The
+        deadline counts from this call: time queued for a worker is included.
         
-        return anonymized_text, updated_matches
+        Raises:
+            ExecutorSaturated: The executor's queue is full
+            ModelsNotReady: NER needed while the models load ("wait" policy)
+            UnknownProfile: profile_id unknown or evicted
+        """
+        submitted_at = time.perf_counter()
+        if self.ner_policy == NER_POLICY_WAIT and not self.models.ready and self._needs_ner(custom_settings, profile_id):
+            # Waited for here rather than in an executor worker, kept free for
+            # regex-only requests; bounded by the request's deadline too
+            deadline = submitted_at + deadline_ms / 1000 if deadline_ms is not None else None
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self._await_models(self._detect_language(text), deadline)
+            )
+        return await self.executor.run(
+            self.anonymize_sync, text, custom_settings, profile_id, deadline_ms, tenant_id, conversation, session_id,
+            submitted_at
+        )
     
-    async def anonymize(self, text: str, custom_settings: Optional[Dict[str, Any]] = None) -> AnonymizationResult:
+    def anonymize_sync(
+        self,
+        text: str,
+        custom_settings: Optional[Dict[str, Any]] = None,
+        profile_id: Optional[str] = None,
+        deadline_ms: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+        conversation: Optional[ConversationState] = None,
+        session_id: Optional[str] = None,
+        started_at: Optional[float] = None
+    ) -> AnonymizationResult:
         """
         Anonymize text based on settings with automatic language detection.
         
         Args:
             text: Text to anonymize
             custom_settings: Optional custom settings to override defaults
+            profile_id: Optional id of settings compiled by a previous call,
+                used instead of custom_settings (UnknownProfile if unknown or evicted)
+            deadline_ms: Optional time budget; once exhausted, address and name
+                detection are skipped and listed in `degraded_stages`
+            tenant_id: Optional tenant whose deny/allow lists apply (see term_lists.py)
+            conversation: Optional state of the previous turns of a conversation
+                (see conversation.py): tokens continue its mappings, paragraphs
+                already anonymized are reused, and the state is updated in place
+            session_id: Optional session the keyed tokens are derived for
+                (token_mode "keyed", see keyed_tokens.py)
+            started_at: perf_counter time the request was submitted at, when
+                earlier than this call (queued): deadline and processing time count from it
             
         Returns:
             AnonymizationResult with the processed text and metadata
-        """
-        start_time = time.perf_counter()
         
-        # Detect language and select appropriate NLP model
-        self._select_nlp_model(text)
-        
-        if custom_settings:
-            # Create temporary settings object with custom values
-            settings = AnonymizationSettings()
-            for key, value in custom_settings.items():
-                if hasattr(settings, key):
-                    setattr(settings, key, value)
-            # Backward compatibility: accept singular 'anonymize_address' key from older clients
-            if 'anonymize_address' in custom_settings and hasattr(settings, 'anonymize_addresses'):
-                settings.anonymize_addresses = bool(custom_settings.get('anonymize_address'))
-        else:
-            settings = self.settings
+        Raises:
+            ModelsNotReady: NER needed while the models load ("wait" policy)
+        """
+        start_time = started_at if started_at is not None else time.perf_counter()
+        pipeline = self._resolve_pipeline(custom_settings, profile_id)
         
         try:
-            matches = []
-            anonymized_text = text
-            
-            # Initialize consistency mapper if enabled
-            mapper = ConsistencyMapper() if settings.use_consistent_tokens else None
-            
-            # PHASE 1: Collect all matches without applying them yet
-            # ORDER MATTERS: Process regex patterns FIRST to protect them from NER
-            raw_matches = []
-            
-            # === REGEX PATTERNS FIRST (to protect structured data) ===
-            # Process emails, phones, IPs, URLs BEFORE NER to avoid breaking them
-            
-            if settings.anonymize_email:
-                _, email_matches = await self._anonymize_email(text, settings.email_token)
-                raw_matches.extend(email_matches)
-            
-            if settings.anonymize_phone:
-                _, phone_matches = await self._anonymize_phone(text, settings.phone_token)
-                raw_matches.extend(phone_matches)
-            
-            # Traiter les IP AVANT les téléphones pour éviter les conflits
-            if settings.anonymize_ip or settings.anonymize_ip_public or settings.anonymize_ip_private:
-                _, ip_matches = await self._anonymize_ip_intelligent(text, settings)
-                raw_matches.extend(ip_matches)
-            
-            if settings.anonymize_urls:
-                _, url_matches = await self._anonymize_urls(text, settings.url_token)
-                raw_matches.extend(url_matches)
-            
-            if settings.anonymize_nir:
-                _, nir_matches = await self._anonymize_nir(text, settings.nir_token)
-                raw_matches.extend(nir_matches)
-
-            # Medical reference identifiers (e.g., ref #MED-4432)
-            if settings.anonymize_medical_data:
-                _, medref_matches = await self._anonymize_medical_references(text, settings.medical_ref_token)
-                raw_matches.extend(medref_matches)
-
-            # === THEN ADDRESSES (broader context before specific names) ===
-            if settings.anonymize_addresses:
-                _, address_matches = await self._anonymize_addresses(text, settings.address_token)
-                raw_matches.extend(address_matches)
-
-            # NOTE: Age et date de naissance désactivés - sans nom/prénom/adresse, pas d'identification possible
-            # if settings.anonymize_birth_dates:
-            #     _, birth_matches = await self._anonymize_birth_dates(text, settings.birth_date_token)
-            #     raw_matches.extend(birth_matches)
-            #
-            # if settings.anonymize_age:
-            #     _, age_matches = await self._anonymize_age(text, settings.age_token)
-            #     raw_matches.extend(age_matches)
-
-            # === DEDUPE OVERLAPPING MATCHES: prefer longest span ===
-            non_overlapping: List[AnonymizationMatch] = []
-            for m in sorted(raw_matches, key=lambda x: (x.start, -(x.end - x.start))):
-                overlaps = any(max(m.start, existing.start) < min(m.end, existing.end) for existing in non_overlapping)
-                if not overlaps:
-                    non_overlapping.append(m)
-            raw_matches = non_overlapping
-            
-            # === NAMES LAST (to avoid conflicts with address components and protected patterns) ===
-            if settings.anonymize_names:
-                _, name_matches = await self._anonymize_names(text, settings.name_token)
-                # Filter out name matches that overlap with ANY existing match (emails, addresses, etc.)
-                filtered_name_matches = []
-                for name_match in name_matches:
-                    # Check if this name overlaps with any existing match
-                    overlaps = any(
-                        max(name_match.start, existing_match.start) < min(name_match.end, existing_match.end)
-                        for existing_match in raw_matches
-                    )
-                    if not overlaps:
-                        filtered_name_matches.append(name_match)
-                raw_matches.extend(filtered_name_matches)
-            
-            # PHASE 2: Apply consistent mapping and generate final anonymized text
-            anonymized_text, matches = self._apply_consistent_mapping(raw_matches, text, mapper)
-            
-            # Continue with other types that don't need consistent mapping for now
-            
-            if settings.anonymize_id_cards:
-                anonymized_text, id_matches = await self._anonymize_id_cards(anonymized_text, settings.id_card_token)
-                matches.extend(id_matches)
-            
-            if settings.anonymize_passports:
-                anonymized_text, passport_matches = await self._anonymize_passports(anonymized_text, settings.passport_token)
-                matches.extend(passport_matches)
-            
-            if settings.anonymize_logins:
-                anonymized_text, login_matches = await self._anonymize_logins(anonymized_text, settings.login_token)
-                matches.extend(login_matches)
-            
-            # === DONNÉES PROFESSIONNELLES ===
-            if settings.anonymize_employee_ids:
-                anonymized_text, emp_matches = await self._anonymize_employee_ids(anonymized_text, settings.employee_id_token)
-                matches.extend(emp_matches)
-            
-            if settings.anonymize_salary_data:
-                anonymized_text, salary_matches = await self._anonymize_salary_data(anonymized_text, settings.salary_token)
-                matches.extend(salary_matches)
-            
-            # === DONNÉES SENSIBLES ===
-            if settings.anonymize_medical_data:
-                anonymized_text, medical_matches = await self._anonymize_medical_data(anonymized_text, settings.medical_token)
-                matches.extend(medical_matches)
-            
-            if settings.anonymize_bank_accounts:
-                anonymized_text, bank_matches = await self._anonymize_bank_accounts(anonymized_text, settings.bank_account_token)
-                matches.extend(bank_matches)
-            
-            if settings.anonymize_grades:
-                anonymized_text, grade_matches = await self._anonymize_grades(anonymized_text, settings.grades_token)
-                matches.extend(grade_matches)
-            
-            if settings.anonymize_legal_cases:
-                anonymized_text, legal_matches = await self._anonymize_legal_cases(anonymized_text, settings.legal_case_token)
-                matches.extend(legal_matches)
-            
-            # === DONNÉES CONTEXTUELLES ===
-            if settings.anonymize_geolocations:
-                anonymized_text, geo_matches = await self._anonymize_geolocations(anonymized_text, settings.geolocation_token)
-                matches.extend(geo_matches)
-            
-            if settings.anonymize_biometric:
-                anonymized_text, bio_matches = await self._anonymize_biometric(anonymized_text, settings.biometric_token)
-                matches.extend(bio_matches)
-            
-            # === DONNÉES FINANCIÈRES ===
-            if settings.anonymize_credit_cards:
-                anonymized_text, cc_matches = await self._anonymize_credit_cards(anonymized_text, settings.credit_card_token)
-                matches.extend(cc_matches)
+            lists = self.term_lists.get(tenant_id)
+            mapper = self._new_mapper(pipeline.settings, session_id)
+            if conversation is not None:
+                matches, mapper, degraded_stages = self._detect_conversation(
+                    text, pipeline, start_time, deadline_ms, lists, conversation, mapper
+                )
+            else:
+                matches, mapper, degraded_stages = self._detect(text, pipeline, start_time, deadline_ms, lists, mapper)
+            if matches is None:
+                # Nothing to detect (short questions, code): returned as is
+                return AnonymizationResult(
+                    success=True,
+                    original_text=text,
+                    anonymized_text=text,
+                    processing_time_ms=round((time.perf_counter() - start_time) * 1000, 2),
+                    mapping_summary={} if pipeline.settings.use_consistent_tokens else None,
+                    profile_id=pipeline.profile_id
+                )
             
-            if settings.anonymize_iban:
-                anonymized_text, iban_matches = await self._anonymize_iban(anonymized_text, settings.iban_token)
-                matches.extend(iban_matches)
+            # PHASE 2: Generate final anonymized text
+            anonymized_text = matches.assemble()
             
             end_time = time.perf_counter()
             processing_time = (end_time - start_time) * 1000
+            if degraded_stages:
+                logger.warning(f"Degraded stages (deadline of {deadline_ms} ms or models loading): {', '.join(degraded_stages)}")
             
+            # Offsets refer to the NFC-normalized text the matches were found in
             return AnonymizationResult(
                 success=True,
-                original_text=text,
+                original_text=matches.text,
                 anonymized_text=anonymized_text,
                 matches=matches,
                 anonymizations_count=len(matches),
                 processing_time_ms=round(processing_time, 2),
-                mapping_summary=mapper.get_mapping_summary() if mapper else None
+                mapping_summary=mapper.get_mapping_summary() if mapper else None,
+                profile_id=pipeline.profile_id,
+                degraded_stages=degraded_stages
             )
             
+        except ModelsNotReady:
+            raise
         except Exception as e:
             end_time = time.perf_counter()
             processing_time = (end_time - start_time) * 1000
@@ -823,266 +1176,747 @@ class AnonymizationEngine:
                 errors=[str(e)]
             )
     
-    async def _anonymize_nir(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize French social security numbers."""
-        matches = []
-        for match in self.patterns.NIR.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.NIR,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
+    def detect_spans(
+        self,
+        text: str,
+        custom_settings: Optional[Dict[str, Any]] = None,
+        profile_id: Optional[str] = None,
+        deadline_ms: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> MatchStore:
+        """
+        Detect the entities of text without building the anonymized text.
         
-        anonymized_text = self.patterns.NIR.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_phone(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize phone numbers."""
-        matches = []
-        for match in self.patterns.PHONE.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.PHONE,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
+        Takes the same arguments as anonymize_sync. Spans refer to the
+        NFC-normalized text (`store.text`) and carry their consistent token;
+        detection errors are raised instead of being reported in a result.
+        """
+        pipeline = self._resolve_pipeline(custom_settings, profile_id)
+        lists = self.term_lists.get(tenant_id)
+        mapper = self._new_mapper(pipeline.settings, session_id)
+        matches, _, _ = self._detect(text, pipeline, time.perf_counter(), deadline_ms, lists, mapper)
+        if matches is None:
+            return MatchStore(text, MATCH_TYPES, AnonymizationMatch)
+        return matches
+    
+    def anonymize_incremental(
+        self,
+        previous: AnonymizationResult,
+        text: str,
+        custom_settings: Optional[Dict[str, Any]] = None,
+        profile_id: Optional[str] = None,
+        deadline_ms: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+        margin: int = INCREMENTAL_MARGIN,
+        session_id: Optional[str] = None
+    ) -> AnonymizationResult:
+        """
+        Re-anonymize an edited text from the result of its previous version.
         
-        anonymized_text = self.patterns.PHONE.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_ip(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize IP addresses."""
-        matches = []
-        for match in self.patterns.IP_V4.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.IP_ADDRESS,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
+        Only the edited region, widened by `margin` characters on each side
+        (and to whitespace and to the previous spans it cuts), is scanned
+        again; the previous spans around it are shifted and kept, and tokens
+        continue the previous mapping. Same other arguments as anonymize_sync.
         
-        anonymized_text = self.patterns.IP_V4.sub(token, text)
-        return anonymized_text, matches
+        Args:
+            previous: Result of anonymize_sync/anonymize_incremental for the previous text
+            text: New version of the text
+            margin: Characters rescanned around the edit
+        """
+        start_time = time.perf_counter()
+        pipeline = self._resolve_pipeline(custom_settings, profile_id)
+        settings = pipeline.settings
+        
+        try:
+            old_store = previous.matches if isinstance(previous.matches, MatchStore) else None
+            old_text = old_store.text if old_store is not None else AnalyzedDocument(previous.original_text).text
+            new_text = AnalyzedDocument(text).text
+            old_len, new_len = len(old_text), len(new_text)
+            delta = new_len - old_len
+            
+            # Edited region: what lies between the common prefix and suffix
+            prefix = _common_prefix(old_text, new_text)
+            suffix = _common_suffix(old_text, new_text, min(old_len, new_len) - prefix)
+            window_start = max(prefix - margin, 0)
+            window_end = min(new_len - suffix + margin, new_len)
+            while window_start > 0 and not new_text[window_start - 1].isspace():
+                window_start -= 1
+            while window_end < new_len and not new_text[window_end].isspace():
+                window_end += 1
+            
+            # Previous spans cut by a window edge are rescanned with it
+            if old_store is not None:
+                old_starts, old_ends = old_store.starts, old_store.ends
+                for index in range(len(old_store)):
+                    if old_starts[index] < window_start < old_ends[index]:
+                        window_start = old_starts[index]
+                    if old_starts[index] < window_end - delta < old_ends[index]:
+                        window_end = old_ends[index] + delta
+            
+            mapper = self._new_mapper(settings, session_id)
+            if mapper:
+                mapper.seed(previous.mapping_summary or {})
+                # Tokens typed in the text, outside the window too, are never handed out
+                mapper.reserve(match.group() for match in self.patterns.EXISTING_TOKEN.finditer(new_text))
+            
+            lists = self.term_lists.get(tenant_id)
+            # The seeded mapper is kept even when nothing in the window can match
+            window, _, degraded_stages = self._detect(
+                new_text[window_start:window_end], pipeline, start_time, deadline_ms, lists, mapper
+            )
+            
+            # Splice: previous spans before the window, new ones, shifted previous spans after it
+            store = MatchStore(new_text, MATCH_TYPES, AnonymizationMatch, mapper.tokens if mapper else None)
+            token_refs = {token: ref for ref, token in enumerate(mapper.tokens)} if mapper else {}
+            
+            def keep_previous(index: int, shift: int):
+                token = old_store.replacement(index)
+                ref = token_refs.get(token)
+                store.append(
+                    old_store.type_codes[index],
+                    old_store.starts[index] + shift,
+                    old_store.ends[index] + shift,
+                    ref if ref is not None else store.intern_token(token),
+                    old_store.original_text(index)
+                )
+            
+            if old_store is not None:
+                for index in range(len(old_store)):
+                    if old_store.ends[index] <= window_start:
+                        keep_previous(index, 0)
+            if window is not None:
+                for index in range(len(window)):
+                    store.append(
+                        window.type_codes[index],
+                        window.starts[index] + window_start,
+                        window.ends[index] + window_start,
+                        window.token_refs[index] if mapper else store.intern_token(window.replacement(index)),
+                        window.original_text(index)
+                    )
+            if old_store is not None:
+                for index in range(len(old_store)):
+                    if old_store.starts[index] >= window_end - delta:
+                        keep_previous(index, delta)
+            
+            return AnonymizationResult(
+                success=True,
+                original_text=new_text,
+                anonymized_text=store.assemble(),
+                matches=store,
+                anonymizations_count=len(store),
+                processing_time_ms=round((time.perf_counter() - start_time) * 1000, 2),
+                mapping_summary=mapper.get_mapping_summary() if mapper else None,
+                profile_id=pipeline.profile_id,
+                degraded_stages=degraded_stages
+            )
+        
+        except ModelsNotReady:
+            raise
+        except Exception as e:
+            return AnonymizationResult(
+                success=False,
+                original_text=text,
+                anonymized_text=text,
+                processing_time_ms=round((time.perf_counter() - start_time) * 1000, 2),
+                errors=[str(e)]
+            )
     
-    async def _anonymize_ip_intelligent(self, text: str, settings: AnonymizationSettings) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize IP addresses with smart public/private detection."""
-        matches = []
-        anonymized_text = text
+    def _detect_conversation(
+        self,
+        text: str,
+        pipeline: CompiledPipeline,
+        start_time: float,
+        deadline_ms: Optional[float],
+        lists: Optional[TenantLists],
+        conversation: ConversationState,
+        mapper: Optional[ConsistencyMapper] = None
+    ) -> Tuple[Optional[MatchStore], Optional[ConsistencyMapper], List[str]]:
+        """
+        _detect for one turn of a conversation, paragraph by paragraph.
         
-        # Traiter d'abord les IP privées si activé
-        if settings.anonymize_ip_private:
-            for match in self.patterns.IP_PRIVATE.finditer(text):
-                matches.append(AnonymizationMatch(
-                    type=AnonymizationType.IP_PRIVATE,
-                    start=match.start(),
-                    end=match.end(),
-                    original_text=match.group(),
-                    replacement=settings.ip_private_token
-                ))
-            anonymized_text = self.patterns.IP_PRIVATE.sub(settings.ip_private_token, anonymized_text)
+        Paragraphs indexed by a previous turn (same text, same settings and
+        tenant lists) get their spans back without detection; the others are
+        detected, with a mapper seeded from the conversation's mappings and
+        counters, and indexed. The conversation is updated in place.
+        `mapper` is the request's mapper (None: consistent tokens disabled).
+        """
+        text = AnalyzedDocument(text).text
+        scope = f"{pipeline.profile_id}:{lists.version if lists is not None else 0}"
+        degraded_stages: List[str] = []
         
-        # Traiter localhost
-        if settings.anonymize_ip_private:
-            for match in self.patterns.IP_LOCALHOST.finditer(anonymized_text):
-                matches.append(AnonymizationMatch(
-                    type=AnonymizationType.IP_PRIVATE,
-                    start=match.start(),
-                    end=match.end(),
-                    original_text=match.group(),
-                    replacement=settings.ip_private_token
-                ))
-            anonymized_text = self.patterns.IP_LOCALHOST.sub(settings.ip_private_token, anonymized_text)
+        if mapper:
+            mapper.seed(conversation.mappings, conversation.counters)
+            # Tokens typed anywhere in the text are never handed out
+            mapper.reserve(match.group() for match in self.patterns.EXISTING_TOKEN.finditer(text))
         
-        # Traiter les IP publiques (toutes les autres IP valides)
-        if settings.anonymize_ip_public or settings.anonymize_ip:
-            for match in self.patterns.IP_V4.finditer(anonymized_text):
-                # Vérifier que ce n'est pas déjà remplacé par un token
-                if not any(token in match.group() for token in [settings.ip_private_token, settings.ip_public_token]):
-                    matches.append(AnonymizationMatch(
-                        type=AnonymizationType.IP_PUBLIC,
-                        start=match.start(),
-                        end=match.end(),
-                        original_text=match.group(),
-                        replacement=settings.ip_public_token
-                    ))
+        store = MatchStore(text, MATCH_TYPES, AnonymizationMatch, mapper.tokens if mapper else None)
+        token_refs = {token: ref for ref, token in enumerate(mapper.tokens)} if mapper else {}
+        conversation.hits = conversation.misses = 0
+        
+        for start, end in split_paragraphs(text):
+            paragraph = text[start:end]
+            key = conversation.paragraph_key(scope, paragraph)
+            cached = conversation.lookup(key)
+            if cached is not None:
+                conversation.hits += 1
+                for type_value, span_start, span_end, token in cached:
+                    ref = token_refs.get(token)
+                    store.append(
+                        TYPE_CODES[AnonymizationType(type_value)],
+                        span_start + start,
+                        span_end + start,
+                        ref if ref is not None else store.intern_token(token)
+                    )
+                continue
             
-            # Remplacer uniquement les IP non déjà traitées
-            import re
-            def replace_public_ip(match):
-                ip = match.group()
-                if any(token in ip for token in [settings.ip_private_token, settings.ip_public_token]):
-                    return ip  # Déjà traité
-                return settings.ip_public_token
+            conversation.misses += 1
+            found, _, degraded = self._detect(paragraph, pipeline, start_time, deadline_ms, lists, mapper)
+            spans = []
+            if found is not None:
+                for index in range(len(found)):
+                    token = found.replacement(index)
+                    if mapper:
+                        ref = found.token_refs[index]
+                        token_refs.setdefault(token, ref)
+                    else:
+                        ref = store.intern_token(token)
+                    store.append(
+                        found.type_codes[index],
+                        found.starts[index] + start,
+                        found.ends[index] + start,
+                        ref,
+                        found.original_text(index)
+                    )
+                    spans.append([MATCH_TYPES[found.type_codes[index]].value, found.starts[index], found.ends[index], token])
+            # A paragraph missing skipped stages is detected again next turn
+            if degraded:
+                degraded_stages.extend(stage for stage in degraded if stage not in degraded_stages)
+            else:
+                conversation.remember(key, spans)
+        
+        if mapper:
+            conversation.mappings = mapper.get_mapping_summary()
+            conversation.counters = mapper.get_counters()
+        return store, mapper, degraded_stages
+    
+    @staticmethod
+    def _new_mapper(settings: AnonymizationSettings, session_id: Optional[str] = None) -> Optional[ConsistencyMapper]:
+        """Consistency mapper of a request, None if consistent tokens are disabled."""
+        if not settings.use_consistent_tokens:
+            return None
+        if settings.token_mode == "keyed":
+            return ConsistencyMapper(get_default_tokenizer().for_scope(session_id, settings.keyed_token_length))
+        return ConsistencyMapper()
+    
+    def _resolve_pipeline(self, custom_settings: Optional[Dict[str, Any]], profile_id: Optional[str]) -> CompiledPipeline:
+        """Compiled pipeline of a request, from its profile_id or its settings."""
+        if profile_id:
+            pipeline = self.pipelines.get_profile(profile_id)
+            if pipeline is None:
+                raise UnknownProfile(profile_id)
+            return pipeline
+        return self.pipelines.get(custom_settings)
+    
+    def _needs_ner(self, custom_settings: Optional[Dict[str, Any]], profile_id: Optional[str]) -> bool:
+        """Whether a request's settings enable name detection (NER)."""
+        return self._resolve_pipeline(custom_settings, profile_id).settings.anonymize_names
+    
+    def _detect(
+        self,
+        text: str,
+        pipeline: CompiledPipeline,
+        start_time: float,
+        deadline_ms: Optional[float] = None,
+        lists: Optional[TenantLists] = None,
+        mapper: Optional[ConsistencyMapper] = None
+    ) -> Tuple[Optional[MatchStore], Optional[ConsistencyMapper], List[str]]:
+        """
+        Run the detection stages of a request.
+        
+        Args:
+            lists: Deny/allow lists of the request's tenant
+            mapper: Consistency mapper to continue (consistent tokens only),
+                a new one by default
+        
+        Returns:
+            (matches with their tokens, mapper if consistent tokens are enabled,
+            stages skipped to meet the deadline); matches is None when the
+            prefilter ruled out every detector
+        """
+        deadline = start_time + deadline_ms / 1000 if deadline_ms is not None else None
+        degraded_stages: List[str] = []
+        settings = pipeline.settings
+        
+        # The text is normalized, tokenized and lowered once for every stage
+        doc = AnalyzedDocument(text)
+        text = doc.text
+        
+        # Tokens of a previous pass ([PHONE_1]...), e.g. a re-sent conversation,
+        # are masked out of every detector
+        token_spans, existing_tokens = self._existing_tokens(text)
+        
+        # Cheap pre-scan: skip detector families that cannot match, and
+        # return clean text (short questions, code) without any detection.
+        families = self._detector_families(pipeline)
+        if lists is not None and lists.deny is not None:
+            families.insert(0, STAGE_CUSTOM_TERMS)
+        if existing_tokens:
+            skipped = self.prefilter.skipped_families(self.patterns.EXISTING_TOKEN.sub(' ', text), families)
+        else:
+            skipped = self.prefilter.skipped_families(text, families, doc.folded)
+        if families and len(skipped) == len(families):
+            return None, None, degraded_stages
+        
+        # Initialize consistency mapper if enabled
+        if mapper is None and settings.use_consistent_tokens:
+            mapper = ConsistencyMapper()
+        if mapper and existing_tokens:
+            # New values must not reuse the numbers already in the text
+            mapper.reserve(existing_tokens)
+        
+        # PHASE 1: Collect all matches without applying them yet
+        # Stages run by tier - structured identifiers and addresses, then
+        # names, then secondary detectors - and cheapest first within a tier;
+        # a tier only fills the gaps left by the previous ones. Candidates are
+        # resolved in declaration order, whatever the execution order.
+        taken = IntervalIndex()
+        pending: List[Tuple[int, int, List[AnonymizationMatch]]] = []  # (tier, stage rank, candidates)
+        raw_matches: List[AnonymizationMatch] = []
+        
+        # Allow-listed terms are never anonymized, except by the deny-list
+        allowed = IntervalIndex()
+        if lists is not None and lists.allow is not None:
+            for start, end in lists.allow.find(text):
+                allowed.add(start, end)
+        
+        enabled = [family for family in families if family not in skipped]
+        # While the text's NER model loads, names are found by regex only ("degrade" policy)
+        language = None
+        if STAGE_NAMES in enabled and self.detectors[STAGE_NAMES].needs_ner:
+            language = self._detect_language(text)
+            if not self._await_models(language, deadline):
+                degraded_stages.append(DEGRADED_NER)
+        
+        for stage in self.detectors.schedule(enabled):
+            raw_matches.extend(self._resolve_pending(pending, stage.tier, token_spans, text, settings.overlap_policy, taken))
             
-            anonymized_text = self.patterns.IP_V4.sub(replace_public_ip, anonymized_text)
+            # Expensive stages are skipped when out of time
+            if stage.degradable and self._deadline_exceeded(deadline):
+                degraded_stages.append(stage.name)
+                continue
+            
+            # ... or when their triggers only appear in text already covered
+            if stage.tier > 0 and (len(taken) or existing_tokens):
+                covered = sorted(list(taken) + list(token_spans))
+                if not stage.fires_on(uncovered_text(text, covered)):
+                    self.detectors.record_uncovered_skip(stage.name)
+                    continue
+            
+            stage_start = time.perf_counter()
+            for tier, matches in self._run_stage(stage, pipeline, doc, skipped, lists, deadline, language).items():
+                if len(allowed) and stage.name != STAGE_CUSTOM_TERMS:
+                    matches = [match for match in matches if not allowed.covers(match.start, match.end)]
+                pending.append((tier, stage.rank, matches))
+            self.detectors.record(stage.name, time.perf_counter() - stage_start, len(text))
         
-        return anonymized_text, matches
-    
-    async def _anonymize_email(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize email addresses."""
-        matches = []
-        for match in self.patterns.EMAIL.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.EMAIL,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
+        raw_matches.extend(self._resolve_pending(pending, None, token_spans, text, settings.overlap_policy, taken))
+
+        # NOTE: Age et date de naissance désactivés - sans nom/prénom/adresse, pas d'identification possible
+        # if settings.anonymize_birth_dates:
+        #     _, birth_matches = self._anonymize_birth_dates(text, settings.birth_date_token)
+        #     raw_matches.extend(birth_matches)
+        #
+        # if settings.anonymize_age:
+        #     _, age_matches = self._anonymize_age(text, settings.age_token)
+        #     raw_matches.extend(age_matches)
         
-        anonymized_text = self.patterns.EMAIL.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_urls(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize URLs."""
-        matches = []
-        for match in self.patterns.URL.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.URL,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
+        # Apply consistent mapping, store matches compactly
+        return self._apply_consistent_mapping(raw_matches, doc, mapper), mapper, degraded_stages
+    
+    def _run_stage(
+        self,
+        stage: Stage,
+        pipeline: CompiledPipeline,
+        doc: AnalyzedDocument,
+        skip: AbstractSet[str],
+        lists: Optional[TenantLists] = None,
+        deadline: Optional[float] = None,
+        language: Optional[str] = None
+    ) -> Dict[int, List[AnonymizationMatch]]:
+        """Run one scheduled stage (`language`: of the text, if already detected); returns its candidates by overlap tier."""
+        if stage.name == STAGE_CUSTOM_TERMS:
+            token = pipeline.settings.custom_term_token
+            return {stage.tier: [
+                AnonymizationMatch(
+                    type=AnonymizationType.CUSTOM_TERM,
+                    start=start,
+                    end=end,
+                    original_text=doc.text[start:end],
+                    replacement=token
+                )
+                for start, end in lists.deny.find(doc.text)
+            ]}
+        if stage.name == STAGE_NAMES:
+            # Detect language and select the request's NLP model
+            nlp = self._select_nlp_model(doc.text, language) if stage.needs_ner else None
+            _, name_matches = self._anonymize_names(doc.text, pipeline.settings.name_token, doc, nlp, deadline)
+            return {stage.tier: name_matches}
+        return self._collect_scan_matches(pipeline.plans[stage.name], doc, skip)
+    
+    def _resolve_pending(
+        self,
+        pending: List[Tuple[int, int, List[AnonymizationMatch]]],
+        below: Optional[int],
+        token_spans: IntervalIndex,
+        text: str,
+        policy: str,
+        taken: IntervalIndex
+    ) -> List[AnonymizationMatch]:
+        """
+        Resolve the pending candidates of the tiers below `below` (all if None),
+        one tier at a time, and remove them from `pending`.
+        """
+        ready = [entry for entry in pending if below is None or entry[0] < below]
+        if not ready:
+            return []
+        pending[:] = [entry for entry in pending if below is not None and entry[0] >= below]
+        ready.sort(key=lambda entry: entry[:2])
         
-        anonymized_text = self.patterns.URL.sub(token, text)
-        return anonymized_text, matches
+        accepted = []
+        for tier in sorted({entry[0] for entry in ready}):
+            candidates = [match for entry in ready if entry[0] == tier for match in entry[2]]
+            candidates = self._outside_tokens(candidates, token_spans, text)
+            accepted.extend(resolve_overlaps(candidates, policy, self._type_priority, taken))
+        return accepted
+    
+    @staticmethod
+    def _detector_families(pipeline: CompiledPipeline) -> List[str]:
+        """Detector families enabled by a pipeline, as keyed in DETECTORS."""
+        families = [entry.key for entry in pipeline.plans[STAGE_STRUCTURED].entries]
+        if STAGE_ADDRESSES in pipeline.plans:
+            families.append(STAGE_ADDRESSES)
+        if pipeline.settings.anonymize_names:
+            families.append(STAGE_NAMES)
+        return families
+    
+    def _existing_tokens(self, text: str) -> Tuple[IntervalIndex, List[str]]:
+        """Spans and values of the tokens already present in text ([EMAIL_2]...)."""
+        spans = IntervalIndex()
+        tokens = []
+        for match in self.patterns.EXISTING_TOKEN.finditer(text):
+            spans.add(match.start(), match.end())
+            tokens.append(match.group())
+        return spans, tokens
+    
+    @staticmethod
+    def _outside_tokens(matches: List[AnonymizationMatch], tokens: IntervalIndex, text: str) -> List[AnonymizationMatch]:
+        """
+        Keep existing tokens out of new matches.
+        
+        Matches starting inside a token are dropped; matches running into a
+        token (e.g. "Diagnostic: ..." followed by [NAME_1]) are cut just
+        before it.
+        """
+        if not len(tokens):
+            return matches
+        kept = []
+        for match in matches:
+            if not tokens.overlaps(match.start, match.end):
+                kept.append(match)
+                continue
+            if tokens.contains(match.start):
+                continue
+            original = text[match.start:tokens.next_start(match.start)].rstrip()
+            if original:
+                kept.append(AnonymizationMatch(
+                    type=match.type,
+                    start=match.start,
+                    end=match.start + len(original),
+                    original_text=original,
+                    replacement=match.replacement
+                ))
+        return kept
     
-    async def _anonymize_names(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize names using NLP model or fallback to regex."""
-        return await self._anonymize_names_nlp(text, token)
+    @staticmethod
+    def _deadline_exceeded(deadline: Optional[float]) -> bool:
+        """Check whether a perf_counter() deadline has passed (None = no deadline)."""
+        return deadline is not None and time.perf_counter() >= deadline
     
-    async def _anonymize_addresses(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize postal addresses with priority to complete addresses."""
-        matches = []
-        anonymized_text = text
+    @staticmethod
+    def _type_priority(match: AnonymizationMatch) -> int:
+        """Rank of a match type when arbitrating overlaps (lower wins)."""
+        return TYPE_PRIORITY.get(match.type, len(TYPE_PRIORITY))
+    
+    def _build_scan_plans(self, settings: AnonymizationSettings) -> Dict[str, ScanPlan]:
+        """
+        Build the single-pass scan plans for the regex detectors.
+        
+        STAGE_STRUCTURED covers every always-on detector; addresses get their own
+        plan (STAGE_ADDRESSES) so they can be skipped under a deadline.
+        Entry order mirrors the historical detector order: it breaks ties
+        between candidates of equal start and length during deduplication.
+        """
+        p = self.patterns
+        entries = []
+        
+        if settings.anonymize_email:
+            entries.append(ScanEntry("email", p.EMAIL, (AnonymizationType.EMAIL, settings.email_token, 0)))
+        
+        if settings.anonymize_phone:
+            entries.append(ScanEntry("phone", p.PHONE, (AnonymizationType.PHONE, settings.phone_token, 0)))
+        
+        # IPv4 and IPv6 candidates are classified with range tables (ip_ranges.py):
+        # private, loopback and link-local addresses get the private token,
+        # or the public one when private IPs are not anonymized separately
+        if settings.anonymize_ip or settings.anonymize_ip_public or settings.anonymize_ip_private:
+            public = None
+            if settings.anonymize_ip_public or settings.anonymize_ip:
+                public = (AnonymizationType.IP_PUBLIC, settings.ip_public_token)
+            private = (AnonymizationType.IP_PRIVATE, settings.ip_private_token) if settings.anonymize_ip_private else public
+            entries.append(ScanEntry("ipv4", p.IP_V4, (public, private)))
+            entries.append(ScanEntry("ipv6", p.IP_V6, (public, private)))
+        
+        if settings.anonymize_urls:
+            entries.append(ScanEntry("url", p.URL, (AnonymizationType.URL, settings.url_token, 0)))
+        
+        if settings.anonymize_nir:
+            entries.append(ScanEntry("nir", p.NIR, (AnonymizationType.NIR, settings.nir_token, 0)))
+        
+        # Medical reference identifiers (e.g., ref #MED-4432): only the identifier is replaced
+        if settings.anonymize_medical_data:
+            entries.append(ScanEntry("medical_ref", p.MEDICAL_REF, (AnonymizationType.MEDICAL_REFERENCE, settings.medical_ref_token, 1)))
+        
+        address_entries = []
+        if settings.anonymize_addresses:
+            address = (AnonymizationType.ADDRESS, settings.address_token, 0)
+            address_entries.append(ScanEntry("address_complete", p.FRENCH_COMPLETE_ADDRESS, address))
+            address_entries.append(ScanEntry("address_precise", p.PRECISE_ADDRESS, address))
+            address_entries.append(ScanEntry("address_postal", p.FRENCH_POSTAL, address))
+            address_entries.append(ScanEntry("address_street", p.FRENCH_STREET, address))
+        
+        # Secondary detectors, in priority order
+        secondary = [
+            (settings.anonymize_id_cards, "id_card", p.ID_CARD, AnonymizationType.ID_CARD, settings.id_card_token),
+            (settings.anonymize_passports, "passport", p.PASSPORT, AnonymizationType.PASSPORT, settings.passport_token),
+            (settings.anonymize_logins, "login", p.LOGIN, AnonymizationType.LOGIN, settings.login_token),
+            (settings.anonymize_employee_ids, "employee_id", p.EMPLOYEE_ID, AnonymizationType.EMPLOYEE_ID, settings.employee_id_token),
+            (settings.anonymize_salary_data, "salary", p.SALARY_DATA, AnonymizationType.SALARY_DATA, settings.salary_token),
+            (settings.anonymize_medical_data, "medical", p.MEDICAL_DATA, AnonymizationType.MEDICAL_DATA, settings.medical_token),
+            (settings.anonymize_bank_accounts, "bank_account", p.BANK_ACCOUNT, AnonymizationType.BANK_ACCOUNT, settings.bank_account_token),
+            (settings.anonymize_grades, "grades", p.GRADES, AnonymizationType.GRADES, settings.grades_token),
+            (settings.anonymize_legal_cases, "legal_case", p.LEGAL_CASE, AnonymizationType.LEGAL_CASE, settings.legal_case_token),
+            (settings.anonymize_geolocations, "geolocation", p.GEOLOCATION, AnonymizationType.GEOLOCATION, settings.geolocation_token),
+            (settings.anonymize_biometric, "biometric", p.BIOMETRIC, AnonymizationType.BIOMETRIC, settings.biometric_token),
+            (settings.anonymize_credit_cards, "credit_card", p.CREDIT_CARD, AnonymizationType.CREDIT_CARD, settings.credit_card_token),
+            (settings.anonymize_iban, "iban", p.IBAN, AnonymizationType.IBAN, settings.iban_token),
+        ]
+        for enabled, key, pattern, match_type, token in secondary:
+            if enabled:
+                entries.append(ScanEntry(key, pattern, (match_type, token, 0), tier=self.detectors[key].tier))
+        
+        plans = {STAGE_STRUCTURED: self._scan_plan(entries)}
+        if address_entries:
+            plans[STAGE_ADDRESSES] = self._scan_plan(address_entries)
+        return plans
+    
+    def _scan_plan(self, entries: List[ScanEntry]) -> ScanPlan:
+        """Compile entries with the backends, anchors and checksums declared by their patterns."""
+        p = self.patterns
+        entries = [
+            replace(
+                entry,
+                backends=p.backends_for(entry.pattern),
+                anchors=p.anchors_for(entry.pattern),
+                lead=p.lead_for(entry.pattern),
+                checksum=p.checksum_for(entry.pattern)
+            )
+            for entry in entries
+        ]
+        return ScanPlan(entries, self.regex_backends)
+    
+    def _collect_scan_matches(
+        self,
+        plan: ScanPlan,
+        doc: AnalyzedDocument,
+        skip: Optional[AbstractSet[str]] = None
+    ) -> Dict[int, List[AnonymizationMatch]]:
+        """
+        Run the scan plan once and convert its candidates into matches.
+        
+        Args:
+            doc: Analyzed text, shared between plans
+            skip: Entry keys left out of the scan (see PiiPrefilter)
+        
+        Returns:
+            Matches of each overlap tier, in entry order
+        """
+        text = doc.text
+        found = plan.scan(text, skip, doc)
+        by_tier: Dict[int, List[AnonymizationMatch]] = {}
+        
+        for entry in plan.entries:
+            matches = by_tier.setdefault(entry.tier, [])
+            if entry.key in IP_CLASSIFIERS:
+                matches.extend(self._collect_ips(found[entry.key], IP_CLASSIFIERS[entry.key], *entry.tag))
+                continue
+            match_type, token, group = entry.tag
+            if entry.key == "address_complete":
+                # Address sub-patterns are resolved together
+                matches.extend(self._collect_addresses(found, text, token))
+                continue
+            if entry.key.startswith("address_"):
+                continue
+            for match in found[entry.key]:
+                matches.append(AnonymizationMatch(
+                    type=match_type,
+                    start=match.start(group),
+                    end=match.end(group),
+                    original_text=match.group(group),
+                    replacement=token
+                ))
         
-        # FIRST: Anonymize complete addresses (number + street + postal + city)
-        complete_addresses = []
-        for match in self.patterns.FRENCH_COMPLETE_ADDRESS.finditer(text):
+        return by_tier
+    
+    @staticmethod
+    def _collect_ips(
+        candidates: List[Any],
+        classify: Callable[[str], Optional[str]],
+        public: Optional[Tuple[AnonymizationType, str]],
+        private: Optional[Tuple[AnonymizationType, str]]
+    ) -> List[AnonymizationMatch]:
+        """
+        Classify IP candidates and keep the enabled classes.
+        
+        Args:
+            classify: Parser/classifier of the candidates' address family
+            public: (type, token) of public addresses, None to keep them
+            private: (type, token) of private, loopback and link-local addresses
+        """
+        matches = []
+        for candidate in candidates:
+            address = candidate.group()
+            address_class = classify(address)
+            if address_class is None:
+                continue  # Not an address (e.g. a time such as 10:14:03)
+            target = public if address_class == PUBLIC else private
+            if target is None:
+                continue
+            match_type, token = target
             matches.append(AnonymizationMatch(
-                type=AnonymizationType.ADDRESS,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group().strip(),
+                type=match_type,
+                start=candidate.start(),
+                end=candidate.end(),
+                original_text=address,
                 replacement=token
             ))
-            complete_addresses.append((match.start(), match.end()))
-        # Also consider PRECISE_ADDRESS pattern (handles comma-separated formats like "7 Impasse..., 13001 Marseille")
-        for match in self.patterns.PRECISE_ADDRESS.finditer(text):
+        return matches
+    
+    def _collect_addresses(self, found: Dict[str, List[Any]], text: str, token: str) -> List[AnonymizationMatch]:
+        """
+        Build address matches with priority to complete addresses.
+        
+        Complete addresses are always kept. Precise addresses, postal codes
+        and streets are dropped when they start inside a complete or precise
+        address already kept; a single sweep in text order tracks the end of
+        the covered region.
+        """
+        kinds = ("address_complete", "address_precise", "address_postal", "address_street")
+        events = sorted(
+            ((match.start(), rank, match) for rank, kind in enumerate(kinds) for match in found[kind]),
+            key=lambda event: (event[0], event[1])
+        )
+        
+        kept: Dict[str, List[AnonymizationMatch]] = {kind: [] for kind in kinds}
+        covered_end = 0
+        for start, rank, match in events:
+            kind = kinds[rank]
+            
+            if kind == "address_complete":
+                # FIRST: complete addresses (number + street + postal + city)
+                kept[kind].append(AnonymizationMatch(
+                    type=AnonymizationType.ADDRESS,
+                    start=start,
+                    end=match.end(),
+                    original_text=match.group().strip(),
+                    replacement=token
+                ))
+                covered_end = max(covered_end, match.end())
+                continue
+            
             # Avoid duplicating ranges already captured
-            if not any(start <= match.start() < end for start, end in complete_addresses):
+            if start < covered_end:
+                continue
+            
+            if kind == "address_precise":
+                # PRECISE_ADDRESS handles comma-separated formats like "7 Impasse..., 13001 Marseille".
                 # If the regex span contains a newline (it may capture following header lines), limit it to the first newline
                 full = match.group()
                 if '\n' in full:
-                    newline_offset = full.index('\n')
-                    new_start = match.start()
-                    new_end = match.start() + newline_offset
-                    original = text[new_start:new_end].strip()
+                    end = start + full.index('\n')
+                    original = text[start:end].strip()
                 else:
-                    new_start = match.start()
-                    new_end = match.end()
+                    end = match.end()
                     original = full.strip()
-
-                matches.append(AnonymizationMatch(
+                kept[kind].append(AnonymizationMatch(
                     type=AnonymizationType.ADDRESS,
-                    start=new_start,
-                    end=new_end,
+                    start=start,
+                    end=end,
                     original_text=original,
                     replacement=token
                 ))
-                complete_addresses.append((new_start, new_end))
-        
-        # Apply complete address anonymization
-        for match in sorted([m for m in matches if m.type == AnonymizationType.ADDRESS], 
-                           key=lambda x: x.start, reverse=True):
-            anonymized_text = (
-                anonymized_text[:match.start] + 
-                match.replacement + 
-                anonymized_text[match.end:]
-            )
-        
-        # THEN: Anonymize remaining postal codes (not already covered)
-        for match in self.patterns.FRENCH_POSTAL.finditer(text):
-            # Check if this postal code is not already part of a complete address
-            is_covered = any(start <= match.start() < end for start, end in complete_addresses)
-            if not is_covered:
-                matches.append(AnonymizationMatch(
-                    type=AnonymizationType.ADDRESS,
-                    start=match.start(),
-                    end=match.end(),
-                    original_text=match.group(),
-                    replacement=token
-                ))
-        
-        # FINALLY: Anonymize remaining street addresses (not already covered)
-        for match in self.patterns.FRENCH_STREET.finditer(text):
-            # Check if this street is not already part of a complete address
-            is_covered = any(start <= match.start() < end for start, end in complete_addresses)
-            if not is_covered:
-                matches.append(AnonymizationMatch(
+                covered_end = max(covered_end, end)
+            else:
+                # THEN: remaining postal codes and street addresses
+                kept[kind].append(AnonymizationMatch(
                     type=AnonymizationType.ADDRESS,
-                    start=match.start(),
+                    start=start,
                     end=match.end(),
                     original_text=match.group(),
                     replacement=token
                 ))
         
-        # Re-apply anonymization for remaining matches
-        remaining_matches = [m for m in matches if m.type == AnonymizationType.ADDRESS][len(complete_addresses):]
-        for match in sorted(remaining_matches, key=lambda x: x.start, reverse=True):
-            anonymized_text = (
-                anonymized_text[:match.start] + 
-                match.replacement + 
-                anonymized_text[match.end:]
-            )
-        
-        return anonymized_text, matches
-    
-    async def _anonymize_credit_cards(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize credit card numbers."""
-        matches = []
-        for match in self.patterns.CREDIT_CARD.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.CREDIT_CARD,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        
-        anonymized_text = self.patterns.CREDIT_CARD.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_iban(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize IBAN numbers."""
-        matches = []
-        for match in self.patterns.IBAN.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.IBAN,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        
-        anonymized_text = self.patterns.IBAN.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_names_nlp(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
+        return [match for kind in kinds for match in kept[kind]]
+    
+    def _anonymize_names(
+        self,
+        text: str,
+        token: str,
+        doc: Optional[AnalyzedDocument] = None,
+        nlp: Optional[Any] = None,
+        deadline: Optional[float] = None
+    ) -> Tuple[str, List[AnonymizationMatch]]:
+        """
+        Anonymize names using NLP model or fallback to regex (`doc`: analyzed
+        text, if already built; `nlp`: the request's model, regex only if None;
+        `deadline`: perf_counter time bounding the wait for a NER batch).
+        """
+        return self._anonymize_names_nlp(text, token, doc, nlp, deadline)
+    
+    def _anonymize_names_nlp(
+        self,
+        text: str,
+        token: str,
+        doc: Optional[AnalyzedDocument] = None,
+        nlp: Optional[Any] = None,
+        deadline: Optional[float] = None
+    ) -> Tuple[str, List[AnonymizationMatch]]:
         """Anonymize names using spaCy NLP model combined with regex fallback."""
         matches = []
+        analyzed = doc if doc is not None else AnalyzedDocument(text, normalize=False)
         
-        if not self.nlp:
+        if not nlp:
             # Fallback to regex pattern if NLP not available
-            return await self._anonymize_names_regex(text, token)
+            return self._anonymize_names_regex(text, token, analyzed)
         
         try:
-            doc = self.nlp(text)
+            if self.ner_batcher is not None:
+                # Past the request's deadline, the batch is abandoned for the regex fallback
+                timeout = max(0.0, deadline - time.perf_counter()) if deadline is not None else None
+                doc = analyzed.parse(nlp, lambda model, text: self.ner_batcher.parse(model, text, timeout))
+            else:
+                with self._model_lock(nlp):
+                    doc = analyzed.parse(nlp)
             
             # Préfixes à supprimer des entités PER (salutations, titres généraux)
             greeting_prefixes = ['bonjour', 'bonsoir', 'salut', 'cher', 'chère', 'hello', 'hi', 'dear']
@@ -1123,9 +1957,10 @@ class AnonymizationEngine:
                     # Track total offset for position calculation
                     cleaned_text = entity_text
                     prefix_offset = 0  # Track how many characters we've removed from start
+                    lower_entity = analyzed.lower(ent.start_char, ent.start_char + len(entity_text))
                     
                     for prefix in greeting_prefixes:
-                        if cleaned_text.lower().startswith(prefix + ' '):
+                        if lower_entity.startswith(prefix + ' '):
                             prefix_offset += len(prefix) + 1  # +1 for the space
                             cleaned_text = cleaned_text[len(prefix) + 1:].strip()
                             break
@@ -1195,7 +2030,7 @@ class AnonymizationEngine:
                     
                     # Skip common false positives for ORG (keep only real company names)
                     org_false_positives = {'université', 'master', 'informatique', 'mathématiques', 'paris', 'lyon', 'france', 'licence', 'doctorat', 'titulaire', 'école', 'analyse', 'données', 'projets'}
-                    if entity_text.lower().strip() in org_false_positives:
+                    if analyzed.lower(ent.start_char, ent.start_char + len(entity_text)).strip() in org_false_positives:
                         continue
                     
                     # Skip very short entities or fragments
@@ -1282,7 +2117,7 @@ class AnonymizationEngine:
                             replacement="[ID]"
                         ))
                     # Check if it looks like a person name with better heuristics
-                    elif self._is_likely_person_name(entity_text):
+                    elif self._is_likely_person_name(analyzed.span(ent.start_char, end_pos)):
                         matches.append(AnonymizationMatch(
                             type=AnonymizationType.NAME,
                             start=ent.start_char,
@@ -1293,7 +2128,10 @@ class AnonymizationEngine:
             
             # ADD REGEX FALLBACK: Look for names that NLP might have missed
             # Get areas already covered by NLP matches
-            covered_ranges = [(match.start, match.end) for match in matches if match.type == AnonymizationType.NAME]
+            covered = IntervalIndex()
+            for match in matches:
+                if match.type == AnonymizationType.NAME:
+                    covered.add(match.start, match.end)
             
             # Apply regex pattern to find additional names
             for regex_match in self.patterns.FRENCH_NAME.finditer(text):
@@ -1301,9 +2139,9 @@ class AnonymizationEngine:
                 regex_text = regex_match.group()
                 
                 # Only add if not already covered by NLP AND passes name validation
-                if not any(nlp_start <= start < nlp_end or nlp_start < end <= nlp_end for nlp_start, nlp_end in covered_ranges):
+                if not covered.overlaps(start, end):
                     # Apply same filtering as NLP matches
-                    if self._is_likely_person_name(regex_text):
+                    if self._is_likely_person_name(analyzed.span(start, end)):
                         matches.append(AnonymizationMatch(
                             type=AnonymizationType.NAME,
                             start=start,
@@ -1312,28 +2150,25 @@ class AnonymizationEngine:
                             replacement=token
                         ))
             
-            # Replace entities in reverse order to maintain positions
-            anonymized_text = text
-            for match in sorted(matches, key=lambda x: x.start, reverse=True):
-                anonymized_text = (
-                    anonymized_text[:match.start] + 
-                    match.replacement + 
-                    anonymized_text[match.end:]
-                )
-            
-            return anonymized_text, matches
+            return self._assemble_text(text, matches), matches
             
         except Exception as e:
             logger.warning(f"NLP error: {e}. Falling back to regex-based name detection.")
-            return await self._anonymize_names_regex(text, token)
-    
-    async def _anonymize_names_regex(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
+            return self._anonymize_names_regex(text, token, analyzed)
+    
+    def _anonymize_names_regex(
+        self,
+        text: str,
+        token: str,
+        doc: Optional[AnalyzedDocument] = None
+    ) -> Tuple[str, List[AnonymizationMatch]]:
         """Fallback regex-based name anonymization."""
+        doc = doc if doc is not None else AnalyzedDocument(text, normalize=False)
         matches = []
         for match in self.patterns.FRENCH_NAME.finditer(text):
             match_text = match.group()
             # Apply same filtering as NLP matches
-            if self._is_likely_person_name(match_text):
+            if self._is_likely_person_name(doc.span(match.start(), match.end())):
                 matches.append(AnonymizationMatch(
                     type=AnonymizationType.NAME,
                     start=match.start(),
@@ -1342,19 +2177,11 @@ class AnonymizationEngine:
                     replacement=token
                 ))
         
-        # Replace in reverse order to maintain positions
-        anonymized_text = text
-        for m in sorted(matches, key=lambda x: x.start, reverse=True):
-            anonymized_text = (
-                anonymized_text[:m.start] + 
-                m.replacement + 
-                anonymized_text[m.end:]
-            )
-        return anonymized_text, matches
+        return self._assemble_text(text, matches), matches
     
     # === NOUVELLES MÉTHODES D'ANONYMISATION ===
     
-    async def _anonymize_birth_dates(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
+    def _anonymize_birth_dates(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
         """Anonymize birth dates."""
         matches = []
         for match in self.patterns.BIRTH_DATE.finditer(text):
@@ -1368,7 +2195,7 @@ class AnonymizationEngine:
         anonymized_text = self.patterns.BIRTH_DATE.sub(token, text)
         return anonymized_text, matches
     
-    async def _anonymize_age(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
+    def _anonymize_age(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
         """Anonymize age references."""
         matches = []
         for match in self.patterns.AGE.finditer(text):
@@ -1381,176 +2208,3 @@ class AnonymizationEngine:
             ))
         anonymized_text = self.patterns.AGE.sub(token, text)
         return anonymized_text, matches
-    
-    async def _anonymize_id_cards(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize ID card numbers."""
-        matches = []
-        for match in self.patterns.ID_CARD.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.ID_CARD,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.ID_CARD.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_passports(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize passport numbers."""
-        matches = []
-        for match in self.patterns.PASSPORT.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.PASSPORT,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.PASSPORT.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_logins(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize login identifiers."""
-        matches = []
-        for match in self.patterns.LOGIN.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.LOGIN,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.LOGIN.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_employee_ids(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize employee IDs."""
-        matches = []
-        for match in self.patterns.EMPLOYEE_ID.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.EMPLOYEE_ID,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.EMPLOYEE_ID.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_salary_data(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize salary information."""
-        matches = []
-        for match in self.patterns.SALARY_DATA.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.SALARY_DATA,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.SALARY_DATA.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_bank_accounts(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize bank account numbers."""
-        matches = []
-        for match in self.patterns.BANK_ACCOUNT.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.BANK_ACCOUNT,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.BANK_ACCOUNT.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_medical_references(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize structured medical reference identifiers (e.g., ref #MED-4432)."""
-        matches: List[AnonymizationMatch] = []
-        def _repl(m: re.Match) -> str:
-            identifier = m.group(1)
-            # Record exact location of the identifier for mapping
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.MEDICAL_REFERENCE,
-                start=m.start(1),
-                end=m.end(1),
-                original_text=identifier,
-                replacement=token
-            ))
-            # Replace only the identifier, keep the prefix (ref, dossier, etc.) intact
-            return m.group(0).replace(identifier, token)
-
-        anonymized_text = self.patterns.MEDICAL_REF.sub(_repl, text)
-        return anonymized_text, matches
-
-    async def _anonymize_medical_data(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize medical free-text references (diagnostic, traitement...)."""
-        matches = []
-        for match in self.patterns.MEDICAL_DATA.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.MEDICAL_DATA,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.MEDICAL_DATA.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_geolocations(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize GPS coordinates."""
-        matches = []
-        for match in self.patterns.GEOLOCATION.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.GEOLOCATION,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.GEOLOCATION.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_grades(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize grades and scores."""
-        matches = []
-        for match in self.patterns.GRADES.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.GRADES,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.GRADES.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_legal_cases(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize legal case references."""
-        matches = []
-        for match in self.patterns.LEGAL_CASE.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.LEGAL_CASE,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.LEGAL_CASE.sub(token, text)
-        return anonymized_text, matches
-    
-    async def _anonymize_biometric(self, text: str, token: str) -> Tuple[str, List[AnonymizationMatch]]:
-        """Anonymize biometric references."""
-        matches = []
-        for match in self.patterns.BIOMETRIC.finditer(text):
-            matches.append(AnonymizationMatch(
-                type=AnonymizationType.BIOMETRIC,
-                start=match.start(),
-                end=match.end(),
-                original_text=match.group(),
-                replacement=token
-            ))
-        anonymized_text = self.patterns.BIOMETRIC.sub(token, text)
-        return anonymized_text, matches
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Runtime configuration loaded from config.toml.
+
+The file lives next to main.py; WHISPER_CONFIG points to another file.
+Missing file or missing keys fall back to the defaults given by callers.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent.parent / "config.toml"
+
+
+def load_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """Read a TOML configuration file (empty dict if unavailable)."""
+    config_path = Path(path or os.getenv("WHISPER_CONFIG", DEFAULT_CONFIG_PATH))
+    if tomllib is None:
+        logger.warning("tomllib/tomli not available, using default configuration")
+        return {}
+    try:
+        with open(config_path, "rb") as f:
+            return tomllib.load(f)
+    except FileNotFoundError:
+        logger.info(f"No configuration file at {config_path}, using defaults")
+    except Exception as e:
+        logger.warning(f"Cannot read configuration {config_path}: {e}")
+    return {}
+
+
+# Global configuration instance
+_config: Optional[Dict[str, Any]] = None
+
+
+def get_config() -> Dict[str, Any]:
+    """Get or load global configuration."""
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
+
+
+def get_setting(section: str, key: str, default: Any = None) -> Any:
+    """Value of `[section] key`, or default."""
+    return get_config().get(section, {}).get(key, default)
@@ -0,0 +1,95 @@
+"""
+Conversation state carried across the turns of a session.
+
+A chat conversation is re-sent turn after turn. ConversationState keeps what
+the engine needs to continue it instead of starting over: the token mappings
+and counters (so `[NAME_1]` keeps designating the same person), and an index
+of the paragraphs already anonymized, keyed by a hash of their text and of
+the settings used. Paragraphs found in the index get their previous spans
+back without detection; only new paragraphs are analyzed. The state holds no
+original text besides the mappings already kept by the session.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Paragraphs are separated by blank lines
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t\r\f\v]*\n\s*')
+
+# A cached span: [match type value, start, end, token], offsets relative to the paragraph
+CachedSpan = List[Any]
+
+
+def split_paragraphs(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of the non-blank paragraphs of a text."""
+    spans = []
+    position = 0
+    for separator in _PARAGRAPH_BREAK.finditer(text):
+        if text[position:separator.start()].strip():
+            spans.append((position, separator.start()))
+        position = separator.end()
+    if text[position:].strip():
+        spans.append((position, len(text)))
+    return spans
+
+
+class ConversationState:
+    """Token mappings, counters and paragraph index of one conversation."""
+
+    def __init__(
+        self,
+        mappings: Optional[Dict[str, Dict[str, str]]] = None,
+        counters: Optional[Dict[str, int]] = None,
+        paragraphs: Optional[Dict[str, List[CachedSpan]]] = None,
+        max_paragraphs: int = 512
+    ):
+        """
+        Args:
+            mappings: {type: {original: token}} of the previous turns
+            counters: {type: next token number} of the previous turns
+            paragraphs: Paragraph index, as returned by to_dict()
+            max_paragraphs: Paragraphs kept in the index (oldest dropped first)
+        """
+        self.mappings: Dict[str, Dict[str, str]] = mappings or {}
+        self.counters: Dict[str, int] = counters or {}
+        self.paragraphs: "OrderedDict[str, List[CachedSpan]]" = OrderedDict(paragraphs or {})
+        self.max_paragraphs = max_paragraphs
+        # Paragraphs reused / analyzed by the last call
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def paragraph_key(scope: str, paragraph: str) -> str:
+        """Index key of a paragraph anonymized under a scope (settings profile, tenant lists)."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(scope.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(paragraph.encode("utf-8"))
+        return digest.hexdigest()
+
+    def lookup(self, key: str) -> Optional[List[CachedSpan]]:
+        """Spans of an indexed paragraph, or None."""
+        spans = self.paragraphs.get(key)
+        if spans is not None:
+            self.paragraphs.move_to_end(key)
+        return spans
+
+    def remember(self, key: str, spans: List[CachedSpan]):
+        """Index the spans of a paragraph."""
+        self.paragraphs[key] = spans
+        self.paragraphs.move_to_end(key)
+        while len(self.paragraphs) > self.max_paragraphs:
+            self.paragraphs.popitem(last=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, for session storage."""
+        return {
+            "mappings": self.mappings,
+            "counters": self.counters,
+            "paragraphs": dict(self.paragraphs),
+        }
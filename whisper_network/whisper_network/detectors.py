@@ -0,0 +1,167 @@
+"""
+Detector registry and cost-aware stage scheduling.
+
+Every entity family is declared once as a Detector: the pass that finds it
+(detectors of a stage share one scan), its overlap tier, its prefilter
+trigger, an estimated cost and whether it needs NER. The registry derives
+the prefilter triggers and the type priorities from these declarations and
+orders the stages of a request: lower (high-precision) tiers first, then by
+increasing cost. A stage whose lower tiers are already resolved only runs if
+one of its triggers fires on the text they left uncovered. Measured stage
+timings are folded back into the cost estimates.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .prefilter import TextProfile, Trigger
+
+# Overlap tiers: a tier only fills the gaps left by the previous ones
+TIER_PRIMARY = 0     # Structured identifiers and addresses
+TIER_NAMES = 1       # Named entities
+TIER_SECONDARY = 2   # Context detectors (ID cards, logins, salaries...)
+
+
+@dataclass(frozen=True)
+class Detector:
+    """Declaration of one entity family."""
+    name: str                           # Family, as used by the prefilter and the scan entries
+    types: Tuple[Any, ...]              # Match types produced, in overlap priority order
+    stage: str                          # Pass running it; detectors of a stage share one scan
+    tier: int = TIER_PRIMARY            # Overlap tier of its matches
+    cost: float = 1.0                   # Estimated cost, in µs per 1000 characters
+    trigger: Optional[Trigger] = None   # Necessary condition (see prefilter.py), None = always runs
+    needs_ner: bool = False             # Needs a spaCy/NER model
+    degradable: bool = False            # Skipped once the request deadline is spent
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One pass of a request, with the enabled detectors it runs."""
+    name: str
+    rank: int                           # Declaration order, used to order candidates within a tier
+    tier: int                           # Lowest tier of its detectors
+    cost: float                         # Current cost estimate
+    detectors: Tuple[Detector, ...]
+
+    @property
+    def degradable(self) -> bool:
+        return all(detector.degradable for detector in self.detectors)
+
+    @property
+    def needs_ner(self) -> bool:
+        return any(detector.needs_ner for detector in self.detectors)
+
+    def fires_on(self, text: str) -> bool:
+        """Check whether one of the stage's triggers fires on a text."""
+        profile = TextProfile(text)
+        return any(detector.trigger is None or profile.fires(detector.trigger) for detector in self.detectors)
+
+
+class DetectorRegistry:
+    """Registered detectors, their stages and their running cost estimates."""
+
+    def __init__(self, detectors: Iterable[Detector], smoothing: float = 0.2):
+        """
+        Args:
+            detectors: Declarations, in overlap priority order within each tier
+            smoothing: Weight of a new timing in the cost moving average
+        """
+        self.detectors: Dict[str, Detector] = {}
+        for detector in detectors:
+            if detector.name in self.detectors:
+                raise ValueError(f"Detector registered twice: {detector.name}")
+            self.detectors[detector.name] = detector
+        self.smoothing = smoothing
+
+        self._ranks: Dict[str, int] = {}
+        self._costs: Dict[str, float] = {}
+        for detector in self.detectors.values():
+            self._ranks.setdefault(detector.stage, len(self._ranks))
+            self._costs[detector.stage] = self._costs.get(detector.stage, 0.0) + detector.cost
+        self._lock = threading.Lock()
+        self.runs: Dict[str, int] = {}
+        self.uncovered_skips: Dict[str, int] = {}
+
+    def __getitem__(self, name: str) -> Detector:
+        return self.detectors[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.detectors
+
+    @property
+    def triggers(self) -> Dict[str, Optional[Trigger]]:
+        """Prefilter trigger of each family."""
+        return {name: detector.trigger for name, detector in self.detectors.items()}
+
+    def type_priority(self) -> Dict[Any, int]:
+        """Rank of each match type when arbitrating overlaps (lower wins)."""
+        ordered = sorted(self.detectors.values(), key=lambda detector: detector.tier)
+        priority: Dict[Any, int] = {}
+        for detector in ordered:
+            for match_type in detector.types:
+                priority.setdefault(match_type, len(priority))
+        return priority
+
+    def cost(self, stage: str) -> float:
+        """Current cost estimate of a stage, in µs per 1000 characters."""
+        return self._costs[stage]
+
+    def schedule(self, families: Iterable[str]) -> List[Stage]:
+        """Stages running the given families: lower tiers first, then cheapest first."""
+        by_stage: Dict[str, List[Detector]] = {}
+        for family in families:
+            detector = self.detectors[family]
+            by_stage.setdefault(detector.stage, []).append(detector)
+        stages = [
+            Stage(
+                name=name,
+                rank=self._ranks[name],
+                tier=min(detector.tier for detector in detectors),
+                cost=self._costs[name],
+                detectors=tuple(detectors)
+            )
+            for name, detectors in by_stage.items()
+        ]
+        stages.sort(key=lambda stage: (stage.tier, stage.cost, stage.rank))
+        return stages
+
+    def record(self, stage: str, seconds: float, chars: int):
+        """Fold a measured stage run into its cost estimate."""
+        measured = seconds * 1e6 * 1000 / max(chars, 1)
+        with self._lock:
+            self._costs[stage] += self.smoothing * (measured - self._costs[stage])
+            self.runs[stage] = self.runs.get(stage, 0) + 1
+
+    def record_uncovered_skip(self, stage: str):
+        """Count a stage skipped because its triggers only appear in covered text."""
+        with self._lock:
+            self.uncovered_skips[stage] = self.uncovered_skips.get(stage, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cost estimates and run counters of each stage, for monitoring."""
+        return {
+            stage: {
+                "cost_us_per_kchar": round(self._costs[stage], 1),
+                "runs": self.runs.get(stage, 0),
+                "uncovered_skips": self.uncovered_skips.get(stage, 0),
+                "detectors": [name for name, detector in self.detectors.items() if detector.stage == stage],
+            }
+            for stage in sorted(self._ranks, key=self._ranks.get)
+        }
+
+
+def uncovered_text(text: str, spans: Sequence[Tuple[int, int]]) -> str:
+    """Text with the given sorted, disjoint spans blanked out (offsets unchanged)."""
+    parts = []
+    position = 0
+    for start, end in spans:
+        parts.append(text[position:start])
+        parts.append(" " * (end - start))
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
@@ -0,0 +1,169 @@
+"""
+Analyzed document shared by every detection stage of a request.
+
+The text is NFC-normalized, split into whitespace-delimited words (with
+offsets) and lowered once; regex scans, the PII prefilter, keyword anchors,
+name heuristics and the NER stage all read from the same AnalyzedDocument
+instead of calling `.lower()`, `.split()` or the spaCy pipeline again on
+the same substrings.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .numeric_runs import DigitRunIndex
+
+_WORD = re.compile(r'\S+')
+
+# Case flags of a word
+UPPER = 1   # Only capitals among its cased characters ("JOLY")
+TITLE = 2   # Capital first letter followed by a lowercase one ("Sylvain")
+
+
+def case_flags(word: str) -> int:
+    """Case flags (UPPER, TITLE) of a word."""
+    flags = 0
+    if word.isupper():
+        flags |= UPPER
+    if word[:1].isupper() and any(char.islower() for char in word[1:]):
+        flags |= TITLE
+    return flags
+
+
+class DocSpan:
+    """A substring of an analyzed document, with its lowered text and words."""
+
+    __slots__ = ("text", "lower", "words", "_lower_words", "_flags")
+
+    def __init__(
+        self,
+        text: str,
+        lower: Optional[str] = None,
+        words: Optional[List[str]] = None,
+        lower_words: Optional[List[str]] = None
+    ):
+        self.text = text
+        self.lower = lower if lower is not None else text.lower()
+        self.words = words if words is not None else text.split()
+        self._lower_words = lower_words
+        self._flags: Optional[Tuple[int, ...]] = None
+
+    @property
+    def lower_words(self) -> List[str]:
+        """Lowercase words."""
+        if self._lower_words is None:
+            self._lower_words = self.lower.split()
+        return self._lower_words
+
+    @property
+    def flags(self) -> Tuple[int, ...]:
+        """Case flags of each word."""
+        if self._flags is None:
+            self._flags = tuple(case_flags(word) for word in self.words)
+        return self._flags
+
+
+class AnalyzedDocument:
+    """Normalized text of one request with its words, lowered view and digit runs."""
+
+    __slots__ = ("text", "normalized", "_lowered", "_folded", "_word_starts", "_word_ends", "_runs", "_parses")
+
+    def __init__(self, text: str, normalize: bool = True):
+        """
+        Args:
+            text: Text of the request
+            normalize: Apply NFC normalization (composed accents, as matched by the patterns)
+        """
+        self.normalized = normalize and not unicodedata.is_normalized("NFC", text)
+        self.text = unicodedata.normalize("NFC", text) if self.normalized else text
+        self._lowered: Optional[str] = None
+        self._folded: Optional[str] = None
+        self._word_starts: Optional[array] = None
+        self._word_ends: Optional[array] = None
+        self._runs: Optional[DigitRunIndex] = None
+        self._parses: Dict[int, Tuple[Any, Any]] = {}
+
+    @property
+    def lowered(self) -> str:
+        """Lowercase view of the text."""
+        if self._lowered is None:
+            self._lowered = self.text.lower()
+        return self._lowered
+
+    @property
+    def folded(self) -> str:
+        """Case-folded view of the text, as matched by re.IGNORECASE."""
+        if self._folded is None:
+            self._folded = self.text.casefold()
+        return self._folded
+
+    @property
+    def runs(self) -> DigitRunIndex:
+        """Digit runs of the text (see numeric_runs.py)."""
+        if self._runs is None:
+            self._runs = DigitRunIndex(self.text)
+        return self._runs
+
+    def _tokenize(self):
+        starts, ends = array('i'), array('i')
+        for match in _WORD.finditer(self.text):
+            starts.append(match.start())
+            ends.append(match.end())
+        self._word_starts, self._word_ends = starts, ends
+
+    @property
+    def word_count(self) -> int:
+        if self._word_starts is None:
+            self._tokenize()
+        return len(self._word_starts)
+
+    def word_spans(self, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(start, end) of the words overlapping [start, end), clipped to it."""
+        if self._word_starts is None:
+            self._tokenize()
+        if end is None:
+            end = len(self.text)
+        starts, ends = self._word_starts, self._word_ends
+        first = bisect_right(ends, start)
+        last = bisect_left(starts, end)
+        return [(max(starts[i], start), min(ends[i], end)) for i in range(first, last)]
+
+    def lower(self, start: int, end: int) -> str:
+        """Lowercase text of [start, end)."""
+        lowered = self.lowered
+        if len(lowered) == len(self.text):
+            return lowered[start:end]
+        # Lowercasing changed the length somewhere (e.g. "İ"): offsets do not line up
+        return self.text[start:end].lower()
+
+    def span(self, start: int, end: int) -> DocSpan:
+        """Substring [start, end) with its lowered text and words, read from the document."""
+        text = self.text
+        spans = self.word_spans(start, end)
+        lower_words = None
+        if len(self.lowered) == len(text):
+            lowered = self.lowered
+            lower_words = [lowered[word_start:word_end] for word_start, word_end in spans]
+        return DocSpan(
+            text[start:end],
+            self.lower(start, end),
+            [text[word_start:word_end] for word_start, word_end in spans],
+            lower_words
+        )
+
+    def parse(self, nlp: Any, runner: Optional[Callable[[Any, str], Any]] = None) -> Any:
+        """
+        spaCy parse of the text with a model, computed once per model
+        (`runner(nlp, text)`, e.g. a NerBatcher, instead of `nlp(text)` if given).
+        """
+        cached = self._parses.get(id(nlp))
+        if cached is None or cached[0] is not nlp:
+            parsed = runner(nlp, self.text) if runner is not None else nlp(self.text)
+            cached = self._parses[id(nlp)] = (nlp, parsed)
+        return cached[1]
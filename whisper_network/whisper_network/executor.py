@@ -0,0 +1,94 @@
+"""
+Bounded executor for CPU-heavy anonymization work.
+
+spaCy/CamemBERT NER and the detection passes are synchronous and can take
+hundreds of milliseconds on a long prompt. Run on the event loop, they
+stall every other request (health checks, /deanonymize, the fast path).
+BoundedExecutor runs them on a small thread pool instead and refuses new
+work once `workers + max_queue` jobs are in flight, so overload is reported
+(ExecutorSaturated, HTTP 503) instead of growing an unbounded backlog.
+Queue depth and the time jobs wait for a worker are kept as metrics.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when the executor already holds its maximum number of jobs."""
+
+
+class BoundedExecutor:
+    """Thread pool with a bounded queue and wait-time metrics."""
+
+    def __init__(self, workers: int = 1, max_queue: int = 32, name: str = "whisper-ner"):
+        """
+        Args:
+            workers: Worker threads (jobs running at once)
+            max_queue: Jobs allowed to wait for a worker; more are refused
+            name: Prefix of the worker thread names
+        """
+        if workers < 1 or max_queue < 0:
+            raise ValueError("workers must be >= 1 and max_queue >= 0")
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) on a worker; ExecutorSaturated if the queue is full."""
+        with self._lock:
+            if self.queued + self.running >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(
+                    f"{self.queued + self.running} jobs in flight (workers={self.workers}, max_queue={self.max_queue})"
+                )
+            self.queued += 1
+        submitted = time.perf_counter()
+
+        def job():
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        return await asyncio.get_running_loop().run_in_executor(self._pool, job)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads (pending jobs still run if wait)."""
+        self._pool.shutdown(wait=wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, counters and wait times, for monitoring."""
+        with self._lock:
+            started = self.running + self.completed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_ms_avg": round(self._wait_total / started * 1000, 2) if started else 0.0,
+                "wait_ms_max": round(self._wait_max * 1000, 2),
+            }
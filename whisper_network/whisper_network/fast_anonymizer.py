@@ -9,6 +9,36 @@ from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import hashlib
 
+from .keyed_tokens import KeyedTokenizer
+from .keyword_anchors import KeywordAnchors
+from .prefilter import PiiPrefilter, Trigger
+
+
+# Déclencheur minimal de chaque famille de patterns (None = toujours exécutée)
+_DIGITS = Trigger(digits=True)
+FAST_TRIGGERS: Dict[str, Optional[Trigger]] = {
+    'email': Trigger(chars=('@',)),
+    'iban': _DIGITS,
+    'credit_card': _DIGITS,
+    'ip': _DIGITS,
+    'phone': _DIGITS,
+    'nir': _DIGITS,
+    'url': Trigger(chars=('://',)),
+    'matricule': Trigger(keywords=('emp', 'mat')),
+    'salaire': _DIGITS,
+    'evaluation': Trigger(keywords=('note', 'évaluation', 'performance', 'appréciation')),
+    'planning': Trigger(keywords=('horaire', 'planning', 'shift', 'poste')),
+    'organization': None,  # IGNORECASE : aucune classe de caractères discriminante
+    'names': None,         # Listes de noms insensibles à la casse
+}
+
+# Patterns commençant toujours par un mot-clé : testés uniquement là où il apparaît
+FAST_ANCHORS: Dict[str, Tuple[str, ...]] = {
+    'evaluation': ('note', 'évaluation', 'performance', 'appréciation'),
+    'planning': ('horaire', 'planning', 'shift', 'poste'),
+    'org_keyword': ('client', 'société', 'entreprise', 'groupe', 'filiale', 'partenaire', 'fournisseur', 'prestataire'),
+}
+
 
 @dataclass
 class FastAnonymizationResult:
@@ -28,8 +58,16 @@ class FastAnonymizer:
     Conçu pour les environnements avec ressources limitées.
     """
     
-    def __init__(self):
+    # Partagé entre instances (une instance est créée par requête) pour garder les compteurs
+    prefilter = PiiPrefilter(FAST_TRIGGERS)
+    # Automate de mots-clés construit une seule fois au démarrage
+    keyword_anchors = KeywordAnchors(FAST_ANCHORS)
+    
+    def __init__(self, tokenizer: Optional[KeyedTokenizer] = None):
+        # Tokens dérivés des valeurs ([EMAIL_7f3a9c], voir keyed_tokens.py) au lieu d'un compteur
+        self.tokenizer = tokenizer
         self.consistency_map = {}
+        self._token_digests: Dict[str, str] = {}  # Token à clé -> empreinte de sa valeur
         self.pattern_cache = {}
         self._compile_patterns()
     
@@ -148,6 +186,15 @@ class FastAnonymizer:
             re.IGNORECASE
         )
     
+    def _anchored_matches(self, pattern_key: str, text: str, anchors_cache: Dict[str, Tuple[str, Dict]]):
+        """Matches d'un pattern à mots-clés, testé seulement aux positions de ses mots-clés."""
+        cached_text, anchors = anchors_cache.get('text', (None, None))
+        if cached_text != text:
+            # Une seule passe pour tous les mots-clés, refaite seulement si le texte a changé
+            anchors = self.keyword_anchors.find(text)
+            anchors_cache['text'] = (text, anchors)
+        return KeywordAnchors.iter_matches(self.pattern_cache[pattern_key], text, anchors[pattern_key])
+    
     def _get_consistent_token(self, category: str, original: str, base_token: str) -> str:
         """
         Génère un token cohérent et lisible basé sur un compteur par catégorie.
@@ -164,13 +211,29 @@ class FastAnonymizer:
             self.consistency_map[category] = {}
         
         if original not in self.consistency_map[category]:
-            # Compteur simple pour chaque catégorie
-            counter = len(self.consistency_map[category]) + 1
-            self.consistency_map[category][original] = f"[{base_token}_{counter}]"
+            if self.tokenizer is not None:
+                # Token à clé, allongé s'il désigne déjà une autre valeur
+                # (deux écritures d'une même valeur normalisée partagent le leur)
+                token = self.tokenizer.token(
+                    base_token, category, original,
+                    lambda candidate, digest: self._token_digests.get(candidate, digest) != digest
+                )
+                self._token_digests.setdefault(token, self.tokenizer.digest(category, original))
+                self.consistency_map[category][original] = token
+            else:
+                # Compteur simple pour chaque catégorie
+                counter = len(self.consistency_map[category]) + 1
+                self.consistency_map[category][original] = f"[{base_token}_{counter}]"
         
         return self.consistency_map[category][original]
     
     async def anonymize_fast(self, text: str, settings: Dict[str, bool]) -> FastAnonymizationResult:
+        """
+        Version async de anonymize_sync (mêmes arguments et résultat).
+        """
+        return self.anonymize_sync(text, settings)
+    
+    def anonymize_sync(self, text: str, settings: Dict[str, bool]) -> FastAnonymizationResult:
         """
         Anonymisation rapide utilisant uniquement des regex pré-compilées.
         """
@@ -200,11 +263,30 @@ class FastAnonymizer:
                 ('anonymize_organizations', 'organization', 'ORG'),
             ]
             
+            # Pré-scan : familles sans caractère déclencheur ignorées, texte sans PII renvoyé tel quel
+            families = [pattern_key for setting_key, pattern_key, _ in anonymization_steps if settings.get(setting_key, False)]
+            if settings.get('anonymize_names', False):
+                families.append('names')
+            skipped = self.prefilter.skipped_families(text, families)
+            if families and len(skipped) == len(families):
+                return FastAnonymizationResult(
+                    success=True,
+                    original_text=text,
+                    anonymized_text=text,
+                    anonymizations_count=0,
+                    processing_time_ms=(time.time() - start_time) * 1000,
+                    mapping_summary={}
+                )
+            
+            anchors_cache: Dict[str, Tuple[str, Dict]] = {}
             for setting_key, pattern_key, token_base in anonymization_steps:
-                if settings.get(setting_key, False):
+                if settings.get(setting_key, False) and pattern_key not in skipped:
                     if pattern_key in self.pattern_cache:
                         pattern = self.pattern_cache[pattern_key]
-                        matches = pattern.findall(anonymized_text)
+                        if pattern_key in FAST_ANCHORS:
+                            matches = [m.group() for m in self._anchored_matches(pattern_key, anonymized_text, anchors_cache)]
+                        else:
+                            matches = pattern.findall(anonymized_text)
                         
                         if matches:
                             category_mappings = {}
@@ -237,7 +319,7 @@ class FastAnonymizer:
                 # Pattern "client/société/entreprise + ORG"
                 org_keyword_pattern = self.pattern_cache.get('org_keyword')
                 if org_keyword_pattern:
-                    for match in org_keyword_pattern.finditer(anonymized_text):
+                    for match in self._anchored_matches('org_keyword', anonymized_text, anchors_cache):
                         org_name = match.group(1)  # Le groupe capturé
                         if len(org_name) >= 2:
                             token = self._get_consistent_token('organization', org_name, 'ORG')
@@ -0,0 +1,126 @@
+"""
+IP address classification with integer range tables.
+
+Each IPv4/IPv6 candidate found by the scan is parsed once into an integer
+and classified (private, loopback, link-local or public) by a bisect in a
+sorted table of non-overlapping ranges, instead of running one regex per
+address class.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import ipaddress
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Tuple
+
+# Address classes
+PRIVATE = "private"
+LOOPBACK = "loopback"
+LINK_LOCAL = "link_local"
+PUBLIC = "public"
+
+# IPv4-mapped IPv6 addresses (::ffff:a.b.c.d) are classified as their IPv4 part
+_MAPPED_V4 = ipaddress.ip_network("::ffff:0:0/96")
+
+
+class RangeTable:
+    """Sorted, non-overlapping integer ranges, each with a class."""
+
+    def __init__(self, networks: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            networks: (CIDR, class) pairs; addresses outside every range are PUBLIC
+        """
+        ranges = []
+        for cidr, label in networks:
+            network = ipaddress.ip_network(cidr)
+            ranges.append((int(network.network_address), int(network.broadcast_address), label))
+        ranges.sort()
+        for (_, previous_end, _), (start, _, _) in zip(ranges, ranges[1:]):
+            if start <= previous_end:
+                raise ValueError("IP ranges must not overlap")
+        self.starts: List[int] = [start for start, _, _ in ranges]
+        self.ends: List[int] = [end for _, end, _ in ranges]
+        self.labels: List[str] = [label for _, _, label in ranges]
+
+    def classify(self, value: int) -> str:
+        """Class of an address given as an integer."""
+        i = bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i]:
+            return self.labels[i]
+        return PUBLIC
+
+
+IPV4_RANGES = RangeTable([
+    ("10.0.0.0/8", PRIVATE),
+    ("127.0.0.0/8", LOOPBACK),
+    ("169.254.0.0/16", LINK_LOCAL),
+    ("172.16.0.0/12", PRIVATE),
+    ("192.168.0.0/16", PRIVATE),
+])
+
+IPV6_RANGES = RangeTable([
+    ("::1/128", LOOPBACK),
+    ("fc00::/7", PRIVATE),       # Unique local addresses
+    ("fe80::/10", LINK_LOCAL),
+])
+
+
+def parse_ipv4(text: str) -> Optional[int]:
+    """Integer value of a dotted IPv4 address (leading zeros accepted), or None."""
+    parts = text.split(".")
+    if len(parts) != 4:
+        return None
+    value = 0
+    for part in parts:
+        if not (part.isascii() and part.isdigit()) or len(part) > 3:
+            return None
+        octet = int(part)
+        if octet > 255:
+            return None
+        value = (value << 8) | octet
+    return value
+
+
+def parse_ipv6(text: str) -> Optional[int]:
+    """Integer value of an IPv6 address, or None if text is not one."""
+    try:
+        return int(ipaddress.IPv6Address(text))
+    except ValueError:
+        return None
+
+
+def classify_ipv4(text: str) -> Optional[str]:
+    """Class of an IPv4 candidate, or None if it does not parse."""
+    value = parse_ipv4(text)
+    return None if value is None else IPV4_RANGES.classify(value)
+
+
+def looks_like_ipv6(text: str) -> bool:
+    """
+    Whether an IPv6 candidate has the shape of an address written in text.
+
+    Compressed forms with short groups also read as code (a::b, arr[1::2]):
+    a candidate needs 3 explicit hex groups, or a "::" and a group of 3-4
+    hex digits (fe80::1), or to be ::1 or an IPv4-mapped ::ffff: address.
+    """
+    lowered = text.lower()
+    if lowered == "::1" or lowered.startswith("::ffff:"):
+        return True
+    groups = [group for group in lowered.split(":") if group and "." not in group]
+    if len(groups) >= 3:
+        return True
+    return "::" in lowered and any(len(group) >= 3 for group in groups)
+
+
+def classify_ipv6(text: str) -> Optional[str]:
+    """Class of an IPv6 candidate, or None if it does not parse, does not look like an address or is ::."""
+    if not looks_like_ipv6(text):
+        return None
+    value = parse_ipv6(text)
+    if not value:
+        return None
+    if int(_MAPPED_V4.network_address) <= value <= int(_MAPPED_V4.broadcast_address):
+        return IPV4_RANGES.classify(value & 0xFFFFFFFF)
+    return IPV6_RANGES.classify(value)
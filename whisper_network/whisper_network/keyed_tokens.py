@@ -0,0 +1,134 @@
+"""
+Keyed deterministic tokens.
+
+Sequential tokens ([EMAIL_1], [EMAIL_2]...) depend on the order values were
+seen, so replicas must share a counter to agree on them. Keyed tokens are
+derived from the value itself: the first hex digits of an HMAC-SHA256 of the
+normalized value, keyed with a server secret and the session id
+([EMAIL_7f3a9c]). Every worker holding the secret produces the same token
+for the same value of the same session, without any shared state, and the
+token reveals nothing about the value without the secret.
+
+Token length versus collision rate: with L hex digits, two distinct values
+of one type collide with probability 16^-L, and a session holding n values
+of a type contains a collision with probability about n² / (2 · 16^L):
+
+    L = 4 (65 536 tokens):        50 values ~ 1.9 %,    500 values ~ 85 %
+    L = 6 (16.8 million, default): 500 values ~ 0.7 %,  5 000 values ~ 52 %
+    L = 8 (4.3 billion):           5 000 values ~ 0.3 %, 50 000 values ~ 25 %
+
+A collision is resolved by the mapper that sees both values: the second one
+gets two more digits of its digest ([EMAIL_7f3a9c04]), so tokens stay unique
+within a mapping. Two replicas that each see only one of two colliding
+values cannot detect it; longer tokens make this rarer at the cost of a few
+more characters (and LLM tokens) per replacement.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+import threading
+import unicodedata
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_LENGTH = 6
+MIN_TOKEN_LENGTH = 4
+MAX_TOKEN_LENGTH = 16
+DIGEST_LENGTH = 64  # Hex digits of an HMAC-SHA256: longest token once lengthened by collisions
+
+# Numbers typed with separators ("06 12 34 56 78", "06.12.34.56.78") get one token
+_NUMERIC_VALUE = re.compile(r'[\d\s.\-/()+]+')
+_NUMBER_SEPARATORS = re.compile(r'[\s.\-/()]+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_value(value: str) -> str:
+    """Canonical form of a value before hashing (case, spacing and number separators ignored)."""
+    value = unicodedata.normalize("NFC", value).strip()
+    if _NUMERIC_VALUE.fullmatch(value):
+        return _NUMBER_SEPARATORS.sub("", value)
+    return _SPACES.sub(" ", value.casefold())
+
+
+class KeyedTokenizer:
+    """Derives tokens from values with a secret key."""
+
+    def __init__(self, secret: bytes, length: int = DEFAULT_TOKEN_LENGTH):
+        """
+        Args:
+            secret: Key shared by every replica (WHISPER_TOKEN_SECRET)
+            length: Hex digits of a token (see the trade-off above)
+        """
+        if not MIN_TOKEN_LENGTH <= length <= MAX_TOKEN_LENGTH:
+            raise ValueError(f"Token length must be between {MIN_TOKEN_LENGTH} and {MAX_TOKEN_LENGTH}")
+        self._secret = secret
+        self.length = length
+
+    def for_scope(self, scope: Optional[str], length: Optional[int] = None) -> "KeyedTokenizer":
+        """Tokenizer keyed for one scope (a session id): tokens differ from one session to another."""
+        key = self._secret
+        if scope:
+            key = hmac.new(self._secret, scope.encode("utf-8"), hashlib.sha256).digest()
+        return KeyedTokenizer(key, length or self.length)
+
+    def digest(self, value_type: str, value: str) -> str:
+        """Full hex digest of a value of a type."""
+        message = f"{value_type}\0{normalize_value(value)}".encode("utf-8")
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def token(
+        self,
+        base: str,
+        value_type: str,
+        value: str,
+        is_taken: Callable[[str, str], bool] = lambda token, digest: False
+    ) -> str:
+        """
+        Token of a value, e.g. [EMAIL_7f3a9c].
+
+        Args:
+            base: Token name (EMAIL, PHONE...)
+            value_type: Type the value is mapped under (part of the hash)
+            value: Original value
+            is_taken: Whether a token (with the value's digest) already
+                designates a value of another digest; the token is then
+                lengthened until it is free. Values with the same normalized
+                form share their digest, hence their token.
+        """
+        digest = self.digest(value_type, value)
+        length = self.length
+        token = f"[{base}_{digest[:length]}]"
+        while is_taken(token, digest):
+            length += 2
+            if length > DIGEST_LENGTH:
+                # Same digest prefix on 64 digits: practically impossible
+                raise ValueError(f"Keyed token collision for type {value_type}")
+            token = f"[{base}_{digest[:length]}]"
+        return token
+
+
+_default: Optional[KeyedTokenizer] = None
+_default_lock = threading.Lock()
+
+
+def get_default_tokenizer() -> KeyedTokenizer:
+    """Tokenizer keyed with WHISPER_TOKEN_SECRET (a random per-process key if unset)."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                secret = os.getenv("WHISPER_TOKEN_SECRET")
+                if not secret:
+                    logger.warning("WHISPER_TOKEN_SECRET not set: keyed tokens use a random key "
+                                   "and will differ between replicas and restarts")
+                    secret = secrets.token_hex(32)
+                _default = KeyedTokenizer(secret.encode("utf-8"))
+    return _default
@@ -0,0 +1,98 @@
+"""
+Keyword anchoring for context-triggered detectors.
+
+Detectors such as LOGIN ("login: jdupont") or MEDICAL_DATA ("diagnostic:
+...") always start with a keyword from a fixed list. Instead of running
+each of them case-insensitively over the whole text, KeywordAnchors finds
+every keyword occurrence of every detector in a single pass (an Aho-Corasick
+automaton when pyahocorasick is installed, one combined regex otherwise);
+each detector's regex is then only tried at its own anchors.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import logging
+import re
+from typing import Any, Dict, Hashable, Iterator, List, Mapping, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
+
+
+class KeywordAnchors:
+    """One-pass, case-insensitive search of the keywords of several detectors."""
+
+    def __init__(self, keywords: Mapping[Hashable, Sequence[str]], use_automaton: bool = AHOCORASICK_AVAILABLE):
+        """
+        Args:
+            keywords: Keywords of each detector (matched case-insensitively)
+            use_automaton: Use pyahocorasick when available
+        """
+        self.keywords = {owner: tuple(words) for owner, words in keywords.items()}
+        by_keyword: Dict[str, List[Hashable]] = {}
+        for owner, words in self.keywords.items():
+            for word in words:
+                by_keyword.setdefault(word.lower(), []).append(owner)
+
+        self._automaton = None
+        if use_automaton and AHOCORASICK_AVAILABLE and by_keyword:
+            self._automaton = ahocorasick.Automaton()
+            for word, owners in by_keyword.items():
+                self._automaton.add_word(word, (len(word), tuple(owners)))
+            self._automaton.make_automaton()
+
+        # Regex fallback: a zero-width lookahead reports every position where
+        # any keyword starts, then each owner's keywords are checked there.
+        alternation = "|".join(re.escape(word) for word in sorted(by_keyword, key=len, reverse=True))
+        self._positions = re.compile(f"(?=(?:{alternation}))", re.IGNORECASE) if by_keyword else None
+        self._owner_patterns = {
+            owner: re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+            for owner, words in self.keywords.items() if words
+        }
+
+    def find(self, text: str, lowered: Optional[str] = None) -> Dict[Hashable, List[int]]:
+        """Sorted start offsets of the keywords of each detector (`lowered`: text.lower(), if known)."""
+        anchors: Dict[Hashable, List[int]] = {owner: [] for owner in self.keywords}
+        if self._positions is None:
+            return anchors
+
+        if self._automaton is not None:
+            if lowered is None:
+                lowered = text.lower()
+            # Lowercasing rarely changes the length (e.g. "İ"); offsets would shift
+            if len(lowered) == len(text):
+                for end, (length, owners) in self._automaton.iter(lowered):
+                    for owner in owners:
+                        anchors[owner].append(end - length + 1)
+                for positions in anchors.values():
+                    positions.sort()
+                return anchors
+
+        owner_patterns = self._owner_patterns.items()
+        for hit in self._positions.finditer(text):
+            position = hit.start()
+            for owner, pattern in owner_patterns:
+                if pattern.match(text, position):
+                    anchors[owner].append(position)
+        return anchors
+
+    @staticmethod
+    def iter_matches(pattern: Any, text: str, anchors: Sequence[int]) -> Iterator[Any]:
+        """`pattern.finditer(text)` restricted to anchor positions (valid when every match starts on an anchor)."""
+        blocked_until = 0
+        last = None
+        for position in anchors:
+            if position < blocked_until or position == last:
+                continue
+            last = position
+            match = pattern.match(text, position)
+            if match is not None:
+                blocked_until = match.end() if match.end() > position else position + 1
+                yield match
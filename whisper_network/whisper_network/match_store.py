@@ -0,0 +1,111 @@
+"""
+Compact, column-wise storage of anonymization matches.
+
+Large files produce hundreds of thousands of matches, while the API only
+needs counts and the mapping summary. MatchStore keeps accepted matches as
+parallel arrays (start, end, type code, token reference) and only builds
+match objects when a caller actually indexes or iterates the store.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+
+class MatchStore:
+    """Accepted matches of one text, stored as parallel arrays."""
+
+    __slots__ = (
+        "text", "starts", "ends", "type_codes", "token_refs",
+        "token_table", "_types", "_factory", "_interned", "_originals",
+    )
+
+    def __init__(
+        self,
+        text: str,
+        types: Sequence[Any],
+        factory: Callable[..., Any],
+        token_table: Optional[List[str]] = None
+    ):
+        """
+        Args:
+            text: Original text the spans refer to
+            types: Type of each type code (code = index)
+            factory: Builds a match object from (type, start, end, original_text, replacement)
+            token_table: Shared token table (e.g. the ConsistencyMapper's); tokens
+                are interned locally when omitted
+        """
+        self.text = text
+        self.starts = array('i')
+        self.ends = array('i')
+        self.type_codes = array('B')
+        self.token_refs = array('i')
+        self.token_table = token_table if token_table is not None else []
+        self._types = types
+        self._factory = factory
+        self._interned: Dict[str, int] = {}
+        # Sparse: only matches whose original text differs from text[start:end]
+        self._originals: Dict[int, str] = {}
+
+    def intern_token(self, token: str) -> int:
+        """Reference of a token in the local token table."""
+        ref = self._interned.get(token)
+        if ref is None:
+            ref = self._interned[token] = len(self.token_table)
+            self.token_table.append(token)
+        return ref
+
+    def append(self, type_code: int, start: int, end: int, token_ref: int, original_text: Optional[str] = None):
+        """Store one match; original_text is only kept if it is not text[start:end]."""
+        if original_text is not None and original_text != self.text[start:end]:
+            self._originals[len(self.starts)] = original_text
+        self.starts.append(start)
+        self.ends.append(end)
+        self.type_codes.append(type_code)
+        self.token_refs.append(token_ref)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def original_text(self, index: int) -> str:
+        original = self._originals.get(index)
+        if original is None:
+            return self.text[self.starts[index]:self.ends[index]]
+        return original
+
+    def replacement(self, index: int) -> str:
+        return self.token_table[self.token_refs[index]]
+
+    def __getitem__(self, index):
+        """Materialize one match (or a list of matches for a slice)."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("match index out of range")
+        return self._factory(
+            self._types[self.type_codes[index]],
+            self.starts[index],
+            self.ends[index],
+            self.original_text(index),
+            self.replacement(index)
+        )
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def assemble(self) -> str:
+        """Build the anonymized text in one join (spans must not overlap)."""
+        starts, ends, text = self.starts, self.ends, self.text
+        parts = []
+        position = 0
+        for index in sorted(range(len(starts)), key=starts.__getitem__):
+            parts.append(text[position:starts[index]])
+            parts.append(self.token_table[self.token_refs[index]])
+            position = ends[index]
+        parts.append(text[position:])
+        return "".join(parts)
@@ -0,0 +1,132 @@
+"""
+Background loading of the NER models.
+
+Loading the spaCy packages (and CamemBERT with torch) takes seconds; done
+while the API module is imported, it delays the first connection. A
+ModelLoader runs the engine's model loaders in a daemon thread instead, so
+regex-only requests are served at once, and records the status of each
+model for the readiness endpoint.
+
+A request only depends on the model it needs: a spaCy model is used as soon
+as it is loaded, whatever the state of the others. Until it is, requests
+needing it follow the engine's policy:
+    "degrade"  names are found by regex only, "ner" is reported in degraded_stages
+    "wait"     wait up to a bound for the models, then ModelsNotReady (503)
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+NER_POLICY_DEGRADE = "degrade"
+NER_POLICY_WAIT = "wait"
+NER_POLICIES = (NER_POLICY_DEGRADE, NER_POLICY_WAIT)
+
+# Model statuses; the last three are final
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+UNAVAILABLE = "unavailable"  # Package not installed
+FAILED = "failed"
+
+
+class ModelsNotReady(RuntimeError):
+    """The models are still loading and the request cannot be served without them."""
+
+
+class ModelLoader:
+    """Loads named models, in order, in the calling thread or in the background."""
+
+    def __init__(self, loaders: Dict[str, Callable[[], Any]]):
+        """
+        Args:
+            loaders: Model name -> function loading it; the function returns
+                None, or raises ImportError/OSError, when the model is not installed
+        """
+        self.loaders = dict(loaders)
+        self._status: Dict[str, Dict[str, Any]] = {name: {"status": PENDING} for name in self.loaders}
+        self._settled = {name: threading.Event() for name in self.loaders}  # Set on a final status
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether every model has been loaded, or found missing."""
+        return self._done.is_set()
+
+    def settled(self, name: str) -> bool:
+        """Whether a model has been loaded, or found missing (unknown names are settled)."""
+        event = self._settled.get(name)
+        return event is None or event.is_set()
+
+    def wait(self, timeout: Optional[float] = None, name: Optional[str] = None) -> bool:
+        """Block until loading is over, or one model settled (at most timeout seconds); True if it is."""
+        if name is not None and name in self._settled:
+            return self._settled[name].wait(timeout)
+        return self._done.wait(timeout)
+
+    def load(self):
+        """Load every model in the calling thread."""
+        with self._lock:
+            if self.started_at is not None:
+                return
+            self.started_at = time.perf_counter()
+        for name, loader in self.loaders.items():
+            self._load_one(name, loader)
+        elapsed = time.perf_counter() - self.started_at
+        logger.info(f"Models loaded in {elapsed:.1f} s: {', '.join(f'{n}={s}' for n, s in self.statuses().items())}")
+        self._done.set()
+
+    def start(self) -> threading.Thread:
+        """Load every model in a background thread (once)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.load, name="whisper-model-loader", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def _load_one(self, name: str, loader: Callable[[], Any]):
+        self._set(name, status=LOADING)
+        start = time.perf_counter()
+        try:
+            model = loader()
+        except (ImportError, OSError) as e:
+            logger.warning(f"Model {name} not available: {e}")
+            self._set(name, status=UNAVAILABLE, error=str(e))
+            return
+        except Exception as e:
+            logger.error(f"Model {name} failed to load: {e}")
+            self._set(name, status=FAILED, error=str(e))
+            return
+        if model is None:
+            logger.warning(f"Model {name} not available")
+            self._set(name, status=UNAVAILABLE)
+        else:
+            self._set(name, status=READY, load_ms=round((time.perf_counter() - start) * 1000, 1))
+
+    def _set(self, name: str, **status: Any):
+        with self._lock:
+            self._status[name] = status
+        if status["status"] not in (PENDING, LOADING):
+            self._settled[name].set()
+
+    def statuses(self) -> Dict[str, str]:
+        """Status of each model."""
+        with self._lock:
+            return {name: entry["status"] for name, entry in self._status.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model status, load time and error, for the readiness endpoint."""
+        with self._lock:
+            return {
+                "ready": self._done.is_set(),
+                "models": {name: dict(entry) for name, entry in self._status.items()},
+            }
@@ -0,0 +1,157 @@
+"""
+Cross-request micro-batching of NER.
+
+Under load, many small requests each call `nlp(text)` on their own and
+spaCy's batched path is never used. NerBatcher gives each model a queue and
+a worker thread: a request submits its text and waits; the worker collects
+the pending texts of its model for at most `max_wait_ms` after the first one
+(or until `max_batch` texts), parses them with `nlp.pipe(batch_size=...)`
+and hands each request its document. `max_wait_ms` bounds the latency added
+to a request; `max_batch` and `batch_size` set the throughput. Since only
+the worker thread calls its model, models are never called concurrently.
+When a batch fails, its texts are parsed again one by one, so only the
+request whose text breaks the model gets the error.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch size histogram buckets
+_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class NerBatcher:
+    """Batches the NER calls of concurrent requests, per model."""
+
+    def __init__(self, max_batch: int = 32, max_wait_ms: float = 5.0, batch_size: int = 100):
+        """
+        Args:
+            max_batch: Texts parsed together at most
+            max_wait_ms: Time a batch waits for more texts after its first one
+            batch_size: batch_size passed to nlp.pipe
+        """
+        if max_batch < 1 or max_wait_ms < 0 or batch_size < 1:
+            raise ValueError("max_batch and batch_size must be >= 1, max_wait_ms >= 0")
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batch_size = batch_size
+        self._queues: Dict[int, "queue.Queue[Optional[Tuple[str, float, Future]]]"] = {}
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.documents = 0
+        self.max_seen = 0
+        self._sizes = [0] * (len(_SIZE_BUCKETS) + 1)
+        self._wait_total = 0.0
+
+    def parse(self, nlp: Any, text: str, timeout: Optional[float] = None) -> Any:
+        """
+        spaCy document of text, parsed in a batch with other requests' texts.
+        
+        Raises:
+            concurrent.futures.TimeoutError: Not parsed within timeout seconds
+                (the text is then dropped from its batch if not parsed yet)
+        """
+        future: Future = Future()
+        self._queue(nlp).put((text, time.perf_counter(), future))
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _queue(self, nlp: Any) -> "queue.Queue":
+        jobs = self._queues.get(id(nlp))
+        if jobs is None:
+            with self._lock:
+                jobs = self._queues.get(id(nlp))
+                if jobs is None:
+                    jobs = self._queues[id(nlp)] = queue.Queue()
+                    threading.Thread(
+                        target=self._run, args=(nlp, jobs), name="whisper-ner-batcher", daemon=True
+                    ).start()
+        return jobs
+
+    def _run(self, nlp: Any, jobs: "queue.Queue"):
+        """Worker loop of one model."""
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            batch = [job]
+            deadline = job[1] + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    job = jobs.get(timeout=remaining) if remaining > 0 else jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                batch.append(job)
+            self._parse_batch(nlp, batch)
+            if stop:
+                return
+
+    def _parse_batch(self, nlp: Any, batch: List[Tuple[str, float, Future]]):
+        # Requests that gave up waiting are not parsed
+        batch = [job for job in batch if job[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            docs = list(nlp.pipe([text for text, _, _ in batch], batch_size=self.batch_size))
+        except Exception as e:
+            logger.warning(f"NER batch of {len(batch)} texts failed ({e}), parsing them one by one")
+            for text, _, future in batch:
+                try:
+                    future.set_result(list(nlp.pipe([text], batch_size=1))[0])
+                except Exception as text_error:
+                    future.set_exception(text_error)
+            return
+        self._record(batch, started)
+        for (_, _, future), doc in zip(batch, docs):
+            future.set_result(doc)
+
+    def _record(self, batch: List[Tuple[str, float, Future]], started: float):
+        size = len(batch)
+        bucket = next((i for i, bound in enumerate(_SIZE_BUCKETS) if size <= bound), len(_SIZE_BUCKETS))
+        with self._lock:
+            self.batches += 1
+            self.documents += size
+            self.max_seen = max(self.max_seen, size)
+            self._sizes[bucket] += 1
+            self._wait_total += sum(started - submitted for _, submitted, _ in batch)
+
+    def shutdown(self):
+        """Stop the worker threads once their queued texts are parsed."""
+        with self._lock:
+            for jobs in self._queues.values():
+                jobs.put(None)
+            self._queues.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batch sizes and queueing delay, for monitoring."""
+        with self._lock:
+            labels = [f"<={bound}" for bound in _SIZE_BUCKETS] + [f">{_SIZE_BUCKETS[-1]}"]
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "batch_size": self.batch_size,
+                "batches": self.batches,
+                "documents": self.documents,
+                "avg_batch": round(self.documents / self.batches, 2) if self.batches else 0.0,
+                "max_batch_seen": self.max_seen,
+                "batch_sizes": dict(zip(labels, self._sizes)),
+                "wait_ms_avg": round(self._wait_total / self.documents * 1000, 2) if self.documents else 0.0,
+            }
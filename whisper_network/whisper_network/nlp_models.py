@@ -0,0 +1,52 @@
+"""
+Loading of the spaCy models used for name detection.
+
+The engine only reads `doc.ents`, but the `*_core_*_sm` packages run a full
+pipeline (tok2vec, tagger, morphologizer, parser, lemmatizer, attribute
+ruler, NER). load_ner_model keeps NER and the components it depends on:
+the others are excluded at load time, and the shared tok2vec is dropped
+when no remaining component listens to it (the NER of the small models has
+its own). A rule-based sentencizer can be added for callers needing
+sentence boundaries without the parser. Entities are unchanged (see
+benchmarks/ner_pipelines.py).
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import logging
+from typing import Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Components never needed by NER (excluded when present in a package)
+NON_NER_COMPONENTS: Tuple[str, ...] = (
+    "tagger", "morphologizer", "parser", "lemmatizer", "trainable_lemmatizer",
+    "attribute_ruler", "senter",
+)
+
+
+def load_ner_model(name: str, trimmed: bool = True, sentencizer: bool = False) -> Any:
+    """
+    Load a spaCy package for NER.
+
+    Args:
+        name: Package name (fr_core_news_sm, en_core_web_sm...)
+        trimmed: Keep only the components NER needs (full pipeline otherwise)
+        sentencizer: Add a rule-based sentencizer (sets doc.sents)
+
+    Raises:
+        OSError: The package is not installed
+    """
+    import spacy
+
+    if not trimmed:
+        nlp = spacy.load(name)
+    else:
+        nlp = spacy.load(name, exclude=list(NON_NER_COMPONENTS))
+        if "tok2vec" in nlp.pipe_names and not getattr(nlp.get_pipe("tok2vec"), "listening_components", None):
+            nlp.remove_pipe("tok2vec")
+    if sentencizer and "sentencizer" not in nlp.pipe_names:
+        nlp.add_pipe("sentencizer", first=True)
+    logger.debug(f"spaCy model {name} loaded with components: {', '.join(nlp.pipe_names)}")
+    return nlp
@@ -0,0 +1,182 @@
+"""
+Digit-run index shared by the number-based detectors.
+
+Phones, NIR, IPs, cards, RIB, postal codes, ID cards and GPS coordinates all
+start on a digit. DigitRunIndex finds every digit run of a text once (groups
+of digits joined by single separators, e.g. "06 12 34 56 78" or
+"192.168.1.1"); number-led detectors are then only tried where a digit group
+starts, and their candidates are classified with checksums (Luhn for cards,
+MOD-97 for IBAN) read from the normalized digits of the index.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# Maximal digit groups, and the characters that may join two groups of a run
+_DIGIT_GROUP = re.compile(r'\d+')
+_RUN_SEPARATORS = frozenset(' \t\u00a0\u202f.-/')
+
+LUHN = "luhn"
+MOD97 = "mod97"
+
+
+def luhn_valid(digits: str) -> bool:
+    """Luhn check digit test (payment card numbers)."""
+    if not digits or not digits.isdigit():
+        return False
+    total = 0
+    for position, char in enumerate(reversed(digits)):
+        value = int(char)
+        if position % 2:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return total % 10 == 0
+
+
+def mod97_valid(code: str) -> bool:
+    """ISO 7064 MOD-97 test of an IBAN (separators already removed)."""
+    code = code.upper()
+    if len(code) < 5 or not code.isalnum() or not code.isascii():
+        return False
+    rearranged = code[4:] + code[:4]
+    return int("".join(str(int(char, 36)) for char in rearranged)) % 97 == 1
+
+
+CHECKSUMS = {
+    LUHN: luhn_valid,
+    MOD97: mod97_valid,
+}
+
+
+class DigitRun:
+    """Digit groups joined by single separators, e.g. "06 12 34 56 78"."""
+
+    __slots__ = ("start", "end", "digits", "group_starts", "group_lengths", "separators")
+
+    def __init__(self, start: int, end: int, digits: str, group_starts: Tuple[int, ...],
+                 group_lengths: Tuple[int, ...], separators: str):
+        self.start = start
+        self.end = end
+        self.digits = digits                # Normalized digits, separators removed
+        self.group_starts = group_starts    # Text offset of each group
+        self.group_lengths = group_lengths
+        self.separators = separators        # One character between each pair of groups
+
+    @property
+    def shape(self) -> str:
+        """Separator pattern, e.g. "2 2 2 2 2" for a French phone number."""
+        parts = [str(self.group_lengths[0])]
+        for separator, length in zip(self.separators, self.group_lengths[1:]):
+            parts.append(separator + str(length))
+        return "".join(parts)
+
+    def digits_between(self, start: int, end: int) -> str:
+        """Digits of the run inside [start, end)."""
+        parts = []
+        offset = 0
+        for group_start, length in zip(self.group_starts, self.group_lengths):
+            low = max(start, group_start)
+            high = min(end, group_start + length)
+            if low < high:
+                parts.append(self.digits[offset + low - group_start:offset + high - group_start])
+            offset += length
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return f"DigitRun({self.start}, {self.end}, {self.digits!r}, shape={self.shape!r})"
+
+
+class DigitRunIndex:
+    """Every digit run of one text, found in a single pass."""
+
+    def __init__(self, text: str):
+        self.text = text
+        # Start and end of every digit group, in text order
+        self._groups = [match.span() for match in _DIGIT_GROUP.finditer(text)]
+        self.group_starts: List[int] = [start for start, _ in self._groups]
+        self._runs: Optional[List[DigitRun]] = None
+        self._run_starts: List[int] = []
+        self._anchors: Dict[str, List[int]] = {}
+
+    @property
+    def runs(self) -> List[DigitRun]:
+        """Digit runs, assembled from the groups on first use."""
+        if self._runs is None:
+            text = self.text
+            self._runs = []
+            current: List[Tuple[int, int]] = []
+            for start, end in self._groups:
+                if current and start - current[-1][1] == 1 and text[start - 1] in _RUN_SEPARATORS:
+                    current.append((start, end))
+                    continue
+                self._close_run(current)
+                current = [(start, end)]
+            self._close_run(current)
+            self._run_starts = [run.start for run in self._runs]
+        return self._runs
+
+    def _close_run(self, groups: List[Tuple[int, int]]):
+        if not groups:
+            return
+        text = self.text
+        self._runs.append(DigitRun(
+            start=groups[0][0],
+            end=groups[-1][1],
+            digits="".join(text[start:end] for start, end in groups),
+            group_starts=tuple(start for start, _ in groups),
+            group_lengths=tuple(end - start for start, end in groups),
+            separators="".join(text[end] for _, end in groups[:-1])
+        ))
+
+    def run_at(self, position: int) -> Optional[DigitRun]:
+        """Run covering a text offset, if any."""
+        runs = self.runs
+        index = bisect_right(self._run_starts, position) - 1
+        if index >= 0 and position < runs[index].end:
+            return runs[index]
+        return None
+
+    def digits(self, start: int, end: int) -> str:
+        """Normalized digits inside [start, end), across runs."""
+        runs = self.runs
+        index = max(bisect_right(self._run_starts, start) - 1, 0)
+        parts = []
+        for run in runs[index:]:
+            if run.start >= end:
+                break
+            if run.end > start:
+                parts.append(run.digits_between(start, end))
+        return "".join(parts)
+
+    def anchors(self, lead: str = "") -> List[int]:
+        """
+        Offsets where a number-led pattern may match: every digit group start,
+        plus the character before it when it is one of `lead` (e.g. "+(" for
+        "+33 6..." or "(555) ...").
+        """
+        positions = self._anchors.get(lead)
+        if positions is None:
+            if lead:
+                text = self.text
+                positions = []
+                for start in self.group_starts:
+                    if start and text[start - 1] in lead:
+                        positions.append(start - 1)
+                    positions.append(start)
+            else:
+                positions = self.group_starts
+            self._anchors[lead] = positions
+        return positions
+
+    def checksum_valid(self, checksum: str, start: int, end: int) -> bool:
+        """Check a candidate span with a named checksum (LUHN or MOD97)."""
+        if checksum == LUHN:
+            return luhn_valid(self.digits(start, end))
+        code = "".join(char for char in self.text[start:end] if char.isalnum())
+        return CHECKSUMS[checksum](code)
@@ -0,0 +1,143 @@
+"""
+Overlap resolution for anonymization matches.
+
+Candidates are ordered once according to a priority policy and accepted
+greedily; accepted spans live in an IntervalIndex (sorted, disjoint spans
+queried with bisect, stored in chunks of bounded size so that an insertion
+moves at most a chunk), so resolving n candidates takes O(n log n) instead
+of comparing every candidate with every accepted span.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+# Supported priority policies
+POLICY_LONGEST = "longest"      # Longest span, then type priority, then leftmost
+POLICY_LEFTMOST = "leftmost"    # Leftmost span, then longest, then type priority
+POLICY_PRIORITY = "priority"    # Type priority, then longest, then leftmost
+
+OVERLAP_POLICIES = (POLICY_LONGEST, POLICY_LEFTMOST, POLICY_PRIORITY)
+
+
+# Spans per chunk of an IntervalIndex; a chunk reaching twice this size is split
+_CHUNK_SIZE = 256
+
+
+class IntervalIndex:
+    """Sorted set of disjoint [start, end) spans with logarithmic overlap queries and insertion."""
+
+    def __init__(self):
+        # Spans in order, split into chunks: (starts, ends) of each chunk and its first start
+        self._chunks: List[Tuple[List[int], List[int]]] = []
+        self._firsts: List[int] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        """Indexed (start, end) spans, in order."""
+        return (span for starts, ends in self._chunks for span in zip(starts, ends))
+
+    def _end_before(self, position: int, inclusive: bool) -> Optional[int]:
+        """End of the last span starting before a position (or at it if inclusive), if any."""
+        find = bisect_right if inclusive else bisect_left
+        c = find(self._firsts, position) - 1
+        if c < 0:
+            return None
+        starts, ends = self._chunks[c]
+        return ends[find(starts, position) - 1]
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Check whether [start, end) intersects any indexed span."""
+        # Last span starting before `end`; spans are disjoint, so it also
+        # has the largest end among the candidates.
+        last_end = self._end_before(end, False)
+        return last_end is not None and last_end > start
+
+    def contains(self, position: int) -> bool:
+        """Check whether a position falls inside an indexed span."""
+        last_end = self._end_before(position, True)
+        return last_end is not None and last_end > position
+
+    def covers(self, start: int, end: int) -> bool:
+        """Check whether [start, end) lies inside a single indexed span."""
+        last_end = self._end_before(start, True)
+        return last_end is not None and last_end >= end
+
+    def next_start(self, position: int) -> Optional[int]:
+        """Start of the first indexed span starting at or after a position, if any."""
+        # Either in the last chunk starting before the position, or first of the next one
+        c = max(bisect_left(self._firsts, position) - 1, 0)
+        if c < len(self._chunks):
+            starts = self._chunks[c][0]
+            i = bisect_left(starts, position)
+            if i < len(starts):
+                return starts[i]
+            if c + 1 < len(self._chunks):
+                return self._firsts[c + 1]
+        return None
+
+    def add(self, start: int, end: int):
+        """Index a span; the caller guarantees it does not overlap existing ones."""
+        self._size += 1
+        if not self._chunks:
+            self._chunks.append(([start], [end]))
+            self._firsts.append(start)
+            return
+        c = max(bisect_right(self._firsts, start) - 1, 0)
+        starts, ends = self._chunks[c]
+        i = bisect_left(starts, start)
+        starts.insert(i, start)
+        ends.insert(i, end)
+        self._firsts[c] = starts[0]
+        if len(starts) >= 2 * _CHUNK_SIZE:
+            self._chunks.insert(c + 1, (starts[_CHUNK_SIZE:], ends[_CHUNK_SIZE:]))
+            self._firsts.insert(c + 1, starts[_CHUNK_SIZE])
+            del starts[_CHUNK_SIZE:], ends[_CHUNK_SIZE:]
+
+
+def _sort_key(policy: str, priority: Callable[[Any], int]) -> Callable[[Any], Tuple[int, int, int]]:
+    """Build the ordering used to accept candidates for a policy."""
+    if policy == POLICY_LONGEST:
+        return lambda m: (m.start - m.end, priority(m), m.start)
+    if policy == POLICY_LEFTMOST:
+        return lambda m: (m.start, m.start - m.end, priority(m))
+    if policy == POLICY_PRIORITY:
+        return lambda m: (priority(m), m.start - m.end, m.start)
+    raise ValueError(f"Unknown overlap policy: {policy!r} (expected one of {', '.join(OVERLAP_POLICIES)})")
+
+
+def resolve_overlaps(
+    candidates: Iterable[Any],
+    policy: str = POLICY_LONGEST,
+    priority: Optional[Callable[[Any], int]] = None,
+    taken: Optional[IntervalIndex] = None,
+) -> List[Any]:
+    """
+    Select non-overlapping candidates according to a priority policy.
+
+    Args:
+        candidates: Objects exposing `start` and `end` attributes
+        policy: One of OVERLAP_POLICIES
+        priority: Type priority of a candidate (lower wins), defaults to equal
+        taken: Spans already selected by a higher tier; updated in place
+
+    Returns:
+        Accepted candidates, sorted by start. Ties keep the input order.
+    """
+    index = taken if taken is not None else IntervalIndex()
+    key = _sort_key(policy, priority or (lambda m: 0))
+
+    accepted = []
+    for candidate in sorted(candidates, key=key):
+        if candidate.end <= candidate.start or index.overlaps(candidate.start, candidate.end):
+            continue
+        index.add(candidate.start, candidate.end)
+        accepted.append(candidate)
+
+    accepted.sort(key=lambda m: m.start)
+    return accepted
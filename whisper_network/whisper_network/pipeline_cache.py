@@ -0,0 +1,164 @@
+"""
+Compiled pipeline cache for the anonymization engine.
+
+The browser extension sends the same few settings combinations over and over.
+Instead of rebuilding a settings object and scan plans on every request,
+the engine compiles each distinct combination once and keeps it in an LRU
+cache keyed by a canonical fingerprint: a bitmask of the enabled options plus
+any token overrides. Each compiled pipeline gets a short `profile_id` that
+clients can send back instead of the full settings dictionary.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (bitmask of enabled boolean options, sorted non-default string options)
+Fingerprint = Tuple[int, Tuple[Tuple[str, str], ...]]
+
+
+class UnknownProfile(KeyError):
+    """A profile_id that was never compiled here, or has been evicted since."""
+
+
+def settings_fingerprint(settings: Any) -> Fingerprint:
+    """Compute the canonical fingerprint of a settings dataclass instance."""
+    mask = 0
+    overrides = []
+    bit = 0
+    for f in fields(settings):
+        value = getattr(settings, f.name)
+        if f.type in (bool, "bool"):
+            if value:
+                mask |= 1 << bit
+            bit += 1
+        elif value != f.default:
+            overrides.append((f.name, str(value)))
+    return mask, tuple(sorted(overrides))
+
+
+def profile_id_for(fingerprint: Fingerprint) -> str:
+    """Short, stable identifier of a fingerprint (same on every API replica)."""
+    return hashlib.sha256(repr(fingerprint).encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class CompiledPipeline:
+    """Settings resolved once, with everything derived from them."""
+    profile_id: str
+    fingerprint: Fingerprint
+    settings: Any     # AnonymizationSettings - shared, must not be mutated
+    plans: Dict[str, Any]  # ScanPlan of each regex stage, by stage name
+
+
+class PipelineCache:
+    """LRU cache of compiled pipelines, addressable by raw settings or profile_id."""
+
+    def __init__(
+        self,
+        build_settings: Callable[[Optional[Dict[str, Any]]], Any],
+        build_plans: Callable[[Any], Dict[str, Any]],
+        max_size: int = 64
+    ):
+        self._build_settings = build_settings
+        self._build_plans = build_plans
+        self.max_size = max_size
+        self._pipelines: "OrderedDict[str, CompiledPipeline]" = OrderedDict()
+        # Raw request settings -> profile_id, so hits skip settings parsing entirely
+        self._aliases: "OrderedDict[Hashable, str]" = OrderedDict()
+        # Guards the LRU bookkeeping; pipelines are compiled outside of it
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _raw_key(custom_settings: Optional[Dict[str, Any]]) -> Optional[Hashable]:
+        if custom_settings is None:
+            return None
+        try:
+            return frozenset(custom_settings.items())
+        except TypeError:
+            return None  # Unhashable values: compile without caching the alias
+
+    def get(self, custom_settings: Optional[Dict[str, Any]] = None) -> CompiledPipeline:
+        """Return the compiled pipeline for a settings dictionary (None = engine defaults)."""
+        raw_key = self._raw_key(custom_settings)
+        hashable = raw_key is not None or custom_settings is None
+
+        with self._lock:
+            if hashable:
+                profile_id = self._aliases.get(raw_key)
+                if profile_id is not None:
+                    pipeline = self.get_profile(profile_id)
+                    if pipeline is not None:
+                        self._aliases.move_to_end(raw_key)
+                        self.hits += 1
+                        return pipeline
+            self.misses += 1
+
+        settings = self._build_settings(custom_settings)
+        fingerprint = settings_fingerprint(settings)
+        profile_id = profile_id_for(fingerprint)
+
+        pipeline = self.get_profile(profile_id)
+        if pipeline is None:
+            compiled = CompiledPipeline(
+                profile_id=profile_id,
+                fingerprint=fingerprint,
+                settings=settings,
+                plans=self._build_plans(settings)
+            )
+            logger.debug(f"Compiled anonymization profile {profile_id}")
+
+        with self._lock:
+            if pipeline is None:
+                # Another request may have compiled the same profile meanwhile
+                pipeline = self._pipelines.get(profile_id, compiled)
+            self._pipelines[profile_id] = pipeline
+            self._pipelines.move_to_end(profile_id)
+            if hashable:
+                self._aliases[raw_key] = profile_id
+                self._aliases.move_to_end(raw_key)
+            self._evict()
+        return pipeline
+
+    def get_profile(self, profile_id: str) -> Optional[CompiledPipeline]:
+        """Return a pipeline previously compiled, or None if unknown or evicted."""
+        with self._lock:
+            pipeline = self._pipelines.get(profile_id)
+            if pipeline is not None:
+                self._pipelines.move_to_end(profile_id)
+            return pipeline
+
+    def _evict(self):
+        """Drop least recently used pipelines and aliases beyond max_size."""
+        while len(self._pipelines) > self.max_size:
+            profile_id, _ = self._pipelines.popitem(last=False)
+            logger.debug(f"Evicted anonymization profile {profile_id}")
+        # Several raw forms can map to one profile; keep a bounded alias table
+        while len(self._aliases) > self.max_size * 4:
+            self._aliases.popitem(last=False)
+
+    def clear(self):
+        """Forget every compiled pipeline."""
+        with self._lock:
+            self._pipelines.clear()
+            self._aliases.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache statistics for monitoring."""
+        return {
+            "profiles": len(self._pipelines),
+            "aliases": len(self._aliases),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
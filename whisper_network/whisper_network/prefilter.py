@@ -0,0 +1,119 @@
+"""
+PII-likelihood prefilter.
+
+Most texts sent by the extension contain no personal data at all (short
+questions, code). Every detector family declares a cheap necessary
+condition - a digit, an '@', '://', an uppercase letter or a keyword - and
+the text is profiled once to skip the families whose trigger is absent.
+Triggers are conservative: a family is only skipped when its patterns
+cannot match.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+_DIGIT = re.compile(r'\d')
+
+
+@dataclass(frozen=True)
+class Trigger:
+    """Necessary condition for a detector family: any of the conditions is enough."""
+    digits: bool = False                # A digit anywhere
+    chars: Tuple[str, ...] = ()         # One of these substrings (case-sensitive)
+    keywords: Tuple[str, ...] = ()      # One of these case-folded substrings (case-insensitive)
+    uppercase: bool = False             # An uppercase letter anywhere
+
+
+class TextProfile:
+    """Character-class facts about a text, each computed at most once."""
+    __slots__ = ("text", "_digit", "_folded")
+
+    def __init__(self, text: str, folded: Optional[str] = None):
+        self.text = text
+        self._digit: Optional[bool] = None
+        self._folded = folded
+
+    @property
+    def has_digit(self) -> bool:
+        if self._digit is None:
+            self._digit = _DIGIT.search(self.text) is not None
+        return self._digit
+
+    @property
+    def has_uppercase(self) -> bool:
+        # Case folding leaves text without capitals unchanged (ß aside, a harmless false positive)
+        return self.folded != self.text
+
+    @property
+    def folded(self) -> str:
+        """Case-folded text, as matched by re.IGNORECASE."""
+        if self._folded is None:
+            self._folded = self.text.casefold()
+        return self._folded
+
+    def fires(self, trigger: Trigger) -> bool:
+        """Check whether the text satisfies a trigger."""
+        if trigger.digits and self.has_digit:
+            return True
+        if trigger.uppercase and self.has_uppercase:
+            return True
+        if any(chars in self.text for chars in trigger.chars):
+            return True
+        return any(keyword in self.folded for keyword in trigger.keywords)
+
+
+class PiiPrefilter:
+    """Decides which detector families can be skipped, with per-family counters."""
+
+    def __init__(self, triggers: Dict[str, Optional[Trigger]]):
+        """
+        Args:
+            triggers: Trigger of each family; None means the family always runs
+        """
+        self.triggers = triggers
+        self._lock = threading.Lock()  # Shared by concurrent requests
+        self.texts = 0          # Texts checked
+        self.clean_texts = 0    # Texts where every enabled family was skipped
+        self.considered: Dict[str, int] = {}
+        self.skipped: Dict[str, int] = {}
+
+    def skipped_families(self, text: str, families: Iterable[str], folded: Optional[str] = None) -> Set[str]:
+        """Return the enabled families whose trigger is absent from text (`folded`: text.casefold(), if known)."""
+        profile = TextProfile(text, folded)
+        families = list(families)
+        skipped = set()
+        for family in families:
+            trigger = self.triggers.get(family)
+            if trigger is not None and not profile.fires(trigger):
+                skipped.add(family)
+
+        with self._lock:
+            for family in families:
+                self.considered[family] = self.considered.get(family, 0) + 1
+                if family in skipped:
+                    self.skipped[family] = self.skipped.get(family, 0) + 1
+            self.texts += 1
+            if families and len(skipped) == len(families):
+                self.clean_texts += 1
+        return skipped
+
+    def get_stats(self) -> Dict:
+        """Skip counters and hit rates for monitoring."""
+        with self._lock:
+            return {
+                "texts": self.texts,
+                "clean_texts": self.clean_texts,
+                "families": {
+                    family: {
+                        "considered": considered,
+                        "skipped": self.skipped.get(family, 0),
+                        "skip_rate": round(self.skipped.get(family, 0) / considered, 3),
+                    }
+                    for family, considered in sorted(self.considered.items())
+                },
+            }
@@ -0,0 +1,213 @@
+"""
+Pluggable regex backends for the anonymization engine.
+
+Three implementations sit behind the same interface:
+
+- ``re``: the standard library, always available, used as the reference.
+- ``re2``: google-re2, guaranteed linear-time matching. RE2 has no
+  lookarounds and its ``\\b``, ``\\d`` and ``\\s`` classes are ASCII-only, so
+  only patterns giving the same matches on our corpus declare it.
+- ``hyperscan``: Hyperscan/Vectorscan multi-pattern scanning. It compiles
+  every pattern of a scan plan into one database in prefilter mode (a match
+  superset) and tells, in a single pass, which patterns can match at all;
+  the exact matching is still done by ``re``/``re2``.
+
+Each pattern declares the backends it is compatible with (see
+``RegexPatterns.BACKENDS``). The backends are selected once at startup
+(``REGEX_BACKEND`` / ``REGEX_PREFILTER`` environment variables) and every
+pattern falls back to ``re`` when the selected backend cannot run it.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+STDLIB = "re"
+RE2 = "re2"
+HYPERSCAN = "hyperscan"
+
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+    re2 = None
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+    hyperscan = None
+
+# Inline global flags at the start of a pattern source, e.g. "(?x)"
+_LEADING_FLAGS = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+
+class BackendCompileError(Exception):
+    """Raised when a backend cannot compile a pattern."""
+
+
+class StdlibBackend:
+    """Reference backend: Python's `re` module."""
+    name = STDLIB
+    available = True
+
+    def compile(self, pattern: Pattern) -> Any:
+        return pattern
+
+    def compile_source(self, source: str) -> Any:
+        return re.compile(source)
+
+
+class RE2Backend:
+    """Linear-time backend based on google-re2."""
+    name = RE2
+    available = RE2_AVAILABLE
+
+    def compile(self, pattern: Pattern) -> Any:
+        source = pattern.pattern
+        if pattern.flags & re.IGNORECASE and not source.startswith("(?i)"):
+            source = "(?i)" + source
+        if pattern.flags & re.VERBOSE:
+            raise BackendCompileError("RE2 does not support verbose patterns")
+        return self.compile_source(source)
+
+    def compile_source(self, source: str) -> Any:
+        try:
+            return re2.compile(source)
+        except Exception as e:
+            raise BackendCompileError(str(e))
+
+
+class HyperscanPrefilter:
+    """
+    Multi-pattern prefilter: one Hyperscan pass reports which patterns may match.
+
+    Patterns Hyperscan cannot compile, even in prefilter mode, are reported
+    as always active so the exact backend still runs them.
+    """
+    name = HYPERSCAN
+    available = HYPERSCAN_AVAILABLE
+
+    def __init__(self, patterns: Iterable[Pattern], compatible: Iterable[bool]):
+        self.size = 0
+        self.always: Set[int] = set()
+        expressions: List[bytes] = []
+        ids: List[int] = []
+        flags: List[int] = []
+        base = hyperscan.HS_FLAG_PREFILTER | hyperscan.HS_FLAG_SINGLEMATCH | \
+            hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_ALLOWEMPTY
+
+        for index, (pattern, ok) in enumerate(zip(patterns, compatible)):
+            self.size += 1
+            if not ok or not self._compiles(pattern, base):
+                self.always.add(index)
+                continue
+            expressions.append(self._source(pattern).encode("utf-8"))
+            ids.append(index)
+            flags.append(base | (hyperscan.HS_FLAG_CASELESS if pattern.flags & re.IGNORECASE else 0))
+
+        self.database = None
+        # Hyperscan scratch space cannot be shared by concurrent scans: one per thread
+        self._local = threading.local()
+        if expressions:
+            self.database = hyperscan.Database()
+            self.database.compile(expressions=expressions, ids=ids, elements=len(expressions), flags=flags)
+
+    @staticmethod
+    def _source(pattern: Pattern) -> str:
+        """Pattern source with the Python flags Hyperscan understands inline."""
+        source = _LEADING_FLAGS.sub('', pattern.pattern, count=1)
+        inline = ''.join(letter for flag, letter in ((re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x'))
+                         if pattern.flags & flag)
+        return f"(?{inline}){source}" if inline else source
+
+    def _compiles(self, pattern: Pattern, flags: int) -> bool:
+        try:
+            database = hyperscan.Database()
+            database.compile(expressions=[self._source(pattern).encode("utf-8")], ids=[0], elements=1, flags=[flags])
+            return True
+        except Exception as e:
+            logger.debug(f"Hyperscan cannot prefilter {pattern.pattern[:40]!r}: {e}")
+            return False
+
+    def active(self, text: str) -> FrozenSet[int]:
+        """Indices of the patterns that may match in text."""
+        found = set(self.always)
+        if self.database is not None:
+            def on_match(pattern_id, start, end, flags, context):
+                found.add(pattern_id)
+            scratch = getattr(self._local, "scratch", None)
+            if scratch is None:
+                scratch = self._local.scratch = hyperscan.Scratch(self.database)
+            self.database.scan(text.encode("utf-8"), match_event_handler=on_match, scratch=scratch)
+        return frozenset(found)
+
+
+class RegexBackends:
+    """Backends selected at startup, with per-pattern fallback to `re`."""
+
+    def __init__(self, matcher: Any = None, use_prefilter: bool = False):
+        self.stdlib = StdlibBackend()
+        self.matcher = matcher or self.stdlib
+        self.use_prefilter = use_prefilter and HYPERSCAN_AVAILABLE
+        self.fallbacks = 0  # Patterns that could not run on the selected matcher
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return (self.matcher.name, HYPERSCAN) if self.use_prefilter else (self.matcher.name,)
+
+    def compile(self, pattern: Pattern, compatible: FrozenSet[str]) -> Tuple[Any, Any]:
+        """Compile a pattern on the selected matcher, falling back to `re`."""
+        if self.matcher is not self.stdlib and self.matcher.name in compatible:
+            try:
+                return self.matcher, self.matcher.compile(pattern)
+            except BackendCompileError as e:
+                self.fallbacks += 1
+                logger.warning(f"{self.matcher.name} cannot compile {pattern.pattern[:40]!r}, using re: {e}")
+        return self.stdlib, pattern
+
+    def build_prefilter(self, patterns: List[Pattern], compatible: List[FrozenSet[str]]) -> Optional[Callable[[str], FrozenSet[int]]]:
+        """Build the multi-pattern prefilter for a scan plan, if enabled."""
+        if not self.use_prefilter or len(patterns) < 2:
+            return None
+        try:
+            return HyperscanPrefilter(patterns, [HYPERSCAN in c for c in compatible]).active
+        except Exception as e:
+            logger.warning(f"Hyperscan prefilter unavailable for this plan: {e}")
+            return None
+
+
+def select_backends(matcher: Optional[str] = None, prefilter: Optional[str] = None) -> RegexBackends:
+    """
+    Select the regex backends once at startup.
+
+    Args:
+        matcher: "auto" (RE2 when installed), "re" or "re2"; defaults to $REGEX_BACKEND
+        prefilter: "auto" (Hyperscan when installed), "hyperscan" or "none"; defaults to $REGEX_PREFILTER
+    """
+    matcher = (matcher or os.getenv("REGEX_BACKEND", "auto")).lower()
+    prefilter = (prefilter or os.getenv("REGEX_PREFILTER", "auto")).lower()
+
+    selected = None
+    if matcher in ("auto", RE2):
+        if RE2_AVAILABLE:
+            selected = RE2Backend()
+        elif matcher == RE2:
+            logger.warning("REGEX_BACKEND=re2 but google-re2 is not installed, using re")
+
+    use_prefilter = prefilter in ("auto", HYPERSCAN) and HYPERSCAN_AVAILABLE
+    if prefilter == HYPERSCAN and not HYPERSCAN_AVAILABLE:
+        logger.warning("REGEX_PREFILTER=hyperscan but hyperscan is not installed, prefilter disabled")
+
+    backends = RegexBackends(selected, use_prefilter)
+    logger.info(f"Regex backends: {', '.join(backends.names)}")
+    return backends
@@ -0,0 +1,273 @@
+"""
+Single-pass multi-pattern scanner for the anonymization engine.
+
+A ScanPlan merges several compiled regexes into one named-group alternation
+and walks the text once. At every position where any alternative matches,
+the remaining alternatives are probed in place, so the plan reports exactly
+the candidates that one `finditer` per pattern would have produced - without
+rescanning the whole text for each entity type.
+
+Patterns are compiled on the regex backend selected at startup (see
+regex_backends.py); entries running on different backends get one
+alternation each and their hits are merged in text order. Entries that
+always start with a keyword are left out of the alternations: they are only
+tried where one of their keywords occurs (see keyword_anchors.py). Likewise,
+number-led entries are only tried where a digit group starts, and entries
+with a checksum drop the candidates that fail it (see numeric_runs.py).
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import heapq
+import re
+from dataclasses import dataclass
+from typing import AbstractSet, Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Pattern, Sequence, Tuple
+
+from .keyword_anchors import KeywordAnchors
+from .document import AnalyzedDocument
+from .regex_backends import STDLIB, BackendCompileError, RegexBackends
+
+# Inline global flags such as "(?x)" or "(?i)" must be turned into scoped
+# flags once the pattern is embedded inside the combined alternation.
+_LEADING_FLAGS = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+_SCOPED_FLAGS = (
+    (re.IGNORECASE, 'i'),
+    (re.MULTILINE, 'm'),
+    (re.DOTALL, 's'),
+    (re.VERBOSE, 'x'),
+)
+
+# Sub-plans kept per prefiltered subset of entries
+_MAX_SUBPLANS = 32
+
+
+@dataclass(frozen=True)
+class ScanEntry:
+    """One pattern taking part in a scan plan."""
+    key: str           # Unique identifier of the entry within the plan
+    pattern: Pattern   # Compiled pattern, used for in-place probing
+    tag: Any = None    # Caller payload (AnonymizationType, token...)
+    tier: int = 0      # Overlap tier of its matches (see detectors.py)
+    backends: FrozenSet[str] = frozenset({STDLIB})  # Regex backends able to run the pattern
+    anchors: Tuple[str, ...] = ()  # Keywords every match starts with (case-insensitive), if any
+    lead: Optional[str] = None     # Number-led: matches start on a digit group, or on one of these characters just before it
+    checksum: Optional[str] = None  # Checksum candidates must pass (numeric_runs.LUHN, MOD97)
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """A candidate span produced by a scan plan."""
+    entry: ScanEntry
+    match: Any         # re.Match from the entry's own pattern
+
+
+class _BackendGroup:
+    """Entries compiled on the same backend, sharing one combined alternation."""
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.indices: List[int] = []          # Plan entry indices, in entry order
+        self.alternatives: List[str] = []
+        self.positions: Dict[str, int] = {}   # Group name -> position in indices
+        self.search: Optional[Callable] = None
+
+
+class ScanPlan:
+    """Compiled single-pass scan over a fixed, ordered set of patterns."""
+
+    def __init__(self, entries: Sequence[ScanEntry], backends: Optional[RegexBackends] = None, prefilter: bool = True):
+        self.entries: List[ScanEntry] = list(entries)
+        self.backends = backends or RegexBackends()
+        self._probes: List[Any] = []          # Per-entry compiled pattern
+        self._groups: List[_BackendGroup] = []
+        self._anchored: List[int] = []        # Entries only tried at their keywords
+        self._keywords: Optional[KeywordAnchors] = None
+        self._numeric: List[int] = []         # Entries only tried at digit groups
+        self._checked = any(entry.checksum for entry in self.entries)
+        self._subplans: Dict[FrozenSet[int], "ScanPlan"] = {}
+        self._prefilter = None
+        if self.entries:
+            self._compile(self.entries)
+            if prefilter:
+                self._prefilter = self.backends.build_prefilter(
+                    [entry.pattern for entry in self.entries],
+                    [entry.backends for entry in self.entries]
+                )
+
+    def _compile(self, entries: Sequence[ScanEntry]):
+        """Build one named-group alternation per backend covering its entries."""
+        groups: Dict[str, _BackendGroup] = {}
+        for index, entry in enumerate(entries):
+            backend, probe = self.backends.compile(entry.pattern, entry.backends)
+            self._probes.append(probe)
+            if entry.anchors:
+                self._anchored.append(index)
+            elif entry.lead is not None:
+                self._numeric.append(index)
+            else:
+                self._add_to_group(groups, backend, index, entry)
+
+        for name in list(groups):
+            group = groups[name]
+            try:
+                group.search = group.backend.compile_source("|".join(group.alternatives)).search
+            except BackendCompileError:
+                # The alternation itself does not compile: run the group on re
+                del groups[name]
+                for index in group.indices:
+                    self._probes[index] = entries[index].pattern
+                    self._add_to_group(groups, self.backends.stdlib, index, entries[index])
+                stdlib = groups[self.backends.stdlib.name]
+                stdlib.search = re.compile("|".join(stdlib.alternatives)).search
+        self._groups = list(groups.values())
+        if self._anchored:
+            self._keywords = KeywordAnchors({index: entries[index].anchors for index in self._anchored})
+
+    def _add_to_group(self, groups: Dict[str, _BackendGroup], backend: Any, index: int, entry: ScanEntry):
+        group = groups.get(backend.name)
+        if group is None:
+            group = groups[backend.name] = _BackendGroup(backend)
+        group_name = f"_p{index}"
+        group.positions[group_name] = len(group.indices)
+        group.indices.append(index)
+        group.alternatives.append(f"(?P<{group_name}>{self._scoped_source(entry.pattern)})")
+
+    @staticmethod
+    def _scoped_source(pattern: Pattern) -> str:
+        """Return the pattern source wrapped with its own flags as a scoped group."""
+        source = _LEADING_FLAGS.sub('', pattern.pattern, count=1)
+        flags = ''.join(letter for flag, letter in _SCOPED_FLAGS if pattern.flags & flag)
+        if flags:
+            return f"(?{flags}:{source})"
+        return f"(?:{source})"
+
+    def _subplan(self, active: FrozenSet[int]) -> "ScanPlan":
+        """Plan restricted to the entries the prefilter reported as possible."""
+        plan = self._subplans.get(active)
+        if plan is None:
+            if len(self._subplans) >= _MAX_SUBPLANS:
+                self._subplans.clear()
+            plan = ScanPlan([self.entries[i] for i in sorted(active)], self.backends, prefilter=False)
+            self._subplans[active] = plan
+        return plan
+
+    def iter_candidates(
+        self,
+        text: str,
+        skip: Optional[AbstractSet[str]] = None,
+        doc: Optional[AnalyzedDocument] = None
+    ) -> Iterator[Candidate]:
+        """
+        Yield every candidate in text order, in entry order for equal starts.
+
+        Each entry keeps its own `finditer` semantics: once it has matched,
+        it is not probed again before the end of that match. Entries whose
+        key is in `skip` are left out of the scan. `doc` is the analyzed
+        document of text (lowered view, digit runs), built here when omitted.
+        """
+        if not self.entries:
+            return
+
+        active = None
+        if skip:
+            active = frozenset(i for i, entry in enumerate(self.entries) if entry.key not in skip)
+        if self._prefilter is not None:
+            found = self._prefilter(text)
+            active = found if active is None else active & found
+        if active is not None and len(active) < len(self.entries):
+            if active:
+                yield from self._subplan(active).iter_candidates(text, doc=doc)
+            return
+
+        if doc is None:
+            doc = AnalyzedDocument(text, normalize=False)
+        entries = self.entries
+        for index, match in self._iter_matches(text, doc):
+            entry = entries[index]
+            if entry.checksum and not doc.runs.checksum_valid(entry.checksum, match.start(), match.end()):
+                continue
+            yield Candidate(entry, match)
+
+    def _iter_matches(self, text: str, doc: AnalyzedDocument) -> Iterator[Tuple[int, Any]]:
+        """(entry index, match) of every entry, in text order then entry order."""
+        if not self._anchored and not self._numeric:
+            yield from self._iter_alternations(text)
+            return
+
+        # Keyword- and digit-anchored entries, merged into the alternation hits by (start, entry)
+        anchored = []
+        if self._anchored:
+            anchors = self._keywords.find(text, doc.lowered)
+            anchored.extend(
+                (match.start(), index, match)
+                for index in self._anchored
+                for match in KeywordAnchors.iter_matches(self._probes[index], text, anchors[index])
+            )
+        for index in self._numeric:
+            anchored.extend(
+                (match.start(), index, match)
+                for match in KeywordAnchors.iter_matches(self._probes[index], text, doc.runs.anchors(self.entries[index].lead))
+            )
+        anchored.sort(key=lambda hit: (hit[0], hit[1]))
+        if not self._groups:
+            for _, index, match in anchored:
+                yield index, match
+            return
+        scanned = ((match.start(), index, match) for index, match in self._iter_alternations(text))
+        for _, index, match in heapq.merge(scanned, anchored, key=lambda hit: (hit[0], hit[1])):
+            yield index, match
+
+    def _iter_alternations(self, text: str) -> Iterator[Tuple[int, Any]]:
+        """(entry index, match) of the entries run through the combined alternations."""
+        entries = self.entries
+        probes = self._probes
+        blocked_until = [0] * len(entries)
+        length = len(text)
+        several = len(self._groups) > 1
+
+        # Next combined hit of every backend group
+        heads = []
+        for group in self._groups:
+            hit = group.search(text, 0)
+            if hit is not None:
+                heads.append([hit, group])
+
+        while heads:
+            start = min(head[0].start() for head in heads) if several else heads[0][0].start()
+
+            pending: List[int] = []
+            for head in heads:
+                hit, group = head
+                if hit.start() != start:
+                    continue
+                # Alternatives before the matched one already failed at this position.
+                pending.extend(group.indices[group.positions[hit.lastgroup]:])
+                head[0] = group.search(text, start + 1) if start < length else None
+            if several:
+                heads = [head for head in heads if head[0] is not None]
+                pending.sort()
+            elif heads[0][0] is None:
+                heads = []
+
+            for index in pending:
+                if blocked_until[index] > start:
+                    continue
+                match = probes[index].match(text, start)
+                if match is None:
+                    continue
+                blocked_until[index] = match.end() if match.end() > start else start + 1
+                yield index, match
+
+    def scan(
+        self,
+        text: str,
+        skip: Optional[AbstractSet[str]] = None,
+        doc: Optional[AnalyzedDocument] = None
+    ) -> Dict[str, List[Any]]:
+        """Scan text once and group the resulting matches by entry key."""
+        found: Dict[str, List[Any]] = {entry.key: [] for entry in self.entries}
+        for candidate in self.iter_candidates(text, skip, doc):
+            found[candidate.entry.key].append(candidate.match)
+        return found
@@ -2,13 +2,16 @@
 Session Manager for Whisper Network
 Manages anonymization sessions with mapping persistence
 """
+import asyncio
 import logging
 import uuid
+import weakref
 from datetime import datetime
 from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 
 from .cache_manager import get_cache
+from .conversation import ConversationState
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +32,7 @@ class SessionData:
     last_used: str
     ttl: int
     mappings: Dict[str, Dict[str, str]]  # {entity_type: {original: anonymized}}
+    counters: Dict[str, int] = field(default_factory=dict)  # {entity_type: next token number}
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON serialization"""
@@ -43,11 +47,27 @@ class SessionManager:
     
     def __init__(self):
         self.cache = get_cache()
+        # One lock per session in use, dropped with its last holder
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+    
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """
+        Lock serializing the turns of a session in this process: a turn reads
+        the session's mappings and counters, anonymizes, then writes them back
+        """
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
     
     def _get_session_key(self, session_id: str) -> str:
         """Generate Redis key for session"""
         return f"session:{session_id}"
     
+    def _get_paragraphs_key(self, session_id: str) -> str:
+        """Generate Redis key for the paragraph index of a session (kept apart: read only by /anonymize)"""
+        return f"session:{session_id}:paragraphs"
+    
     def create_session(
         self,
         session_id: Optional[str] = None,
@@ -105,6 +125,7 @@ class SessionManager:
         """Delete session and all its data"""
         key = self._get_session_key(session_id)
         self.cache.delete(key)
+        self.cache.delete(self._get_paragraphs_key(session_id))
         logger.info(f"Deleted session: {session_id}")
     
     def store_mappings(
@@ -148,6 +169,51 @@ class SessionManager:
         total_mappings = sum(len(m) for m in mappings.values())
         logger.info(f"Stored {total_mappings} mappings for session: {session_id}")
     
+    def get_conversation(self, session_id: str) -> ConversationState:
+        """
+        Get the conversation state of a session, to anonymize its next turn
+        
+        Returns:
+            ConversationState with the session's mappings, counters and
+            paragraph index (empty if the session does not exist)
+        """
+        session = self.get_session(session_id)
+        if not session:
+            return ConversationState()
+        
+        paragraphs = self.cache.get_json(self._get_paragraphs_key(session_id)) or {}
+        return ConversationState(
+            mappings=session.mappings,
+            counters=session.counters,
+            paragraphs=paragraphs
+        )
+    
+    def store_conversation(
+        self,
+        session_id: str,
+        conversation: ConversationState,
+        ttl: int = 3600
+    ):
+        """
+        Store the conversation state of a session after a turn
+        
+        Mappings are merged like store_mappings, counters never go back,
+        and the paragraph index replaces the previous one.
+        """
+        self.store_mappings(session_id, conversation.mappings, ttl)
+        
+        key = self._get_session_key(session_id)
+        data = self.cache.get_json(key)
+        if data is not None:
+            counters = data.setdefault("counters", {})
+            for entity_type, number in conversation.counters.items():
+                counters[entity_type] = max(counters.get(entity_type, 1), number)
+            self.cache.set_json(key, data, ttl)
+        
+        self.cache.set_json(self._get_paragraphs_key(session_id), dict(conversation.paragraphs), ttl)
+        logger.info(f"Stored conversation state for session: {session_id} "
+                    f"[{conversation.hits} paragraphs reused, {conversation.misses} analyzed]")
+    
     def get_mappings(self, session_id: str) -> Dict[str, Dict[str, str]]:
         """
         Get all mappings for a session
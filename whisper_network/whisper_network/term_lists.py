@@ -0,0 +1,201 @@
+"""
+Per-tenant deny-lists and allow-lists.
+
+Compliance teams maintain lists of strings that must always be anonymized
+(client names, project code names, employee names) or never be (public
+company names, support addresses). Each list is compiled once into an
+Aho-Corasick automaton (pyahocorasick) or, without it, a character trie, and
+matched in a single pass with optional case folding and word boundaries.
+Registering a new version of a tenant's lists swaps the compiled lists
+atomically: requests already running keep the version they started with.
+
+Developed by Sylvain JOLY, NANO by NXO
+License: MIT
+"""
+
+import logging
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
+
+_END = ""  # Trie key marking the end of a term (never a character of the text)
+
+
+def fold(text: str) -> str:
+    """Lowercase text with unchanged offsets (characters whose lowercase form is longer are kept)."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(lower if len(lower) == 1 else char for char, lower in ((char, char.lower()) for char in text))
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class TermList:
+    """Terms compiled for a single-pass, leftmost-longest search."""
+
+    def __init__(
+        self,
+        terms: Iterable[str],
+        case_sensitive: bool = False,
+        whole_words: bool = True,
+        use_automaton: bool = AHOCORASICK_AVAILABLE
+    ):
+        """
+        Args:
+            terms: Strings to find (NFC-normalized, surrounding spaces ignored)
+            case_sensitive: Match the exact case instead of case-folded text
+            whole_words: Only match terms not glued to a letter or digit
+            use_automaton: Use pyahocorasick when available
+        """
+        self.case_sensitive = case_sensitive
+        self.whole_words = whole_words
+        keys = set()
+        for term in terms:
+            term = unicodedata.normalize("NFC", term).strip()
+            if term:
+                keys.add(term if case_sensitive else fold(term))
+        self.size = len(keys)
+
+        self._automaton = None
+        self._trie: Dict[str, Any] = {}
+        if use_automaton and AHOCORASICK_AVAILABLE:
+            if keys:
+                self._automaton = ahocorasick.Automaton()
+                for key in keys:
+                    self._automaton.add_word(key, len(key))
+                self._automaton.make_automaton()
+        else:
+            for key in keys:
+                node = self._trie
+                for char in key:
+                    node = node.setdefault(char, {})
+                node[_END] = True
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _occurrences(self, haystack: str) -> Iterator[Tuple[int, int]]:
+        """Every (start, end) occurrence of a term, boundaries not checked."""
+        if self._automaton is not None:
+            for end, length in self._automaton.iter(haystack):
+                yield end - length + 1, end + 1
+            return
+        if not self._trie:
+            return
+        trie = self._trie
+        size = len(haystack)
+        for start in range(size):
+            # A whole word starts at a term start: skip positions inside a word
+            if self.whole_words and start and _is_word_char(haystack[start - 1]) and _is_word_char(haystack[start]):
+                continue
+            node = trie.get(haystack[start])
+            position = start + 1
+            while node is not None:
+                if _END in node:
+                    yield start, position
+                if position == size:
+                    break
+                node = node.get(haystack[position])
+                position += 1
+
+    def _on_boundaries(self, text: str, start: int, end: int) -> bool:
+        # Like regex \b: only checked on the sides where the term is a word character
+        if _is_word_char(text[start]) and start and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """Non-overlapping (start, end) occurrences, leftmost then longest first."""
+        if not self.size:
+            return []
+        haystack = text if self.case_sensitive else fold(text)
+        occurrences = [
+            (start, end) for start, end in self._occurrences(haystack)
+            if not self.whole_words or self._on_boundaries(text, start, end)
+        ]
+        occurrences.sort(key=lambda span: (span[0], -span[1]))
+
+        selected = []
+        covered_until = 0
+        for start, end in occurrences:
+            if start >= covered_until:
+                selected.append((start, end))
+                covered_until = end
+        return selected
+
+
+@dataclass(frozen=True)
+class TenantLists:
+    """Compiled lists of one tenant, replaced as a whole on each registration."""
+    version: int
+    deny: Optional[TermList] = None   # Always anonymized
+    allow: Optional[TermList] = None  # Never anonymized (unless also denied)
+
+
+class TermListRegistry:
+    """Compiled deny/allow lists of every tenant, hot-swappable."""
+
+    def __init__(self):
+        self._lists: Dict[str, TenantLists] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        tenant_id: str,
+        deny: Iterable[str] = (),
+        allow: Iterable[str] = (),
+        case_sensitive: bool = False,
+        whole_words: bool = True
+    ) -> TenantLists:
+        """Compile and install a new version of a tenant's lists."""
+        # Compiled outside the lock: large lists take a while, readers are not blocked
+        deny_list = TermList(deny, case_sensitive, whole_words)
+        allow_list = TermList(allow, case_sensitive, whole_words)
+        with self._lock:
+            previous = self._lists.get(tenant_id)
+            lists = TenantLists(
+                version=previous.version + 1 if previous else 1,
+                deny=deny_list if len(deny_list) else None,
+                allow=allow_list if len(allow_list) else None
+            )
+            self._lists[tenant_id] = lists
+        logger.info(f"Term lists of tenant {tenant_id} updated to version {lists.version} "
+                    f"({len(deny_list)} denied, {len(allow_list)} allowed)")
+        return lists
+
+    def get(self, tenant_id: Optional[str]) -> Optional[TenantLists]:
+        """Current lists of a tenant, or None if it has none."""
+        if tenant_id is None:
+            return None
+        return self._lists.get(tenant_id)
+
+    def remove(self, tenant_id: str) -> bool:
+        """Drop a tenant's lists; False if it had none."""
+        with self._lock:
+            return self._lists.pop(tenant_id, None) is not None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Version and list sizes of each tenant, for monitoring."""
+        return {
+            tenant_id: {
+                "version": lists.version,
+                "deny_terms": len(lists.deny) if lists.deny else 0,
+                "allow_terms": len(lists.allow) if lists.allow else 0,
+            }
+            for tenant_id, lists in sorted(self._lists.items())
+        }